@@ -4,10 +4,35 @@ import streamlit as st
 # Cache settings
 CACHE_TTL = 300  # 5 minutes
 MAX_ENTRIES = 100
+# Memory all cached values may use together; containers have 512 MB
+CACHE_MEMORY_BUDGET_MB = 192
+
+# Per-kind policy for the shared data cache (utils/data_cache.py):
+#   ttl          seconds an entry is served before it is reloaded
+#   max_entries  entries of the kind kept at once
+#   max_mb       memory the kind's entries may use together
+#   eviction     "lru" drops the least recently used entry, "lfu" the least used (then least recent)
+#   refreshable  keep the loader so the admin panel can reload the entry in place
+#   early_refresh  seconds before expiry in which a read reloads the entry in the background (0 disables);
+#                  the loader must not make Streamlit calls
+CACHE_POLICIES = {
+    "sheet": {"ttl": CACHE_TTL, "max_entries": 20, "max_mb": 64, "eviction": "lru", "refreshable": True,
+              "early_refresh": 30},
+    "pk_type": {"ttl": CACHE_TTL, "max_entries": 20, "max_mb": 32, "eviction": "lru", "refreshable": True,
+                "early_refresh": 30},
+    "derived": {"ttl": 3600, "max_entries": MAX_ENTRIES, "max_mb": 32, "eviction": "lru", "refreshable": False},
+    "upload": {"ttl": 1800, "max_entries": 20, "max_mb": 32, "eviction": "lru", "refreshable": False},
+    "export": {"ttl": 600, "max_entries": 10, "max_mb": 16, "eviction": "lru", "refreshable": False},
+    "figure": {"ttl": 3600, "max_entries": 64, "max_mb": 16, "eviction": "lfu", "refreshable": False},
+}
+DEFAULT_CACHE_POLICY = {"ttl": CACHE_TTL, "max_entries": MAX_ENTRIES, "max_mb": 16, "eviction": "lru",
+                        "refreshable": False, "early_refresh": 0}
 
 def configure_cache():
     """Configure Streamlit cache settings"""
     # Clear cache if needed
     if st.button("🔄 Clear Cache", help="Clear all cached data to force refresh"):
+        from utils.data_cache import get_data_cache
         st.cache_data.clear()
+        get_data_cache().invalidate()
         st.success("Cache cleared! Data will be refreshed on next load.")
@@ -0,0 +1,22 @@
+"""
+Reference pay chart data for the Bigo Live Dashboard.
+Source data for the host_pay and agency_pay datasets served by utils/data_manager.py.
+"""
+
+# Updated data from the provided Host Pay Chart
+HOST_PAY_CHART = {
+    'Ranking': ['V1', 'F', 'F+', 'E', 'E+', 'D', 'D+', 'C', 'C+', 'B', 'B+', 'A', 'A+', 'S1', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7', 'S8', 'S9', 'S10', 'S11', 'S12', 'S13', 'S14'],
+    'Target Beans': [5000, 10000, 20000, 30000, 40000, 50000, 60000, 70000, 80000, 90000, 100000, 110000, 120000, 130000, 170000, 250000, 350000, 450000, 600000, 800000, 1000000, 1500000, 2000000, 3000000, 4000000, 5000000, 6000000],
+    'Salary in Beans': [19110, 18900, 37590, 56280, 74970, 93450, 112350, 131040, 149250, 168000, 185850, 220500, 230700, 236250, 303450, 441000, 617440, 793800, 1024800, 1354500, 1680000, 2478000, 3297000, 4956000, 6426000, 7720000, 8568000],
+    'Salary in Diamonds': [5497, 5215, 10397, 15574, 20738, 25862, 31095, 36267, 41310, 46504, 51434, 61036, 63850, 65395, 83996, 122085, 170925, 219747, 283696, 374973, 465089, 686010, 912743, 1372025, 1778985, 2137216, 2371977]
+}
+
+# Data from the provided Agency Salary sheet
+AGENCY_PAY_CHART = {
+    'Ranking': ['V1', 'F', 'F+', 'E', 'E+', 'D', 'D+', 'C', 'C+', 'B', 'B+', 'A', 'A+', 'S1', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7', 'S8', 'S9', 'S10', 'S11', 'S12', 'S13', 'S14'],
+    'Host Target Beans': [5000, 10000, 20000, 30000, 40000, 50000, 60000, 70000, 80000, 90000, 100000, 110000, 120000, 130000, 170000, 250000, 350000, 450000, 600000, 800000, 1000000, 1500000, 2000000, 3000000, 4000000, 5000000, 6000000],
+    'S Bonus For Agency': [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 200, 200, 200, 200, 200, 200, 200, 200, 200],
+    'Total Remuneration (USD)': [23, 23, 45, 67, 89, 112, 134, 156, 178, 200, 221, 243, 263, 281, 361, 525, 735, 945, 1420, 1813, 2200, 3150, 4125, 6100, 7850, 9400, 10400],
+    'Beans': [4830, 4830, 9450, 14070, 18690, 23520, 28140, 32760, 37380, 42000, 46410, 51030, 55230, 59010, 75810, 110250, 154350, 198450, 298200, 380730, 462000, 661500, 866250, 1281000, 1648500, 1974000, 2184000],
+    'Diamonds': [1324, 1324, 2605, 3888, 5159, 6501, 7782, 9053, 10341, 11620, 12839, 14118, 15287, 16334, 20972, 30518, 42725, 54934, 82550, 105388, 127900, 183124, 239807, 354631, 456361, 546482, 604616]
+}
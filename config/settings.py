@@ -24,15 +24,27 @@ DEFAULT_SHEET_URLS = {
     "Sheet 3": "https://docs.google.com/spreadsheets/d/1iS9acwW9DrjZQh_d51_Pv4DcN9_X4alzK3wC2KIWXYw/edit?gid=1234468340",
 }
 
-# Payment Settings
+# Payment Settings (seed for version 1 of the payment rule registry, see utils/payment_rules.py)
 PAYMENT_CONFIG = {
     "base_rate": 0.4,
     "bonus_threshold": 10000,
     "bonus_rate": 0.1,
     "pk_win_bonus": 500,
     "attendance_bonus": 1000,
-    "beans_to_diamonds_rate": 210,
+    "beans_to_diamonds_rate": 3.61,  # beans per diamond, matches the exchange bundles
     "diamond_to_usd_rate": 0.005,
+    # Host Pay Calculator defaults (USD)
+    "hourly_rate": 5.0,
+    "diamond_rate_per_1000": 1.0,
+    "pk_win_bonus_usd": 2.0,
+    "task_bonus": 1.0,
+    "event_bonus": 5.0,
+    "pk_loss_penalty": 0.5,
+}
+
+# PK Schedule Settings
+PK_SCHEDULE_CONFIG = {
+    "default_slot_minutes": 10,  # assumed PK length when a slot only lists a start time
 }
 
 # UI Settings
@@ -43,11 +55,58 @@ UI_CONFIG = {
     "theme": "light",
 }
 
+# Upload Settings
+UPLOAD_CONFIG = {
+    "max_file_mb": 50,  # uploads larger than this are rejected before parsing
+    "max_rows": 500_000,
+    "max_memory_mb": 256,  # in-memory size of the parsed snapshot
+    "chunk_rows": 50_000,
+}
+
+# Chart Settings
+CHART_CONFIG = {
+    "width_px": 1200,  # assumed plot width of a full-width chart
+    "points_per_pixel": 2,  # line series are downsampled to this many points per pixel of width
+}
+
+# Upstream Sheet Sources
+SOURCE_CONFIG = {
+    "connect_timeout": 3,  # seconds to connect to Google for one CSV export
+    "read_timeout": 10,  # seconds the whole export download may take, however slowly it streams
+    "render_budget_seconds": 8,  # a page render stops fetching and serves saved data once this is spent
+    "slow_seconds": 5,  # a fetch taking longer counts against the source like a failure
+    "window": 10,  # recent fetches per source the failure rate is taken over
+    "min_requests": 3,  # fetches in the window before the breaker may open
+    "failure_rate": 0.5,  # failed or slow share of the window that opens the breaker
+    "open_seconds": 60,  # time an open breaker waits before a background probe tries the source
+}
+
+# Google Sheets API quota (write-back and gspread reads all run as one service account)
+SHEETS_API_CONFIG = {
+    "project_per_minute": 60,  # requests per minute for the whole app; Google allows 60 per user per minute
+    "sheet_per_minute": 30,  # requests per minute to one spreadsheet, so a busy sheet cannot take the whole quota
+    "burst": 5,  # requests that may go out back to back before pacing starts
+    "max_retries": 5,  # retries of a call rejected with 429 before giving up
+    "backoff_seconds": 2,  # first pause after a 429, doubled per retry unless Google sends Retry-After
+    "max_backoff_seconds": 64,
+    "max_wait_seconds": 120,  # a call still queued after this long fails instead of hanging the page
+}
+
 # Security Settings
 SECURITY_CONFIG = {
     "enable_auth": False,  # Set to True to enable authentication
     "session_timeout": 3600,  # seconds (1 hour)
-    "max_login_attempts": 3,
+    "admin_session_timeout": 24 * 3600,  # seconds (24 hours)
+    "max_login_attempts": 3,  # failed logins per username or IP before a lockout
+    "lockout_minutes": 15,  # time for a locked-out username or IP to regain every attempt
+    "session_db": None,  # SQLite file to keep sessions across restarts, e.g. "data/sessions.sqlite3"
+}
+
+# Audit Log Settings
+AUDIT_CONFIG = {
+    "max_file_mb": 10,  # the active log file is rotated once it reaches this size
+    "max_files": 50,  # rotated files kept; the oldest are deleted
+    "compress": True,  # gzip rotated files
 }
 
 # File Paths
@@ -55,6 +114,8 @@ TEMPLATES_DIR = "templates"
 STATIC_DIR = "static"
 CONFIG_DIR = "config"
 UTILS_DIR = "utils"
+HISTORY_DIR = os.path.join("data", "pk_history")
+AUDIT_LOG_DIR = os.path.join("data", "audit")
 
 def get_setting(key: str, default: Any = None) -> Any:
     """Get a setting value from environment variables or default."""
@@ -1,8 +1,25 @@
 import streamlit as st
 import pandas as pd
-from utils.gsheets import read_filtered_columns
 from utils.gsheets_writer import write_dataframe_to_sheet
 from utils.data_validator import safe_date_conversion, clean_text_data, display_data_info
+from utils.pk_data import PK_SHEETS, fetch_pk_sheet, load_all_data, load_pk_type_tabs
+from utils.data_cache import EXPORT_KIND, SHEET_KIND, frame_fingerprint, get_data_cache
+from utils.telemetry import begin_run, end_run
+from utils.audit_log import REFRESH, audit
+from utils.pk_conflicts import get_conflict_detector
+from utils.pk_schedule import get_pk_schedule
+from utils.history_store import get_history_store
+from utils.pk_rollups import get_pk_rollups
+from utils.pk_matchups import get_agency_matchups
+from utils.charts import line_figure
+from utils.leaderboards import AGENCY, HOST, PAYOUT, DIAMONDS, PK_COUNT, get_leaderboards
+from utils.money import from_minor_units
+from utils.payment_rules import active_rules
+from utils.paysheet import paysheet_generator_widget, upload_hash
+from utils.scenarios import scenario_sweep_widget
+from utils.host_pay_batch import (
+    batch_template, batch_totals, build_host_pay_report, calculate_host_pay_batch, load_host_metrics_upload
+)
 from datetime import timedelta
 import time
 
@@ -52,6 +69,8 @@ if 'current_page' not in st.session_state:
 if page != st.session_state.current_page:
     st.session_state.current_page = page
 
+begin_run(st.session_state.current_page)
+
 if st.session_state.current_page == "Home":
     # Landing page content with Alpha Agency 752 branding
     st.markdown("""
@@ -192,19 +211,13 @@ if st.session_state.current_page == "Home":
     
     # Load basic stats for the landing page
     try:
-        # Load minimal data for stats
-        sheet_urls = {
-            "Training PKs": "https://docs.google.com/spreadsheets/d/1T2Za-VeqUe4hN-00X-Qa5T3FAgXMExz2B1Brhspbr7w/edit?gid=920344037",
-            "Tasks": "https://docs.google.com/spreadsheets/d/1DD7I5sMu55wRVwGjPEv43iygq2b8oudfMspGlOY1zck/edit?gid=1990132269",
-            "Mystery Matches": "https://docs.google.com/spreadsheets/d/1iS9acwW9DrjZQh_d51_Pv4DcN9_X4alzK3wC2KIWXYw/edit?gid=1234468340",
-        }
-        
+        # Load minimal data for stats (shared cache, guarded by the sheets' circuit breakers)
         total_records = 0
         sheets_loaded = 0
         
-        for name, url in sheet_urls.items():
+        for name in PK_SHEETS:
             try:
-                df = read_filtered_columns(url)
+                df = fetch_pk_sheet(name)
                 if not df.empty:
                     total_records += len(df)
                     sheets_loaded += 1
@@ -327,53 +340,18 @@ elif st.session_state.current_page == "PK Viewer":
 
     with col2:
         if st.button("🗑️ Clear Cache"):
-            st.cache_data.clear()
+            # Only the PK sheets reload; other users' caches and unrelated data stay warm
+            dropped = get_data_cache().invalidate(SHEET_KIND)
+            audit(REFRESH, scope=SHEET_KIND, action="clear", entries=dropped)
             st.success("Cache cleared!")
             st.rerun()
 
-    refresh_interval = st.slider("Auto-refresh interval (seconds)", 30, 300, 60)
-if st.button("Enable Auto-Refresh"):
-    while True:
-        st.rerun()
-        time.sleep(refresh_interval)
-        
-        current_time = time.time()
-        if current_time - st.session_state.last_refresh > refresh_interval * 60:
-            st.session_state.last_refresh = current_time
-            st.rerun()
-
     # --- Load sheets ---
-    sheet_urls = {
-        "Sheet 1": "https://docs.google.com/spreadsheets/d/1T2Za-VeqUe4hN-00X-Qa5T3FAgXMExz2B1Brhspbr7w/edit?gid=920344037",
-        "Sheet 2": "https://docs.google.com/spreadsheets/d/1DD7I5sMu55wRVwGjPEv43iygq2b8oudfMspGlOY1zck/edit?gid=1990132269",
-        "Sheet 3": "https://docs.google.com/spreadsheets/d/1iS9acwW9DrjZQh_d51_Pv4DcN9_X4alzK3wC2KIWXYw/edit?gid=1234468340",
-    }
-    sheet_map = {
-        "Training PKs": "https://docs.google.com/spreadsheets/d/1T2Za-VeqUe4hN-00X-Qa5T3FAgXMExz2B1Brhspbr7w/edit?gid=920344037",
-        "Tasks": "https://docs.google.com/spreadsheets/d/1DD7I5sMu55wRVwGjPEv43iygq2b8oudfMspGlOY1zck/edit?gid=1990132269",
-        "Mystery Matches": "https://docs.google.com/spreadsheets/d/1iS9acwW9DrjZQh_d51_Pv4DcN9_X4alzK3wC2KIWXYw/edit?gid=1234468340",
-    }
+    sheet_map = PK_SHEETS
 
     selected_sheet_name = st.sidebar.selectbox("📋 Select PK Sheet", options=sheet_map.keys())
     selected_sheet_url = sheet_map[selected_sheet_name]
 
-    @st.cache_data(ttl=300)
-    def load_all_data() -> pd.DataFrame:
-        all_dfs = []
-        for name, url in sheet_urls.items():
-            try:
-                df = read_filtered_columns(url)
-                if not df.empty:
-                    df["Source Sheet"] = name
-                    all_dfs.append(df)
-            except Exception as e:
-                st.warning(f"⚠️ Could not load {name}: {str(e)}")
-        
-        if all_dfs:
-            return pd.concat(all_dfs, ignore_index=True)
-        else:
-            return pd.DataFrame()
-
     # Load the combined data
     combined_df = load_all_data()
 
@@ -386,6 +364,112 @@ if st.button("Enable Auto-Refresh"):
     if not combined_df.empty:
         display_data_info(combined_df, "Combined Data Summary")
 
+        # Activity comes from the materialized rollups, so it costs O(groups) per rerun
+        rollups = get_pk_rollups()
+        with st.expander("📈 PK Activity"):
+            daily_counts = rollups.daily_counts()
+            if not daily_counts.empty:
+                first_day, last_day = daily_counts["Date"].min().date(), daily_counts["Date"].max().date()
+                window = None
+                if first_day < last_day:
+                    # Long histories are downsampled; zooming in narrows the window back to every day
+                    window = st.slider("Zoom", min_value=first_day, max_value=last_day,
+                                       value=(first_day, last_day), key="pk_activity_zoom")
+                    window = (pd.Timestamp(window[0]), pd.Timestamp(window[1]))
+                activity_fig = line_figure(daily_counts, "Date", {"Matches": "Matches"}, title="Matches per Day",
+                                           version=f"pk_rollups@{rollups.version}", window=window)
+                st.plotly_chart(activity_fig, use_container_width=True)
+                meta = activity_fig["layout"]["meta"]
+                if meta["points"] < meta["total"]:
+                    st.caption(f"Showing {meta['points']:,} of {meta['total']:,} days; zoom in for full detail")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Most Active Agencies**")
+                st.dataframe(rollups.top_agencies(10), use_container_width=True, hide_index=True)
+            with col2:
+                st.markdown("**Most Booked Hosts**")
+                st.dataframe(rollups.top_hosts(10), use_container_width=True, hide_index=True)
+
+        leaderboards = get_leaderboards()
+        with st.expander("🏆 Leaderboards"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                board_period = st.selectbox("Period", ["All Time", "Day", "Week", "Month"], key="leaderboard_period")
+            period = {"All Time": "all", "Day": "day", "Week": "week", "Month": "month"}[board_period]
+            board_day = None
+            if period != "all":
+                starts = leaderboards.periods(HOST, PK_COUNT, period)
+                with col2:
+                    if starts:
+                        board_day = st.date_input("Period containing", value=starts[-1].date(),
+                                                  min_value=starts[0].date(), key="leaderboard_day")
+            with col3:
+                board_size = st.number_input("Show top", min_value=3, max_value=100, value=10, key="leaderboard_size")
+            if period == "all" or board_day is not None:
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown("**Top Hosts by PKs**")
+                    st.dataframe(leaderboards.top(HOST, PK_COUNT, int(board_size), period, board_day),
+                                 use_container_width=True, hide_index=True)
+                with col2:
+                    st.markdown("**Top Agencies by PKs**")
+                    st.dataframe(leaderboards.top(AGENCY, PK_COUNT, int(board_size), period, board_day),
+                                 use_container_width=True, hide_index=True)
+
+        matchups = get_agency_matchups()
+        with st.expander("🤝 Agency Matchups"):
+            if matchups.agencies:
+                col1, col2 = st.columns(2)
+                with col1:
+                    rival_agency = st.selectbox("Agency", sorted(matchups.agencies), key="matchup_agency")
+                    rival_count = st.number_input("Top rivals", min_value=1, max_value=50, value=5, key="matchup_k")
+                with col2:
+                    window = st.date_input("Date window (optional)", value=(), key="matchup_window")
+                window_start, window_end = (window[0], window[-1]) if window else (None, None)
+                st.dataframe(
+                    matchups.top_rivals(rival_agency, int(rival_count), window_start, window_end),
+                    use_container_width=True, hide_index=True,
+                )
+                st.markdown("**Head-to-Head (most active agencies)**")
+                st.dataframe(matchups.matrix_frame(15, window_start, window_end), use_container_width=True)
+            else:
+                st.info("No agency matchups found in the loaded sheets.")
+
+        # PK-type tabs feed the detector as they load; only hosts in new rows are re-checked
+        load_pk_type_tabs()
+        conflict_detector = get_conflict_detector()
+        double_bookings = conflict_detector.conflicts()
+        with st.expander(f"⚠️ Double Bookings ({len(double_bookings)})"):
+            if double_bookings.empty:
+                st.success("✅ No host is booked into overlapping PKs.")
+            else:
+                st.dataframe(double_bookings, use_container_width=True, hide_index=True)
+            st.caption(f"{conflict_detector.intervals:,} host slots checked across PK sheets and PK-type tabs")
+
+        history = get_history_store()
+        if history.available:
+            with st.expander("🕰️ History"):
+                stats = history.stats()
+                snapshots = history.snapshots()
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Snapshots", len(snapshots))
+                col2.metric("Date Partitions", stats["partitions"])
+                col3.metric("Stored", f"{stats['bytes'] / (1024 * 1024):.1f} MB")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    history_window = st.date_input("PK dates", value=(), key="history_window")
+                with col2:
+                    as_of_day = st.date_input("As of (optional)", value=None, key="history_as_of")
+                if st.button("🔎 Load History"):
+                    start, end = (history_window[0], history_window[-1]) if history_window else (None, None)
+                    as_of = pd.Timestamp(as_of_day) + pd.Timedelta(days=1) if as_of_day else None
+                    past_df = history.read_range(start, end, as_of=as_of)
+                    st.success(f"✅ {len(past_df):,} rows")
+                    st.dataframe(past_df.drop(columns=["row_hash"]), use_container_width=True, hide_index=True)
+                if not snapshots.empty:
+                    st.dataframe(snapshots.tail(20), use_container_width=True, hide_index=True)
+
     # --- Sidebar filters ---
     st.sidebar.header("🔍 Filter Data")
 
@@ -492,14 +576,17 @@ if st.button("Enable Auto-Refresh"):
         st.warning("⚠️ No data available or no matches found with current filters.")
 
     # --- Download to Excel ---
-    @st.cache_data
     def convert_to_excel(df: pd.DataFrame) -> bytes:
         import io
-        output = io.BytesIO()
-        try:
+
+        def build() -> bytes:
+            output = io.BytesIO()
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
                 df.to_excel(writer, index=False, sheet_name="PK Data")
             return output.getvalue()
+
+        try:
+            return get_data_cache().get(EXPORT_KIND, ("pk_excel", frame_fingerprint(df)), build)
         except Exception as e:
             st.error(f"Error creating Excel file: {str(e)}")
             return b""
@@ -514,6 +601,58 @@ if st.button("Enable Auto-Refresh"):
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
 
+elif st.session_state.current_page == "Schedule":
+    st.markdown("""
+    <div style="text-align: center; margin-bottom: 2rem;">
+        <h1 style="background: linear-gradient(135deg, #FF6A00 0%, #FF8533 100%); 
+                   -webkit-background-clip: text; -webkit-text-fill-color: transparent; 
+                   font-size: 3rem; font-weight: 800; margin: 0; letter-spacing: 2px;">
+            📅 PK SCHEDULE
+        </h1>
+        <p style="color: #FFE4CC; font-size: 1.2rem; margin: 1rem 0;">
+            Bookings from every PK sheet by day, week and month
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Loading the sheets feeds any new rows into the schedule index
+    load_all_data()
+    schedule = get_pk_schedule()
+
+    if schedule.bookings == 0:
+        st.warning("⚠️ No scheduled PKs found in the loaded sheets.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            view = st.radio("🗓️ View", ["Day", "Week", "Month"], horizontal=True)
+        with col2:
+            selected_day = st.date_input("📆 Date", value=pd.Timestamp.now().date())
+        with col3:
+            focus = st.selectbox("🔍 Show", ["All PKs", "Host", "Agency"])
+
+        host_id = agency = None
+        if focus == "Host":
+            host_id = st.selectbox("Host ID", schedule.hosts())
+        elif focus == "Agency":
+            agency = st.selectbox("Agency", schedule.agencies())
+
+        if view == "Day":
+            events, hourly = schedule.day_view(selected_day, host_id=host_id, agency=agency)
+            st.metric("PKs on this day", len(events))
+            st.bar_chart(hourly)
+            if events.empty:
+                st.info("Nothing scheduled on this day.")
+            else:
+                st.dataframe(events, use_container_width=True, hide_index=True)
+        elif view == "Week":
+            st.markdown("**PKs per hour**")
+            st.dataframe(schedule.week_view(selected_day, host_id=host_id, agency=agency), use_container_width=True)
+        else:
+            st.markdown(f"**{pd.Timestamp(selected_day).strftime('%B %Y')}** (day: PKs)")
+            st.dataframe(schedule.month_view(selected_day, host_id=host_id, agency=agency), use_container_width=True)
+
+        st.caption(f"{schedule.bookings:,} host bookings indexed")
+
 elif st.session_state.current_page == "Host Pay Calculator":
     st.markdown("""
     <div style="text-align: center; margin-bottom: 2rem;">
@@ -561,34 +700,48 @@ elif st.session_state.current_page == "Host Pay Calculator":
     with col2:
         st.subheader("💰 Pay Structure")
         
-        # Pay rates
-        base_rate_per_hour = st.number_input("💵 Base Rate per Hour ($)", min_value=0.0, value=5.0, step=0.5)
-        diamond_rate = st.number_input("💎 Rate per 1000 Diamonds ($)", min_value=0.0, value=1.0, step=0.1)
-        pk_win_bonus = st.number_input("🏆 PK Win Bonus ($)", min_value=0.0, value=2.0, step=0.5)
-        task_bonus = st.number_input("✅ Task Completion Bonus ($)", min_value=0.0, value=1.0, step=0.25)
-        event_bonus = st.number_input("🎉 Event Participation Bonus ($)", min_value=0.0, value=5.0, step=1.0)
+        # Pay rates (defaults come from the active payment rules)
+        rules = active_rules()
+        base_rate_per_hour = st.number_input("💵 Base Rate per Hour ($)", min_value=0.0, value=float(rules["hourly_rate"]), step=0.5)
+        diamond_rate = st.number_input("💎 Rate per 1000 Diamonds ($)", min_value=0.0, value=float(rules["diamond_rate_per_1000"]), step=0.1)
+        pk_win_bonus = st.number_input("🏆 PK Win Bonus ($)", min_value=0.0, value=float(rules["pk_win_bonus_usd"]), step=0.5)
+        task_bonus = st.number_input("✅ Task Completion Bonus ($)", min_value=0.0, value=float(rules["task_bonus"]), step=0.25)
+        event_bonus = st.number_input("🎉 Event Participation Bonus ($)", min_value=0.0, value=float(rules["event_bonus"]), step=1.0)
         
         # Deductions
         st.subheader("📉 Deductions")
-        pk_loss_penalty = st.number_input("❌ PK Loss Penalty ($)", min_value=0.0, value=0.5, step=0.25)
+        pk_loss_penalty = st.number_input("❌ PK Loss Penalty ($)", min_value=0.0, value=float(rules["pk_loss_penalty"]), step=0.25)
         other_deductions = st.number_input("🔻 Other Deductions ($)", min_value=0.0, value=0.0, step=0.5)
     
     # Calculate earnings
     if st.button("🧮 Calculate Pay", use_container_width=True):
-        # Base calculations
-        base_pay = hours_streamed * base_rate_per_hour
-        diamond_earnings = (diamonds_earned / 1000) * diamond_rate
-        pk_bonus = pk_wins * pk_win_bonus
-        task_earnings = daily_tasks_completed * task_bonus
-        event_earnings = special_events * event_bonus
-        
-        # Deductions
-        pk_penalties = pk_losses * pk_loss_penalty
-        total_deductions = pk_penalties + other_deductions
+        # Evaluate with the shared rule set; amounts are integer minor units (cents), rounded once per component
+        breakdown = rules.host_pay(
+            {
+                "diamonds_earned": diamonds_earned,
+                "hours_streamed": hours_streamed,
+                "pk_wins": pk_wins,
+                "pk_losses": pk_losses,
+                "tasks_completed": daily_tasks_completed,
+                "events_participated": special_events,
+                "other_deductions": other_deductions,
+            },
+            overrides={
+                "hourly_rate": base_rate_per_hour,
+                "diamond_rate_per_1000": diamond_rate,
+                "pk_win_bonus_usd": pk_win_bonus,
+                "task_bonus": task_bonus,
+                "event_bonus": event_bonus,
+                "pk_loss_penalty": pk_loss_penalty,
+            },
+        )
         
-        # Total calculation
-        gross_pay = base_pay + diamond_earnings + pk_bonus + task_earnings + event_earnings
-        net_pay = gross_pay - total_deductions
+        # Convert back to currency for display; every value is an exact number of cents
+        (base_pay, diamond_earnings, pk_bonus, task_earnings, event_earnings,
+         pk_penalties, total_deductions, gross_pay, net_pay) = from_minor_units([
+            breakdown[key] for key in ["base_pay", "diamond_earnings", "pk_bonus", "task_earnings", "event_earnings",
+                                       "pk_penalties", "total_deductions", "gross_pay", "net_pay"]
+        ]).tolist()
         
         # Display results
         st.markdown("---")
@@ -687,30 +840,98 @@ elif st.session_state.current_page == "Host Pay Calculator":
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
 
+    # Batch mode: the same pay structure applied to a whole table of hosts
+    st.markdown("---")
+    st.subheader("👥 Batch Mode")
+    st.caption("Upload a table of hosts to compute the full breakdown for every row with the pay structure above.")
+    
+    st.download_button(
+        label="📄 Download Batch Template (CSV)",
+        data=batch_template().to_csv(index=False),
+        file_name="host_pay_batch_template.csv",
+        mime="text/csv"
+    )
+    
+    batch_file = st.file_uploader(
+        "Upload host table",
+        type=["csv", "xlsx", "parquet"],
+        help="Columns: host_id, host_name, diamonds_earned, hours_streamed, pk_wins, pk_losses, "
+             "tasks_completed, events_participated, other_deductions",
+        key="host_pay_batch_upload"
+    )
+    
+    if batch_file is not None:
+        try:
+            host_metrics = load_host_metrics_upload(batch_file)
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+        else:
+            batch_rates = {
+                "hourly_rate": base_rate_per_hour,
+                "diamond_rate_per_1000": diamond_rate,
+                "pk_win_bonus_usd": pk_win_bonus,
+                "task_bonus": task_bonus,
+                "event_bonus": event_bonus,
+                "pk_loss_penalty": pk_loss_penalty,
+            }
+            batch_results = calculate_host_pay_batch(host_metrics, rules, overrides=batch_rates)
+            totals = batch_totals(batch_results)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Hosts", f"{len(batch_results):,}")
+            with col2:
+                st.metric("Gross Pay", f"${totals['Gross Pay']:,.2f}")
+            with col3:
+                st.metric("Total Deductions", f"${totals['Total Deductions']:,.2f}")
+            with col4:
+                st.metric("Net Pay", f"${totals['Net Pay']:,.2f}")
+            
+            negative = int((batch_results["Net Pay"] < 0).sum())
+            if negative:
+                st.warning(f"⚠️ {negative} hosts have a negative net pay and need review")
+            
+            st.dataframe(batch_results, use_container_width=True)
+            
+            # Keyed by the uploaded file, so reruns at other rates replace this batch's totals on today's boards
+            leaderboards = get_leaderboards()
+            leaderboards.record_payouts(batch_results, batch=upload_hash(batch_file))
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**🏆 Top Hosts by Net Pay (all batches)**")
+                st.dataframe(leaderboards.top(HOST, PAYOUT, 10), use_container_width=True, hide_index=True)
+            with col2:
+                st.markdown("**💎 Top Hosts by Diamonds (all batches)**")
+                st.dataframe(leaderboards.top(HOST, DIAMONDS, 10), use_container_width=True, hide_index=True)
+            
+            st.download_button(
+                label="📥 Download Multi-Host Report (Excel)",
+                data=build_host_pay_report(batch_results, {**dict(rules.values), **batch_rates}),
+                file_name=f"host_pay_batch_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+elif st.session_state.current_page == "Pay":
+    st.title("💰 Pay")
+    paysheet_tab, scenarios_tab = st.tabs(["📋 Paysheet Generator", "🧪 Policy Scenarios"])
+    with paysheet_tab:
+        paysheet_generator_widget()
+    with scenarios_tab:
+        # Sweeps the roster the generator builds
+        scenario_sweep_widget()
+
 else:
     # Placeholder for other pages
     st.title(f"🚧 {st.session_state.current_page} Page")
     st.info(f"The {st.session_state.current_page} page is under construction. Please check back later!")
     st.markdown(f"### Coming Soon: {st.session_state.current_page} Features")
     
-    if st.session_state.current_page == "Schedule":
-        st.markdown("""
-        - 📅 Calendar view
-        - ⏰ Event scheduling
-        - 🔔 Notifications
-        - 📊 Schedule analytics
-        """)
-    elif st.session_state.current_page == "Pay":
-        st.markdown("""
-        - 💰 Payment processing
-        - 📈 Earnings tracking
-        - 💎 Diamond calculations
-        - 📊 Financial reports
-        """)
-    elif st.session_state.current_page == "Diamond Calculator":
+    if st.session_state.current_page == "Diamond Calculator":
         st.markdown("""
         - 💎 Diamond value calculations
         - 💰 Currency conversions
         - 📊 Earning projections
         - 📈 Historical data
         """)
+
+end_run()
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.calculators import calculate_diamonds_breakdown
+from utils.telemetry import begin_run, end_run
 
 def show_diamond_calculator():
     """
@@ -41,4 +42,6 @@ def show_diamond_calculator():
             st.warning("Please enter a number of beans greater than 0.")
 
 if __name__ == "__main__":
+    begin_run("Diamond Calculator")
     show_diamond_calculator()
+    end_run()
@@ -1,6 +1,7 @@
 # streamlit_app.py
 
 import streamlit as st
+from utils.telemetry import begin_run, end_run
 
 # PK tier definitions with corrected data types and formatting
 PK_TIERS = {
@@ -84,6 +85,7 @@ st.set_page_config(
     page_icon="💎", 
     layout="centered"
 )
+begin_run("PK Calculator")
 
 st.title("💎 PK Rebate Optimizer")
 st.markdown("Calculate your PK rebates and find the best investment opportunities!")
@@ -140,4 +142,6 @@ with st.expander("ℹ️ How it works"):
     - Focus on PK types where you're close to the next tier
     - Consider ROI when planning your diamond spending
     - Agency Glory PK offers the highest rebates but requires significant investment
-    """)
\ No newline at end of file
+    """)
+
+end_run()
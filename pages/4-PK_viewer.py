@@ -1,35 +1,22 @@
 import streamlit as st
-import pandas as pd
+from utils.pk_data import PK_TYPE_COLUMNS, PK_TYPE_SHEETS, fetch_pk_type_tab, show_stale_badges
+from utils.telemetry import begin_run, end_run
 
-# === INPUT: Google Sheet ID & GID ===
-sheet_id = "1DD7I5sMu55wRVwGjPEv43iygq2b8oudfMspGlOY1zck"  # Replace with your actual sheet ID
-
-# Define available sheets with their GIDs
-available_sheets = {
-    "Star Task PK": "124426109",
-    "Talent PK": "1441823487", 
-    "2 vs 2 PK": "1623495727",
-    "Agency PK Party": "1135840848",
-    "Daily PK": "539805742"
-}
+begin_run("PK Viewer")
 
 # Let user select which sheet to view
-selected_sheet = st.sidebar.selectbox("Select PK Type", list(available_sheets.keys()))
-gid = available_sheets[selected_sheet]
-
-# === BUILD EXPORT LINK ===
-csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+selected_sheet = st.sidebar.selectbox("Select PK Type", list(PK_TYPE_SHEETS.keys()))
 
-# === LOAD DATA FROM SHEET ===
+# === LOAD DATA FROM SHEET (shared cache, so admins can see and refresh it) ===
 try:
-    df = pd.read_csv(csv_url)
+    df = fetch_pk_type_tab(selected_sheet)
 except Exception as e:
     st.error(f"Unable to load data: {e}")
     st.stop()
 
 # === CLEAN & SELECT REQUIRED COLUMNS ===
 # Fix: Remove duplicate "Agency Name" 
-expected_columns = ["Date", "PK Time", "Agency Name", "ID 1", "ID 2"]
+expected_columns = PK_TYPE_COLUMNS
 missing = [col for col in expected_columns if col not in df.columns]
 if missing:
     st.warning(f"Missing expected columns: {missing}")
@@ -80,6 +67,7 @@ if "ID 2" in df.columns:
 
 # === DISPLAY ===
 st.title("UK Agency & Host Events")
+show_stale_badges([selected_sheet])
 
 # Show filter summary
 active_filters = []
@@ -100,4 +88,6 @@ else:
     st.markdown("**Showing all data**")
 
 st.markdown(f"**Total records:** {len(filtered_df)}")
-st.dataframe(filtered_df)
\ No newline at end of file
+st.dataframe(filtered_df)
+
+end_run()
@@ -1,19 +1,13 @@
 import streamlit as st
 import pandas as pd
 import io
+from utils.data_manager import get_data_manager
+from utils.telemetry import begin_run, end_run
 
-# Data from the provided Agency Salary sheet
-data = {
-    'Ranking': ['V1', 'F', 'F+', 'E', 'E+', 'D', 'D+', 'C', 'C+', 'B', 'B+', 'A', 'A+', 'S1', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7', 'S8', 'S9', 'S10', 'S11', 'S12', 'S13', 'S14'],
-    'Host Target Beans': [5000, 10000, 20000, 30000, 40000, 50000, 60000, 70000, 80000, 90000, 100000, 110000, 120000, 130000, 170000, 250000, 350000, 450000, 600000, 800000, 1000000, 1500000, 2000000, 3000000, 4000000, 5000000, 6000000],
-    'S Bonus For Agency': [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 200, 200, 200, 200, 200, 200, 200, 200, 200],
-    'Total Remuneration (USD)': [23, 23, 45, 67, 89, 112, 134, 156, 178, 200, 221, 243, 263, 281, 361, 525, 735, 945, 1420, 1813, 2200, 3150, 4125, 6100, 7850, 9400, 10400],
-    'Beans': [4830, 4830, 9450, 14070, 18690, 23520, 28140, 32760, 37380, 42000, 46410, 51030, 55230, 59010, 75810, 110250, 154350, 198450, 298200, 380730, 462000, 661500, 866250, 1281000, 1648500, 1974000, 2184000],
-    'Diamonds': [1324, 1324, 2605, 3888, 5159, 6501, 7782, 9053, 10341, 11620, 12839, 14118, 15287, 16334, 20972, 30518, 42725, 54934, 82550, 105388, 127900, 183124, 239807, 354631, 456361, 546482, 604616]
-}
+begin_run("Agency Pay Chart")
 
-# Create DataFrame
-df = pd.DataFrame(data)
+# Shared Agency Pay Chart loaded once per process
+df = get_data_manager().load_data('agency_pay')
 
 # Streamlit app title
 st.title("Agency Pay Chart")
@@ -51,4 +45,6 @@ st.download_button(
     data=excel_data,
     file_name="Agency_Pay_Chart.xlsx",
     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-)
\ No newline at end of file
+)
+
+end_run()
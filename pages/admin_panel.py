@@ -1,20 +1,40 @@
 import streamlit as st
 import pandas as pd
 import hashlib
+import io
 import time
+import zipfile
 from datetime import datetime, timedelta
+from utils.audit_log import (
+    EXPORT, LOGIN, LOGIN_FAILED, LOGOUT, REFRESH, RULES_UPDATE, SESSIONS_CLEARED, UPLOAD, audit, get_audit_log
+)
+from utils.data_manager import get_data_manager
+from utils.sessions import ADMIN_AREA, client_ip, get_login_limiter, get_session_registry, limiter_keys
+from utils.payment_rules import CONVERSION_RULE_KEYS, RULE_SCHEMA, get_rule_registry
+from utils.data_cache import EXPORT_KIND, get_data_cache
+from utils.jobs import get_job_runner
+from utils.pk_data import load_all_data, load_pk_type_tabs, refresh_pk_sources
+from utils.query_engine import get_query_engine
+from utils.sheets_quota import get_sheets_scheduler
+from utils.source_health import get_source_health
+from utils.rate_recalc import (
+    earnings_template, export_earnings, monthly_totals, read_earnings, recalc_summary, recalculate_earnings
+)
+from utils.telemetry import begin_run, end_run, get_telemetry
+from utils.upload_ingest import PAY_CHART_SCHEMAS, ingest_upload
+from config.settings import SECURITY_CONFIG, UPLOAD_CONFIG
 
 class AdminAuth:
     def __init__(self):
-        # Initialize session state for authentication
+        # Sessions and lockouts are shared by every browser; this session only holds its token
+        self.sessions = get_session_registry()
+        self.limiter = get_login_limiter()
         if 'authenticated' not in st.session_state:
             st.session_state.authenticated = False
         if 'auth_timestamp' not in st.session_state:
             st.session_state.auth_timestamp = None
-        if 'failed_attempts' not in st.session_state:
-            st.session_state.failed_attempts = 0
-        if 'locked_until' not in st.session_state:
-            st.session_state.locked_until = None
+        if 'admin_token' not in st.session_state:
+            st.session_state.admin_token = None
     
     def hash_password(self, password):
         """Hash password using SHA-256"""
@@ -31,51 +51,54 @@ class AdminAuth:
         hashed_password = self.hash_password(password)
         return username in ADMIN_USERS and ADMIN_USERS[username] == hashed_password
     
-    def is_locked(self):
-        """Check if account is temporarily locked due to failed attempts"""
-        if st.session_state.locked_until:
-            if datetime.now() < st.session_state.locked_until:
-                return True
-            else:
-                # Reset lock if time has passed
-                st.session_state.locked_until = None
-                st.session_state.failed_attempts = 0
-        return False
-    
-    def lock_account(self):
-        """Lock account for 15 minutes after 3 failed attempts"""
-        st.session_state.locked_until = datetime.now() + timedelta(minutes=15)
+    def locked_for(self, username=""):
+        """Seconds until this client (and username, when given) may try to log in again"""
+        ip = client_ip()
+        keys = limiter_keys(username, ip) if username else ([f"ip:{ip}"] if ip else [])
+        return self.limiter.retry_after(keys)
     
     def is_session_valid(self):
-        """Check if current session is still valid (24 hour timeout)"""
-        if not st.session_state.authenticated or not st.session_state.auth_timestamp:
+        """Check the session token against the shared registry (24 hour timeout, revocable)"""
+        record = self.sessions.validate(st.session_state.admin_token, ADMIN_AREA)
+        if record is None:
             return False
-        
-        session_duration = datetime.now() - st.session_state.auth_timestamp
-        return session_duration < timedelta(hours=24)
+        st.session_state.auth_timestamp = datetime.fromtimestamp(record.created_at)
+        return True
     
     def login(self, username, password):
         """Attempt to log in user"""
-        if self.is_locked():
-            return False, "Account temporarily locked. Try again later."
+        keys = limiter_keys(username, client_ip())
+        wait = self.limiter.retry_after(keys)
+        if wait > 0:
+            audit(LOGIN_FAILED, user=username, ok=False, area=ADMIN_AREA, locked=True)
+            return False, f"Too many failed attempts. Try again in {int(wait // 60) + 1} minutes."
         
         if self.verify_credentials(username, password):
+            st.session_state.admin_token = self.sessions.create(
+                username, ADMIN_AREA, SECURITY_CONFIG["admin_session_timeout"], ip=client_ip()
+            )
             st.session_state.authenticated = True
             st.session_state.auth_timestamp = datetime.now()
-            st.session_state.failed_attempts = 0
-            st.session_state.locked_until = None
+            st.session_state.admin_user = username
+            self.limiter.reset(keys)
+            audit(LOGIN, user=username, area=ADMIN_AREA)
             return True, "Login successful!"
         else:
-            st.session_state.failed_attempts += 1
-            if st.session_state.failed_attempts >= 3:
-                self.lock_account()
-                return False, "Too many failed attempts. Account locked for 15 minutes."
-            return False, f"Invalid credentials. {3 - st.session_state.failed_attempts} attempts remaining."
+            self.limiter.fail(keys)
+            audit(LOGIN_FAILED, user=username, ok=False, area=ADMIN_AREA)
+            remaining = min(self.limiter.remaining(key) for key in keys)
+            if remaining < 1:
+                return False, "Too many failed attempts. Login is locked for a few minutes."
+            return False, f"Invalid credentials. {remaining} attempts remaining."
     
     def logout(self):
         """Log out user"""
+        audit(LOGOUT, area=ADMIN_AREA)
+        self.sessions.revoke(st.session_state.admin_token)
+        st.session_state.admin_token = None
         st.session_state.authenticated = False
         st.session_state.auth_timestamp = None
+        st.session_state.admin_user = None
         st.rerun()
 
 def show_login_page():
@@ -83,13 +106,14 @@ def show_login_page():
     auth = AdminAuth()
     
     # Check if already authenticated and session is valid
-    if st.session_state.authenticated and auth.is_session_valid():
+    if auth.is_session_valid():
         return True
     
-    # Reset authentication if session expired
-    if st.session_state.authenticated and not auth.is_session_valid():
+    # Reset authentication if the session expired or was revoked
+    if st.session_state.authenticated:
         st.session_state.authenticated = False
         st.session_state.auth_timestamp = None
+        st.session_state.admin_token = None
         st.warning("Session expired. Please log in again.")
     
     # Set page configuration
@@ -139,11 +163,10 @@ def show_login_page():
     st.markdown('<div class="login-header"><h1>🔐 Admin Login</h1><p>Secure access to Bigo Live Dashboard</p></div>', 
                 unsafe_allow_html=True)
     
-    # Check if account is locked
-    if auth.is_locked():
-        time_remaining = st.session_state.locked_until - datetime.now()
-        minutes_remaining = int(time_remaining.total_seconds() / 60)
-        st.error(f"🔒 Account locked. Try again in {minutes_remaining} minutes.")
+    # Check if this client is locked out
+    locked_for = auth.locked_for()
+    if locked_for > 0:
+        st.error(f"🔒 Too many failed attempts. Try again in {int(locked_for // 60) + 1} minutes.")
         return False
     
     # Login form
@@ -171,7 +194,7 @@ def show_login_page():
     <div class="security-notice">
         <strong>🛡️ Security Notice:</strong><br>
         • Sessions expire after 24 hours<br>
-        • Account locks for 15 minutes after 3 failed attempts<br>
+        • Each username and address gets 3 attempts, regained over 15 minutes<br>
         • All access is logged for security purposes
     </div>
     """, unsafe_allow_html=True)
@@ -184,7 +207,7 @@ def require_admin_auth(func):
         auth = AdminAuth()
         
         # Show logout button if authenticated
-        if st.session_state.authenticated and auth.is_session_valid():
+        if auth.is_session_valid():
             # Create logout button in sidebar
             with st.sidebar:
                 st.markdown("---")
@@ -205,6 +228,106 @@ def require_admin_auth(func):
     
     return wrapper
 
+REFRESH_JOB = "Refresh All Data"
+RECALC_JOB = "Recalculate Earnings"
+
+
+def build_export_package(data_manager) -> bytes:
+    """ZIP of every dataset, the PK sheets and the payment rule history as CSV files."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as package:
+        for name in data_manager.datasets():
+            package.writestr(f"{name}.csv", data_manager.load_data(name).to_csv(index=False))
+        package.writestr("pk_sheets.csv", load_all_data().to_csv(index=False))
+        package.writestr("pk_type_tabs.csv", load_pk_type_tabs().to_csv(index=False))
+        rules = pd.DataFrame([
+            {"Version": r.version, "Created": r.created_at, "Effective From": r.effective_from, "By": r.created_by,
+             "Note": r.note, **dict(r.values)}
+            for r in get_rule_registry().history()
+        ])
+        package.writestr("payment_rules_history.csv", rules.to_csv(index=False))
+    return output.getvalue()
+
+
+def show_refresh_result(job):
+    if job.result:
+        st.warning(f"⚠️ Job #{job.id} finished; some sources failed: {', '.join(job.result)}")
+    else:
+        st.success(f"✅ Job #{job.id} refreshed every source")
+
+
+def show_recalc_result(job):
+    results = job.result
+    summary = recalc_summary(results)
+    st.success(f"✅ Job #{job.id} recalculated {summary['rows']:,} rows across {summary['versions']} rule versions")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Diamonds", f"{summary['diamonds']:,.0f}")
+    with col2:
+        st.metric("USD", f"${summary['usd']:,.2f}")
+    st.dataframe(monthly_totals(results), use_container_width=True, hide_index=True)
+    st.download_button(
+        "📥 Download Recalculated Earnings (CSV)",
+        data=export_earnings(results).to_csv(index=False),
+        file_name=f"recalculated_earnings_job{job.id}.csv",
+        mime="text/csv",
+        key=f"recalc_download_{job.id}"
+    )
+
+
+def show_job_status(jobs, name=REFRESH_JOB, show_result=show_refresh_result):
+    """Latest job of ``name`` and the job table, polled while that job is running."""
+    latest = jobs.latest(name)
+    active = latest is not None and latest.active
+
+    @st.fragment(run_every=2 if active else None)
+    def job_status():
+        job = jobs.latest(name)
+        if job is None:
+            return
+        if active and not job.active:
+            # Finished since the page was drawn: rerun the page to show fresh data and stop polling
+            st.rerun()
+        if job.active:
+            st.progress(job.progress, text=f"Job #{job.id}: {job.message or job.state}")
+        elif job.error:
+            st.error(f"❌ Job #{job.id} failed: {job.error}")
+        else:
+            show_result(job)
+        st.dataframe(jobs.jobs(), use_container_width=True, hide_index=True)
+
+    job_status()
+
+def show_access_logs():
+    """Paged audit log viewer; filters and pages are answered from the in-process index."""
+    log = get_audit_log()
+    st.markdown("---")
+    st.write("**📋 Access Logs:**")
+    col1, col2, col3, col4 = st.columns([1, 1, 2, 1])
+    with col1:
+        user = st.selectbox("User", ["All"] + log.users(), key="audit_user")
+    with col2:
+        event = st.selectbox("Event", ["All"] + log.event_names(), key="audit_event")
+    with col3:
+        days = st.date_input("Dates", value=(), key="audit_dates", help="Leave empty for all time")
+    with col4:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="audit_page_size")
+    
+    start = datetime.combine(days[0], datetime.min.time()) if len(days) >= 1 else None
+    end = datetime.combine(days[-1], datetime.min.time()) + timedelta(days=1) if len(days) >= 1 else None
+    user = None if user == "All" else user
+    event = None if event == "All" else event
+    total = log.count(event=event, user=user, since=start, until=end)
+    pages = max((total + page_size - 1) // page_size, 1)
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="audit_page") - 1
+    entries, total = log.query(start=start, end=end, user=user, event=event, page=page, page_size=page_size)
+    
+    stats = log.stats()
+    st.caption(f"Entries {page * page_size + 1 if total else 0:,}–{min((page + 1) * page_size, total):,} of "
+               f"{total:,} matching · {stats['entries']:,} logged in {stats['files']} files "
+               f"({stats['bytes'] / 1024 / 1024:.1f} MB)")
+    st.dataframe(entries, use_container_width=True, hide_index=True)
+
 @require_admin_auth
 def show_admin_panel(data_manager=None):
     """Main admin panel function"""
@@ -248,86 +371,171 @@ def show_admin_panel(data_manager=None):
     """, unsafe_allow_html=True)
     
     # Create tabs
-    tabs = st.tabs(["📊 Data Management", "💱 Conversion Rates", "👥 User Management", "🔒 Security"])
+    tabs = st.tabs(["📊 Data Management", "💱 Conversion Rates", "👥 User Management", "🔒 Security", "🧮 SQL"])
     
     with tabs[0]:
         st.subheader("📊 Data Management")
         
         # Data upload section
         st.write("**Upload Data Files:**")
+        target_label = st.selectbox("Dataset to replace", ["Host Pay Chart", "Agency Pay Chart"])
+        target = {"Host Pay Chart": "host_pay", "Agency Pay Chart": "agency_pay"}[target_label]
         uploaded_file = st.file_uploader(
             "Upload new pay chart data",
-            type=['csv', 'xlsx', 'json'],
-            help="Upload updated pay chart data in CSV, Excel, or JSON format"
+            type=['csv', 'xlsx', 'json', 'jsonl', 'parquet'],
+            help=f"Columns: {', '.join(PAY_CHART_SCHEMAS[target])}. Limit {UPLOAD_CONFIG['max_file_mb']} MB "
+                 f"and {UPLOAD_CONFIG['max_rows']:,} rows."
         )
         
         if uploaded_file:
-            try:
-                # Read the uploaded file
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
-                elif uploaded_file.name.endswith('.xlsx'):
-                    df = pd.read_excel(uploaded_file)
-                elif uploaded_file.name.endswith('.json'):
-                    df = pd.read_json(uploaded_file)
-                
-                st.success(f"✅ Successfully loaded {uploaded_file.name}")
-                st.dataframe(df.head(), use_container_width=True)
+            data = uploaded_file.getvalue()
+            upload_key = (hashlib.sha256(data).hexdigest(), target)
+            # Parse each distinct upload once per session, not on every rerun
+            if st.session_state.get("upload_ingest_key") != upload_key:
+                progress_bar = st.progress(0.0, text="Reading upload...")
+                try:
+                    result = ingest_upload(
+                        data, uploaded_file.name, target,
+                        progress=lambda fraction, message: progress_bar.progress(fraction, text=message)
+                    )
+                    st.session_state.upload_ingest_result = result
+                    st.session_state.upload_ingest_error = None
+                except ValueError as e:
+                    st.session_state.upload_ingest_result = None
+                    st.session_state.upload_ingest_error = str(e)
+                st.session_state.upload_ingest_key = upload_key
+                progress_bar.empty()
+            
+            result = st.session_state.get("upload_ingest_result")
+            if result is None:
+                st.error(f"❌ Error reading file: {st.session_state.get('upload_ingest_error')}")
+            else:
+                st.success(f"✅ Successfully loaded {uploaded_file.name} ({result.file_format}, "
+                           f"{result.chunks} chunks in {result.seconds:.2f}s)")
+                st.dataframe(result.frame.head(), use_container_width=True)
                 
-                col1, col2 = st.columns(2)
+                col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Rows", len(df))
+                    st.metric("Rows", f"{result.rows:,}")
                 with col2:
-                    st.metric("Columns", len(df.columns))
+                    st.metric("Columns", len(result.frame.columns))
+                with col3:
+                    st.metric("Snapshot Size", f"{result.memory_bytes / 1024:,.1f} KB")
                 
                 if st.button("💾 Save Updated Data", type="primary"):
-                    try:
-                        # Add your actual save logic here
-                        if data_manager:
-                            # data_manager.save_data(df, uploaded_file.name)
-                            pass
-                        st.success("✅ Data updated successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error saving data: {str(e)}")
-                        
-            except Exception as e:
-                st.error(f"❌ Error reading file: {str(e)}")
+                    if data_manager is None:
+                        st.error("❌ Error saving data: no data manager is available")
+                    else:
+                        version = data_manager.set_data(target, result.frame, source=f"upload:{uploaded_file.name}")
+                        audit(UPLOAD, dataset=target, file=uploaded_file.name, rows=result.rows, version=version)
+                        st.success(f"✅ Data updated successfully! {target_label} is now {version}")
+        
+        if data_manager is not None:
+            st.write("**Datasets:**")
+            st.dataframe(data_manager.info(), use_container_width=True, hide_index=True)
         
         st.markdown("---")
         
         # Bulk operations
         st.write("**Bulk Operations:**")
+        cache = get_data_cache()
+        jobs = get_job_runner()
         col1, col2, col3 = st.columns(3)
         
         with col1:
             if st.button("🔄 Refresh All Data", use_container_width=True):
-                with st.spinner("Refreshing data from sources..."):
-                    time.sleep(2)  # Simulate processing
-                    st.success("✅ Data refreshed successfully!")
+                job = jobs.submit(REFRESH_JOB, lambda job: refresh_pk_sources(job.report))
+                audit(REFRESH, scope="all", job=job.id)
+                st.success(f"✅ Refresh started as job #{job.id}")
         
         with col2:
             if st.button("📤 Export All Data", use_container_width=True):
                 with st.spinner("Preparing export package..."):
-                    time.sleep(2)  # Simulate processing
-                    st.success("✅ Export package ready!")
+                    package = build_export_package(data_manager or get_data_manager())
+                # The package lives in the shared cache under its export policy; the session only keeps its key
+                st.session_state.export_package_key = ("all_data", datetime.now().strftime('%Y%m%d_%H%M%S'))
+                cache.put(EXPORT_KIND, st.session_state.export_package_key, package)
+                audit(EXPORT, package="all_data", bytes=len(package))
+                st.success("✅ Export package ready!")
+            export_key = st.session_state.get("export_package_key")
+            package = cache.peek(EXPORT_KIND, export_key) if export_key else None
+            if package:
+                st.download_button(
+                    "📥 Download Export (ZIP)",
+                    data=package,
+                    file_name=f"dashboard_export_{export_key[1]}.zip",
+                    mime="application/zip",
+                    use_container_width=True
+                )
         
         with col3:
             if st.button("🗑️ Clear Cache", use_container_width=True):
-                with st.spinner("Clearing cache..."):
-                    time.sleep(1)
-                    st.success("✅ Cache cleared!")
+                dropped = cache.invalidate()
+                audit(REFRESH, scope="cache", action="clear", entries=dropped)
+                st.success(f"✅ Cache cleared! {dropped} entries dropped")
+        
+        show_job_status(jobs)
+        
+        # Cache control plane
+        st.markdown("---")
+        st.write("**Cached Data:**")
+        st.caption(f"{cache.memory_used() / 1024 / 1024:.1f} MB of {cache.memory_budget / 1024 / 1024:.0f} MB cache budget in use")
+        st.dataframe(cache.stats(), use_container_width=True, hide_index=True)
+        sources = get_source_health().status()
+        if not sources.empty:
+            st.write("**Sheet Sources:**")
+            st.caption("Open sources are served from their last good snapshot until a background probe succeeds.")
+            st.dataframe(sources, use_container_width=True, hide_index=True)
+        st.write("**Google Sheets API:**")
+        quota = get_sheets_scheduler().summary()
+        paused = f", paused {quota['paused_seconds']:.0f}s after a rate limit" if quota["paused_seconds"] else ""
+        st.caption(f"{quota['queued']} calls queued, {quota['tokens']:.1f} requests available now{paused}")
+        st.dataframe(get_sheets_scheduler().stats(), use_container_width=True, hide_index=True)
+        entries = cache.entries()
+        if entries.empty:
+            st.info("Nothing is cached yet; entries appear once a page loads its data.")
+        else:
+            st.dataframe(entries, use_container_width=True, hide_index=True)
+            cached = cache.keys()
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                selected = st.selectbox("Source", cached, format_func=lambda entry_key: f"{entry_key[0]}: {entry_key[1]}")
+            with col2:
+                if st.button("♻️ Refresh Source", use_container_width=True):
+                    try:
+                        with st.spinner(f"Reloading {selected[1]}..."):
+                            reloaded = cache.refresh(*selected)
+                        if reloaded:
+                            audit(REFRESH, scope=selected[0], source=str(selected[1]))
+                            st.success(f"✅ Reloaded {selected[1]}")
+                        else:
+                            st.info(f"ℹ️ {selected[0]} entries are rebuilt on next use; invalidate this one instead")
+                    except Exception as e:
+                        audit(REFRESH, ok=False, scope=selected[0], source=str(selected[1]), error=str(e))
+                        st.error(f"❌ Could not reload {selected[1]}: {str(e)}")
+            with col3:
+                if st.button("🧹 Invalidate Source", use_container_width=True):
+                    cache.invalidate(*selected)
+                    audit(REFRESH, scope=selected[0], source=str(selected[1]), action="invalidate")
+                    st.success(f"✅ {selected[1]} will reload on next use")
     
     with tabs[1]:
         st.subheader("💱 Conversion Rates")
         
+        registry = get_rule_registry()
+        rules = registry.current()
+        
         # Current rates display
-        st.write("**Current Conversion Rates:**")
+        st.write(f"**Current Conversion Rates (rules v{rules.version}):**")
+        scheduled = [r for r in registry.history() if r.effective_at > datetime.now()]
+        if scheduled:
+            st.info("📅 Scheduled: " + ", ".join(f"v{r.version} from {r.effective_from}" for r in scheduled))
         col1, col2 = st.columns(2)
         
         with col1:
             bean_to_diamond = st.number_input(
                 "Beans to Diamond Rate", 
-                value=3.61, 
+                value=float(rules["beans_to_diamonds_rate"]), 
                 step=0.01,
                 format="%.3f",
                 help="How many beans equal 1 diamond"
@@ -336,43 +544,135 @@ def show_admin_panel(data_manager=None):
         with col2:
             diamond_to_usd = st.number_input(
                 "Diamond to USD Rate", 
-                value=0.0036, 
+                value=float(rules["diamond_to_usd_rate"]), 
                 step=0.0001,
                 format="%.4f",
                 help="USD value of 1 diamond"
             )
         
-        # Rate history (placeholder)
-        st.write("**Rate History:**")
-        st.info("Rate history tracking coming soon...")
+        col1, col2 = st.columns(2)
+        with col1:
+            effective_date = st.date_input("Effective from", value=datetime.now().date(),
+                                           help="Backdate to correct past rates, or pick a later date to schedule a change")
+        with col2:
+            effective_time = st.time_input("Time", value=datetime.now().time().replace(second=0, microsecond=0))
         
         if st.button("💰 Update Rates", type="primary"):
             try:
-                if data_manager and hasattr(data_manager, 'update_conversion_rates'):
-                    data_manager.update_conversion_rates(bean_to_diamond, diamond_to_usd)
-                st.success("✅ Conversion rates updated successfully!")
-            except Exception as e:
+                new_rules = (data_manager or get_data_manager()).update_conversion_rates(
+                    bean_to_diamond, diamond_to_usd, effective_from=datetime.combine(effective_date, effective_time)
+                )
+                audit(RULES_UPDATE, version=new_rules.version, effective_from=new_rules.effective_from,
+                      beans_to_diamonds_rate=bean_to_diamond, diamond_to_usd_rate=diamond_to_usd)
+                st.success(f"✅ Conversion rates updated successfully! Rules v{new_rules.version} "
+                           f"in force from {new_rules.effective_from}")
+            except ValueError as e:
                 st.error(f"❌ Error updating rates: {str(e)}")
+        
+        # Payment rules shared by the paysheet and pay calculators
+        st.markdown("---")
+        st.write("**Payment Rules:**")
+        with st.form("payment_rules_form"):
+            changes = {}
+            rule_cols = st.columns(3)
+            editable = [name for name in RULE_SCHEMA if name not in CONVERSION_RULE_KEYS]
+            for i, name in enumerate(editable):
+                with rule_cols[i % 3]:
+                    changes[name] = st.number_input(
+                        name.replace("_", " ").title(),
+                        value=float(rules[name]),
+                        min_value=float(RULE_SCHEMA[name][0]),
+                        help=RULE_SCHEMA[name][2],
+                        key=f"rule_{name}"
+                    )
+            note = st.text_input("Change note", placeholder="Why are the rules changing?")
+            if st.form_submit_button("📝 Publish New Rules Version"):
+                try:
+                    new_rules = registry.update(changes, note=note)
+                    audit(RULES_UPDATE, version=new_rules.version, note=note)
+                    st.success(f"✅ Published payment rules v{new_rules.version}")
+                except ValueError as e:
+                    st.error(f"❌ Invalid rules: {str(e)}")
+        
+        # Conversion rates over time
+        st.markdown("---")
+        st.write("**Rate History:**")
+        timeline = registry.timeline()
+        st.dataframe(timeline, use_container_width=True, hide_index=True)
+        as_of = st.date_input("Rates in force on", value=datetime.now().date(), key="rates_as_of")
+        as_of_rules = registry.rules_at(datetime.combine(as_of, datetime.max.time()))
+        st.caption(f"v{as_of_rules.version}: {as_of_rules['beans_to_diamonds_rate']} beans per diamond, "
+                   f"${as_of_rules['diamond_to_usd_rate']} per diamond")
+        
+        with st.expander("📜 All rule versions"):
+            history_df = pd.DataFrame([
+                {"Version": r.version, "Created": r.created_at, "Effective From": r.effective_from,
+                 "By": r.created_by, "Note": r.note, **dict(r.values)}
+                for r in reversed(registry.history())
+            ])
+            st.dataframe(history_df, use_container_width=True)
+        
+        # Reprice past earnings at the rates in force on each date
+        st.markdown("---")
+        st.write("**Recalculate Past Earnings:**")
+        st.download_button(
+            "📄 Download Template",
+            data=earnings_template().to_csv(index=False),
+            file_name="earnings_template.csv",
+            mime="text/csv"
+        )
+        earnings_file = st.file_uploader(
+            "Dated earnings (date plus beans or diamonds per row)",
+            type=['csv', 'xlsx', 'json', 'jsonl', 'parquet'],
+            key="recalc_upload"
+        )
+        jobs = get_job_runner()
+        if earnings_file is not None and st.button("🧮 Recalculate", type="primary"):
+            try:
+                earnings = read_earnings(earnings_file.getvalue(), earnings_file.name)
+                job = jobs.submit(RECALC_JOB, lambda job: recalculate_earnings(earnings, registry, progress=job.report))
+                audit(EXPORT, package="recalculated_earnings", file=earnings_file.name, rows=len(earnings), job=job.id)
+                st.success(f"✅ Recalculation of {len(earnings):,} rows started as job #{job.id}")
+            except ValueError as e:
+                st.error(f"❌ Error reading earnings: {str(e)}")
+        show_job_status(jobs, RECALC_JOB, show_recalc_result)
     
     with tabs[2]:
         st.subheader("👥 User Management")
         
-        # User statistics
+        # User statistics (process-wide, since the server started)
+        telemetry = get_telemetry()
+        window = st.selectbox("Window", [15, 60, 240, 1440], index=1, key="telemetry_window",
+                              format_func=lambda minutes: f"Last {minutes // 60}h" if minutes >= 60 else f"Last {minutes}m")
+        summary = telemetry.summary(window)
         st.write("**User Statistics:**")
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Active Users", "42", "↑12%")
+            st.metric("Active Users", summary["active_users"], help="Sessions that reran in the last 5 minutes")
         with col2:
-            st.metric("Total Sessions", "158", "↑5%")
+            st.metric("Total Sessions", summary["total_sessions"])
         with col3:
-            st.metric("Avg Session Time", "23m", "↓2%")
+            st.metric("Avg Session Time", f"{summary['avg_session_seconds'] / 60:.0f}m")
+        with col4:
+            st.metric("Page Views", summary["page_views"], summary["page_views"] - summary["previous_page_views"])
+        st.caption(f"{summary['runs']:,} reruns, {summary['avg_run_ms']:.0f} ms average, "
+                   f"{summary['max_run_ms']:.0f} ms slowest")
         
         st.markdown("---")
         
         # User activity monitoring
         st.write("**Recent User Activity:**")
-        st.info("📊 User activity monitoring features coming soon...")
+        activity = telemetry.minutes(window)
+        if activity.empty:
+            st.info("📊 No activity recorded in this window yet.")
+        else:
+            st.line_chart(activity.set_index("Minute")[["Sessions", "Page Views"]])
+            col1, col2 = st.columns(2)
+            with col1:
+                st.dataframe(telemetry.pages(window), use_container_width=True, hide_index=True)
+            with col2:
+                st.dataframe(activity.sort_values("Minute", ascending=False), use_container_width=True, hide_index=True)
         
         # User permissions
         st.write("**User Permissions:**")
@@ -389,12 +689,14 @@ def show_admin_panel(data_manager=None):
             if st.button("🔄 Change Password", use_container_width=True):
                 st.info("Password change interface coming soon...")
             
-            if st.button("🚨 Clear All Sessions", use_container_width=True):
-                st.warning("⚠️ This will log out all users!")
-                # Add confirmation logic here
+            confirm_clear = st.checkbox("I understand this logs out every user, including me", key="confirm_clear_sessions")
+            if st.button("🚨 Clear All Sessions", use_container_width=True, disabled=not confirm_clear):
+                cleared = get_session_registry().revoke_all()
+                audit(SESSIONS_CLEARED, sessions=cleared)
+                st.warning(f"⚠️ {cleared} sessions cleared. Everyone must log in again.")
             
             if st.button("📋 View Access Logs", use_container_width=True):
-                st.info("Access logs viewer coming soon...")
+                st.session_state.show_access_logs = not st.session_state.get("show_access_logs", False)
         
         with col2:
             st.write("**System Status:**")
@@ -406,17 +708,52 @@ def show_admin_panel(data_manager=None):
             
             # Security metrics
             st.write("**Security Metrics:**")
-            st.metric("Failed Login Attempts (24h)", "3")
-            st.metric("Active Sessions", "7")
+            st.metric("Failed Login Attempts (24h)",
+                      get_audit_log().count(LOGIN_FAILED, since=datetime.now() - timedelta(hours=24)))
+            st.metric("Active Sessions", get_session_registry().count())
+        
+        with st.expander("🔑 Active Sessions"):
+            st.dataframe(get_session_registry().sessions(), use_container_width=True, hide_index=True)
+        
+        if st.session_state.get("show_access_logs"):
+            show_access_logs()
+    
+    with tabs[4]:
+        st.subheader("🧮 SQL Query")
+        
+        # Loading the PK sheets keeps the pk_snapshot table current
+        load_all_data()
+        engine = get_query_engine()
+        
+        st.write(f"**Tables ({engine.backend}):**")
+        st.dataframe(engine.tables(), use_container_width=True, hide_index=True)
+        
+        sql = st.text_area(
+            "Query",
+            value="SELECT agency_1, COUNT(*) AS matches FROM pk_snapshot GROUP BY agency_1 ORDER BY matches DESC LIMIT 10",
+            height=120,
+            help="Read-only SELECT, WITH or EXPLAIN statements"
+        )
+        if st.button("▶️ Run Query", type="primary"):
+            try:
+                result, elapsed_ms, cached, truncated = engine.query(sql)
+                st.caption(f"⏱️ {elapsed_ms:.1f} ms{' (cached)' if cached else ''} · {len(result):,} rows")
+                if truncated:
+                    st.warning(f"⚠️ Showing the first {len(result):,} rows")
+                st.dataframe(result, use_container_width=True)
+            except ValueError as e:
+                st.error(f"❌ Query failed: {str(e)}")
 
 # Main function to run the admin panel
 def main():
     """Main function to run admin panel"""
+    begin_run("Admin Panel")
     try:
-        show_admin_panel()
+        show_admin_panel(get_data_manager())
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
         st.info("Please contact the system administrator if this problem persists.")
+    end_run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
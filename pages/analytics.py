@@ -1,7 +1,9 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+from config.settings import CHART_CONFIG
+from utils.charts import line_figure
+from utils.data_manager import get_data_manager
+from utils.telemetry import begin_run, end_run
 
 def show_analytics(data_manager, user_role):
     st.markdown('<div class="main-header"><h1>📊 Analytics Dashboard</h1></div>', 
@@ -28,24 +30,20 @@ def show_analytics(data_manager, user_role):
     
     with col1:
         # Host Pay Progression
-        fig1 = px.line(host_data, x='Ranking', y='Salary in Diamonds', 
-                      title='Host Salary Progression',
-                      markers=True)
-        fig1.update_layout(xaxis_tickangle=-45)
+        fig1 = line_figure(host_data, 'Ranking', {'Salary in Diamonds': 'Salary in Diamonds'},
+                           title='Host Salary Progression', version=data_manager.version('host_pay'),
+                           width_px=CHART_CONFIG["width_px"] // 2, markers=True,
+                           layout={'xaxis_tickangle': -45, 'yaxis_title': 'Salary in Diamonds'})
         st.plotly_chart(fig1, use_container_width=True)
     
     with col2:
         # Agency vs Host Comparison
-        comparison_data = host_data.merge(agency_data, on='Ranking', suffixes=('_host', '_agency'))
-        fig2 = go.Figure()
-        fig2.add_trace(go.Scatter(x=comparison_data['Ranking'], 
-                                 y=comparison_data['Salary in Diamonds'], 
-                                 name='Host Salary', mode='lines+markers'))
-        fig2.add_trace(go.Scatter(x=comparison_data['Ranking'], 
-                                 y=comparison_data['Total Remuneration (USD)'], 
-                                 name='Agency Pay', mode='lines+markers'))
-        fig2.update_layout(title='Host vs Agency Pay Comparison',
-                          xaxis_tickangle=-45)
+        comparison_data = data_manager.pay_comparison()
+        fig2 = line_figure(comparison_data, 'Ranking',
+                           {'Host Salary': 'Salary in Diamonds', 'Agency Pay': 'Total Remuneration (USD)'},
+                           title='Host vs Agency Pay Comparison', version=comparison_data.attrs.get('version', ''),
+                           width_px=CHART_CONFIG["width_px"] // 2, markers=True,
+                           layout={'xaxis_tickangle': -45})
         st.plotly_chart(fig2, use_container_width=True)
     
     # Interactive filters
@@ -70,4 +68,11 @@ def show_analytics(data_manager, user_role):
             data=csv,
             file_name=f"filtered_analysis_{len(ranking_filter)}_rankings.csv",
             mime="text/csv"
-        )
\ No newline at end of file
+        )
+
+
+if __name__ == "__main__":
+    begin_run("Analytics")
+    # Opened directly, a session that never picked a role gets the least privileged one
+    show_analytics(get_data_manager(), st.session_state.get('user_role', 'Host'))
+    end_run()
@@ -0,0 +1,49 @@
+"""
+Audit log rotation and retention, and an index kept in step with the files on disk.
+"""
+
+import glob
+import gzip
+import os
+
+import pytest
+
+from utils.audit_log import LOGIN, REFRESH, AuditLog
+
+
+def lines_on_disk(root) -> int:
+    total = 0
+    for path in glob.glob(os.path.join(root, "audit*.jsonl*")):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_rotation_keeps_index_in_step_with_files(tmp_path, compress):
+    root = str(tmp_path)
+    log = AuditLog(root, max_file_mb=2 / 1024, max_files=3, compress=compress)
+    log.count()  # build the index first so rotations update it in place
+    for i in range(300):
+        log.record(LOGIN if i % 3 else REFRESH, user=f"user{i % 4}", attempt=i)
+
+    rotated = glob.glob(os.path.join(root, "audit-*"))
+    assert len(rotated) == 3
+    assert all(path.endswith(".gz") == compress for path in rotated)
+    assert all(os.path.getsize(path) < 4096 for path in glob.glob(os.path.join(root, "audit*.jsonl")))
+
+    # Entries in deleted files leave the index; the rest match a fresh scan of the directory
+    kept = lines_on_disk(root)
+    assert 0 < kept < 300
+    fresh = AuditLog(root, max_file_mb=2 / 1024, max_files=3, compress=compress)
+    assert log.count() == fresh.count() == kept
+    assert log.count(event=REFRESH, user="user0") == fresh.count(event=REFRESH, user="user0")
+    assert log.stats()["files"] == fresh.stats()["files"] == 4
+
+    page, total = log.query(user="user1", page_size=10)
+    fresh_page, fresh_total = fresh.query(user="user1", page_size=10)
+    assert total == fresh_total
+    assert page["Detail"].tolist() == fresh_page["Detail"].tolist()
+    # Newest first, so the page starts with the last entry written by user1
+    assert page["Detail"].iloc[0] == '{"attempt": 297}'
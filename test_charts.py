@@ -0,0 +1,48 @@
+"""
+LTTB downsampling keeps the shape of a series within the point budget.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.charts import downsample, line_figure, lttb, point_budget
+
+
+def test_lttb_keeps_endpoints_count_and_extremes():
+    rng = np.random.default_rng(1)
+    x = np.arange(10_000, dtype=np.float64)
+    y = rng.normal(size=len(x))
+    y[4321], y[7777] = 50.0, -50.0
+
+    kept = lttb(x, y, 200)
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert 4321 in kept and 7777 in kept
+
+
+def test_lttb_returns_everything_under_budget():
+    y = np.array([3.0, 1.0, 2.0])
+    assert lttb(np.arange(3), y, 10).tolist() == [0, 1, 2]
+    assert lttb(np.arange(3), y, 2).tolist() == [0, 1, 2]
+
+
+def test_downsample_skips_missing_values():
+    frame = pd.DataFrame({
+        "day": pd.date_range("2026-01-01", periods=1000, freq="h"),
+        "value": np.where(np.arange(1000) % 10 == 0, np.nan, np.sin(np.arange(1000) / 20)),
+    })
+    points = downsample(frame, "day", "value", 50)
+    assert len(points) == 50
+    assert points["value"].notna().all()
+    assert points["day"].iloc[0] == frame["day"].iloc[1] and points["day"].iloc[-1] == frame["day"].iloc[-1]
+
+
+def test_zoomed_window_shows_more_of_its_points():
+    frame = pd.DataFrame({"x": np.arange(100_000), "y": np.cos(np.arange(100_000) / 500)})
+    full = line_figure(frame, "x", {"y": "y"}, "test chart", version="v1", width_px=400)
+    zoomed = line_figure(frame, "x", {"y": "y"}, "test chart", version="v1", width_px=400, window=(1000, 1099))
+
+    assert full["layout"]["meta"] == {"points": point_budget(400), "total": 100_000}
+    # Every point of a window narrower than the budget is drawn
+    assert zoomed["layout"]["meta"] == {"points": 100, "total": 100}
@@ -0,0 +1,212 @@
+"""
+Single-flight loading, early refresh, invalidation and eviction in the shared data cache.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import data_cache
+from utils.data_cache import LFU, LRU, MB, DataCache
+
+KIND = "test"
+
+
+def coalesced(cache: DataCache) -> int:
+    stats = cache.stats().set_index("Kind")
+    return int(stats.loc[KIND, "Coalesced"]) if KIND in stats.index else 0
+
+
+def wait_for_waiters(cache: DataCache, waiters: int):
+    deadline = time.monotonic() + 5
+    while coalesced(cache) < waiters and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def concurrent_gets(cache: DataCache, loader, callers: int = 8):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(cache.get(KIND, "key", loader))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_misses_share_one_load():
+    cache = DataCache(policies={KIND: {"ttl": 60}})
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    threads, results, errors = concurrent_gets(cache, loader)
+    wait_for_waiters(cache, 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 8 and not errors
+    stats = cache.stats().set_index("Kind").loc[KIND]
+    assert stats["Misses"] == 8 and stats["Coalesced"] == 7
+
+
+def test_failed_load_reaches_every_waiter_and_is_retried():
+    cache = DataCache(policies={KIND: {"ttl": 60}})
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("sheet down")
+
+    threads, results, errors = concurrent_gets(cache, failing, callers=4)
+    wait_for_waiters(cache, 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert not results and len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    assert cache.get(KIND, "key", lambda: "recovered") == "recovered"
+
+
+def test_early_refresh_serves_current_value_and_reloads_in_background():
+    cache = DataCache(policies={KIND: {"ttl": 2.0, "early_refresh": 1.9}})
+    versions = iter(["first", "second"])
+    assert cache.get(KIND, "key", lambda: next(versions)) == "first"
+
+    time.sleep(0.2)
+    loaded = threading.Event()
+
+    def reload():
+        value = next(versions)
+        loaded.set()
+        return value
+
+    # Inside the early-refresh window: the read is a hit and the reload runs behind it
+    assert cache.get(KIND, "key", reload) == "first"
+    assert loaded.wait(5)
+    deadline = time.monotonic() + 5
+    while cache.peek(KIND, "key") != "second" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.peek(KIND, "key") == "second"
+    stats = cache.stats().set_index("Kind").loc[KIND]
+    assert stats["Early Refreshes"] == 1 and stats["Misses"] == 1
+
+
+def test_failed_early_refresh_keeps_current_value():
+    cache = DataCache(policies={KIND: {"ttl": 2.0, "early_refresh": 1.9}})
+    cache.get(KIND, "key", lambda: "first")
+    time.sleep(0.2)
+
+    def failing():
+        raise ValueError("sheet down")
+
+    assert cache.get(KIND, "key", failing) == "first"
+    time.sleep(0.2)
+    assert cache.peek(KIND, "key") == "first"
+
+
+def test_invalidation_drops_only_the_selected_entries():
+    cache = DataCache(policies={KIND: {"ttl": 60}, "other": {"ttl": 60}})
+    for key in ("sheet-a", "sheet-b", "tab-a"):
+        cache.put(KIND, key, key.upper())
+    cache.put("other", "sheet-a", "kept")
+
+    assert cache.invalidate(KIND, "sheet-a") == 1
+    assert cache.invalidate(KIND, match=lambda key: key.startswith("tab")) == 1
+    assert cache.keys() == [(KIND, "sheet-b"), ("other", "sheet-a")]
+    assert cache.invalidate() == 2 and cache.keys() == []
+
+
+def test_refresh_reloads_an_entry_with_its_own_loader():
+    cache = DataCache(policies={KIND: {"ttl": 60, "refreshable": True}, "fixed": {"ttl": 60}})
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get(KIND, "key", loader) == 1
+    stamp = cache.stamp(KIND, "key")
+    assert cache.refresh(KIND, "key")
+    assert cache.peek(KIND, "key") == 2 and cache.stamp(KIND, "key") > stamp
+    # Nothing to reload for a missing entry or a kind that keeps no loader
+    assert not cache.refresh(KIND, "missing")
+    cache.get("fixed", "key", loader)
+    assert not cache.refresh("fixed", "key")
+
+
+@pytest.fixture
+def ticking_clock(monkeypatch):
+    """Every read of the clock moves it on a second, so entries never tie on last use."""
+    now = [0.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(data_cache, "time", SimpleNamespace(time=tick, perf_counter=time.perf_counter))
+
+
+def test_lru_evicts_the_least_recently_used_entry(ticking_clock):
+    cache = DataCache(policies={KIND: {"ttl": 1e9, "max_entries": 3, "eviction": LRU}})
+    for key in "abc":
+        cache.put(KIND, key, key)
+    cache.peek(KIND, "a")
+    cache.put(KIND, "d", "d")
+    assert sorted(key for _, key in cache.keys()) == ["a", "c", "d"]
+    cache.put(KIND, "e", "e")
+    assert sorted(key for _, key in cache.keys()) == ["a", "d", "e"]
+    assert cache.stats().set_index("Kind").loc[KIND, "Evictions"] == 2
+
+
+def test_lfu_evicts_the_least_used_entry(ticking_clock):
+    cache = DataCache(policies={KIND: {"ttl": 1e9, "max_entries": 3, "eviction": LFU}})
+    for key in "abc":
+        cache.put(KIND, key, key)
+    for _ in range(3):
+        cache.peek(KIND, "a")
+    cache.peek(KIND, "b")
+    cache.peek(KIND, "c")
+    # b and c tie on use; the less recently used of them goes
+    cache.put(KIND, "d", "d")
+    assert sorted(key for _, key in cache.keys()) == ["a", "c", "d"]
+    # d has been used least, even though it is the newest
+    cache.put(KIND, "e", "e")
+    assert sorted(key for _, key in cache.keys()) == ["a", "c", "e"]
+
+
+def test_kind_memory_limit_and_oversized_values(ticking_clock):
+    cache = DataCache(policies={KIND: {"ttl": 1e9, "max_mb": 1000 / MB}})
+    for key in "abc":
+        cache.put(KIND, key, b"x" * 400)
+    assert [key for _, key in cache.keys()] == ["b", "c"]
+
+    # A value over the kind's limit is returned but not cached, and nothing is evicted for it
+    assert cache.put(KIND, "big", b"x" * 1001) == b"x" * 1001
+    assert cache.peek(KIND, "big") is None
+    assert [key for _, key in cache.keys()] == ["b", "c"]
+    stats = cache.stats().set_index("Kind").loc[KIND]
+    assert stats["Too Large"] == 1 and stats["Evictions"] == 1
+
+
+def test_memory_budget_evicts_across_kinds(ticking_clock):
+    cache = DataCache(policies={KIND: {"ttl": 1e9}, "other": {"ttl": 1e9}}, memory_budget_mb=1000 / MB)
+    cache.put(KIND, "a", b"x" * 400)
+    cache.put("other", "a", b"x" * 400)
+    cache.peek(KIND, "a")
+    cache.put("other", "b", b"x" * 400)
+    # The least recently used entry goes, whatever its kind
+    assert cache.keys() == [(KIND, "a"), ("other", "b")]
+    assert cache.memory_used() == 800
@@ -0,0 +1,31 @@
+"""
+Frames handed out by the DataManager are the caller's own: edits never reach the shared copy.
+"""
+
+import pandas as pd
+
+from utils.data_manager import DataManager
+
+
+def test_loaded_frames_are_isolated():
+    manager = DataManager()
+    manager.register_loader("sample", lambda: pd.DataFrame({"Target Beans": [100, 200]}))
+    df = manager.load_data("sample")
+    df.loc[0, "Target Beans"] = 1
+    df["new"] = 1
+
+    fresh = manager.load_data("sample")
+    assert fresh["Target Beans"].tolist() == [100, 200]
+    assert "new" not in fresh.columns
+    assert fresh.attrs["version"] == "sample@1"
+
+
+def test_derived_frames_are_isolated():
+    manager = DataManager()
+    manager.register_loader("sample", lambda: pd.DataFrame({"a": [1, 2]}))
+    build = lambda df: df.assign(b=df["a"] * 2)
+    derived = manager.derived("doubled", ["sample"], build)
+    derived.loc[0, "b"] = -1
+
+    assert manager.derived("doubled", ["sample"], build)["b"].tolist() == [2, 4]
+    assert manager.load_data("sample")["a"].tolist() == [1, 2]
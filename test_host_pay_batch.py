@@ -0,0 +1,34 @@
+"""
+Batch totals must equal the exact minor-unit sums of the host pay engine.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.settings import PAYMENT_CONFIG
+from utils.calculators import calculate_host_pay_columns
+from utils.host_pay_batch import BREAKDOWN_COLUMNS, batch_totals, calculate_host_pay_batch
+from utils.payment_rules import RuleSet
+
+
+def test_batch_totals_match_engine_minor_units():
+    rng = np.random.default_rng(5)
+    n = 20_000
+    metrics = pd.DataFrame({
+        "host_id": np.arange(n).astype(str),
+        "host_name": "host",
+        "diamonds_earned": rng.integers(0, 80_000, n),
+        "hours_streamed": rng.integers(0, 20_000, n) / 100,
+        "pk_wins": rng.integers(0, 40, n),
+        "pk_losses": rng.integers(0, 40, n),
+        "tasks_completed": rng.integers(0, 30, n),
+        "events_participated": rng.integers(0, 5, n),
+        "other_deductions": rng.integers(0, 5_000, n) / 100,
+    })
+    rules = RuleSet(1, PAYMENT_CONFIG, "2026-01-01")
+
+    totals = batch_totals(calculate_host_pay_batch(metrics, rules))
+
+    breakdown = calculate_host_pay_columns(metrics, rules.values)
+    for key, column in BREAKDOWN_COLUMNS.items():
+        assert round(totals[column] * 100) == int(breakdown[key].sum())
@@ -0,0 +1,67 @@
+"""
+Background jobs run one at a time per name, report how they ended and keep a bounded history.
+"""
+
+import threading
+import time
+
+from utils.jobs import DONE, FAILED, MAX_FINISHED_JOBS, JobRunner
+
+
+def wait_for(job, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished_at is not None
+
+
+def test_one_active_job_per_name():
+    runner = JobRunner()
+    release = threading.Event()
+
+    def work(job):
+        job.report(0.5, "Halfway")
+        release.wait(5)
+        return "refreshed"
+
+    first = runner.submit("refresh", work)
+    again = runner.submit("refresh", work)
+    other = runner.submit("export", lambda job: "exported")
+    assert again is first and other is not first
+
+    release.set()
+    wait_for(first)
+    assert first.state == DONE and first.progress == 1.0 and first.result == "refreshed"
+    # Once the first has finished the name can run again
+    second = runner.submit("refresh", lambda job: None)
+    assert second is not first and runner.latest("refresh") is second
+    wait_for(second)
+
+
+def test_failed_job_records_its_error():
+    runner = JobRunner()
+
+    def work(job):
+        raise RuntimeError("sheet unavailable")
+
+    job = runner.submit("refresh", work)
+    wait_for(job)
+    assert job.state == FAILED and job.error == "sheet unavailable"
+    assert runner.jobs().iloc[0]["Message"] == "sheet unavailable"
+
+
+def test_finished_jobs_are_pruned_oldest_first():
+    runner = JobRunner()
+    release = threading.Event()
+    running = runner.submit("long", lambda job: release.wait(5))
+    for i in range(MAX_FINISHED_JOBS + 5):
+        wait_for(runner.submit(f"quick {i}", lambda job: None))
+    runner.submit("last", lambda job: None)
+
+    # The running job is never pruned, however old it is
+    assert runner.get(running.id) is running
+    finished = [job for job in runner.jobs()["Name"] if job.startswith("quick")]
+    assert len(finished) == MAX_FINISHED_JOBS
+    assert "quick 0" not in finished and f"quick {MAX_FINISHED_JOBS + 4}" in finished
+    release.set()
+    wait_for(running)
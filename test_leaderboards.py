@@ -0,0 +1,49 @@
+"""
+Payout boards count each uploaded batch once, however often it is recalculated.
+"""
+
+from datetime import date
+
+import pandas as pd
+
+from config.settings import PAYMENT_CONFIG
+from utils.host_pay_batch import calculate_host_pay_batch
+from utils.leaderboards import DIAMONDS, HOST, PAYOUT, Leaderboards
+from utils.payment_rules import RuleSet
+
+DAY = date(2026, 3, 2)
+METRICS = pd.DataFrame({
+    "host_id": ["1", "2", "2"],
+    "host_name": ["Ann", "Ben", "Ben"],
+    "diamonds_earned": [1500, 1200, 800],
+    "hours_streamed": [10.0, 20.0, 5.0],
+    "pk_wins": [1, 2, 0],
+    "pk_losses": [0, 1, 0],
+    "tasks_completed": [0, 3, 1],
+    "events_participated": [0, 0, 1],
+    "other_deductions": [0.0, 1.5, 0.0],
+})
+
+
+def board(boards: Leaderboards, metric: str) -> dict:
+    top = boards.top(HOST, metric, n=10, period="day", day=DAY)
+    return dict(zip(top["Host ID"], top.iloc[:, 2]))
+
+
+def test_rerun_at_other_rates_replaces_batch_totals():
+    rules = RuleSet(1, PAYMENT_CONFIG, "2026-01-01")
+    boards = Leaderboards()
+    for hourly_rate in (5.0, 7.5, 4.0):
+        results = calculate_host_pay_batch(METRICS, rules, overrides={"hourly_rate": hourly_rate})
+        boards.record_payouts(results, batch="upload-a", day=DAY)
+
+    assert board(boards, DIAMONDS) == {"2": 2000, "1": 1500}
+    # Only the last run's net pay counts
+    last = results.groupby("host_id")["Net Pay"].sum().round(2)
+    assert board(boards, PAYOUT) == {host: last[host] for host in ("1", "2")}
+    assert boards.top(HOST, DIAMONDS, n=10)["Diamonds"].sum() == 3500
+
+    # An unchanged rerun leaves the boards alone; another upload adds to them
+    assert not boards.record_payouts(results, batch="upload-a", day=DAY)
+    assert boards.record_payouts(results, batch="upload-b", day=DAY)
+    assert board(boards, DIAMONDS) == {"2": 4000, "1": 3000}
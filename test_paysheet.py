@@ -0,0 +1,113 @@
+"""
+Paysheet amounts in exact minor units, the columnar engine checked against per-host pay,
+and the generator widget across Streamlit reruns.
+"""
+
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from config.settings import PAYMENT_CONFIG
+from utils import paysheet
+from utils.payment_rules import PAYSHEET_RULE_KEYS
+from utils.money import to_minor_units
+from utils.paysheet import (MONEY_COLUMNS, HostPayment, calculate_payment_columns, generate_paysheet,
+                            paysheet_in_currency, summarize_paysheet)
+
+RULES = {key: PAYMENT_CONFIG[key] for key in PAYSHEET_RULE_KEYS}
+
+ROSTER_CSV = b"id,name,diamonds_earned,pk_wins\n1,Ann,12000,3\n2,Ben,oops,1\n3,Cy,500,0\n"
+
+
+def test_money_columns_are_exact_cents_rounded_half_up():
+    # 0.125 of a cent per diamond: 4 diamonds is exactly half a cent, 12 is a cent and a half
+    rules = {**RULES, "base_rate": 0.00125, "bonus_threshold": 100, "pk_win_bonus": 0.005, "attendance_bonus": 0}
+    sheet = generate_paysheet([
+        {"id": "1", "name": "A", "diamonds_earned": 4, "pk_wins": 1, "deductions": 0.01},
+        {"id": "2", "name": "B", "diamonds_earned": 12, "pk_wins": 3},
+        {"id": "3", "name": "C", "diamonds_earned": 3, "additional_bonuses": 1.005},
+    ], rules=rules)
+
+    for column in MONEY_COLUMNS:
+        assert sheet[column].dtype == np.int64
+    assert sheet["Base Payment"].tolist() == [1, 2, 0]
+    assert sheet["PK Bonus"].tolist() == [1, 2, 0]
+    assert sheet["Additional Bonuses"].tolist() == [0, 0, 101]
+    assert sheet["Final Payment"].tolist() == [1, 4, 101]
+
+    summary = summarize_paysheet(sheet)
+    assert summary == {"hosts": 3, "total_payout": 106, "average_payout": 35}
+    assert paysheet_in_currency(sheet)["Final Payment"].tolist() == [0.01, 0.04, 1.01]
+
+
+def test_columnar_paysheet_matches_per_host_calculation(monkeypatch):
+    monkeypatch.setattr(paysheet, "active_rules", lambda: SimpleNamespace(values=RULES))
+    rng = np.random.default_rng(7)
+    hosts = 500
+    roster = pd.DataFrame({
+        "id": [str(i) for i in range(hosts)],
+        "name": [f"Host {i}" for i in range(hosts)],
+        "diamonds_earned": rng.integers(0, 200_000, hosts),
+        "pk_wins": rng.integers(0, 40, hosts),
+        "days_worked": rng.integers(0, 31, hosts),
+        "target_days": rng.integers(20, 31, hosts),
+        "additional_bonuses": rng.integers(0, 5000, hosts) / 100,
+        "deductions": rng.integers(0, 500_000, hosts) / 100,
+    })
+    sheet = generate_paysheet(roster)
+
+    expected = []
+    for row in roster.itertuples():
+        host = HostPayment(row.id, row.name)
+        host.diamonds_earned, host.pk_wins, host.days_worked = row.diamonds_earned, row.pk_wins, row.days_worked
+        host.target_days, host.additional_bonuses, host.deductions = (row.target_days, row.additional_bonuses,
+                                                                       row.deductions)
+        payment = host.calculate_total_payment()
+        expected.append({column: to_minor_units(payment[key]) for column, key in MONEY_COLUMNS.items()})
+    assert sheet[list(MONEY_COLUMNS)].to_dict("records") == expected
+    # Large deductions clamp at zero rather than going negative
+    assert (sheet["Final Payment"] >= 0).all() and (sheet["Final Payment"] == 0).any()
+
+
+def test_missing_roster_columns_take_their_defaults():
+    sheet = generate_paysheet([{"id": "1", "name": "Ann", "diamonds_earned": 10_000, "pk_wins": None}], rules=RULES)
+    scalar = calculate_payment_columns(10_000, 0, 0, rules=RULES)
+    assert sheet["PK Wins"].tolist() == [0] and sheet["Attendance Bonus"].tolist() == [0]
+    assert sheet["Final Payment"].tolist() == [int(scalar["final_payment"])]
+
+
+class Upload(io.BytesIO):
+    name = "roster.csv"
+
+
+def generator_app():
+    from utils.paysheet import paysheet_generator_widget
+
+    paysheet_generator_widget()
+
+
+def test_unchanged_upload_is_imported_once(monkeypatch):
+    imports = []
+    real_import = paysheet.import_roster_upload
+
+    def counting_import(uploaded_file, content_hash):
+        imports.append(content_hash)
+        return real_import(uploaded_file, content_hash)
+
+    monkeypatch.setattr(paysheet, "import_roster_upload", counting_import)
+    monkeypatch.setattr(st, "file_uploader", lambda *args, **kwargs: Upload(ROSTER_CSV))
+
+    at = AppTest.from_function(generator_app, default_timeout=30)
+    at.run()
+    at.run()
+    at.run()
+
+    assert not at.exception
+    assert len(imports) == 1
+    assert len(at.session_state["roster"]) == 2
+    # The skipped row is still reported on reruns that do not import
+    assert any("invalid values" in warning.value for warning in at.warning)
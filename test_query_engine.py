@@ -0,0 +1,45 @@
+"""
+The admin SQL box runs exactly one read-only query and cannot reach files on the server.
+"""
+
+import pandas as pd
+import pytest
+
+from utils import query_engine
+from utils.query_engine import QueryEngine
+
+
+@pytest.fixture(params=["duckdb", "sqlite"])
+def engine(request, monkeypatch):
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    else:
+        monkeypatch.setattr(query_engine, "duckdb", None)
+    engine = QueryEngine()
+    engine.register("sample", pd.DataFrame({"Agency": ["Alpha", "Bravo"], "Wins": [3, 5]}))
+    return engine
+
+
+def test_semicolon_inside_literal(engine):
+    result, _, _, _ = engine.query("SELECT agency, 'a;b' AS note FROM sample ORDER BY agency;")
+    assert result["note"].tolist() == ["a;b", "a;b"]
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1; DROP TABLE sample",
+    "DELETE FROM sample",
+    "SET enable_external_access = true",
+])
+def test_rejects_anything_but_one_query(engine, sql):
+    with pytest.raises(ValueError):
+        engine.query(sql)
+    assert engine.query("SELECT COUNT(*) AS n FROM sample")[0]["n"].tolist() == [2]
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM read_csv('google_credentials.json')",
+    "SELECT * FROM read_text('requirements.txt')",
+])
+def test_cannot_read_server_files(engine, sql):
+    with pytest.raises(ValueError):
+        engine.query(sql)
@@ -0,0 +1,46 @@
+"""
+Recalculated earnings total exactly in minor units across chunks and rule versions.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.money import apply_rate
+from utils.payment_rules import RuleRegistry
+from utils.rate_recalc import (
+    USD_MINOR_COLUMN, export_earnings, monthly_totals, recalc_summary, recalculate_earnings
+)
+
+
+def test_totals_sum_row_minor_units(tmp_path):
+    registry = RuleRegistry(str(tmp_path / "payment_rules.json"))
+    registry.update({"diamond_to_usd_rate": 0.0047}, effective_from=datetime(2025, 2, 1))
+
+    rng = np.random.default_rng(9)
+    n = 5_000
+    earnings = pd.DataFrame({
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 59, n), unit="D"),
+        "host_id": "1",
+        "diamonds": rng.integers(0, 100_000, n) / 1000,
+    })
+    results = recalculate_earnings(earnings, registry, chunk_rows=700)
+
+    usd_rate = np.where(earnings["date"] < pd.Timestamp("2025-02-01"), 0.005, 0.0047)
+    cents = apply_rate(earnings["diamonds"].to_numpy(), usd_rate)
+    np.testing.assert_array_equal(results[USD_MINOR_COLUMN].to_numpy(), cents)
+
+    summary = recalc_summary(results)
+    assert summary["versions"] == 2
+    assert round(summary["usd"] * 100) == int(cents.sum())
+    assert round(monthly_totals(results)["USD"].sum() * 100) == int(cents.sum())
+    assert USD_MINOR_COLUMN not in export_earnings(results).columns
+
+
+def test_empty_earnings(tmp_path):
+    registry = RuleRegistry(str(tmp_path / "payment_rules.json"))
+    earnings = pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "beans": pd.Series(dtype="float64")})
+    results = recalculate_earnings(earnings, registry)
+    assert recalc_summary(results) == {"rows": 0, "versions": 0, "diamonds": 0.0, "usd": 0.0}
+    assert monthly_totals(results).empty
@@ -0,0 +1,53 @@
+"""
+Scenario sweeps must price every host exactly as the paysheet engine does under the same rules.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.settings import PAYMENT_CONFIG
+from utils.payment_rules import PAYSHEET_RULE_KEYS
+from utils.paysheet import build_roster
+from utils.scenarios import _baseline_payments, build_scenario_grid, run_scenarios, scenario_host_deltas
+
+RULES = {key: PAYMENT_CONFIG[key] for key in PAYSHEET_RULE_KEYS}
+
+
+def make_roster(n: int = 50, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(n).astype(str),
+        "name": [f"Host {i}" for i in range(n)],
+        "diamonds_earned": rng.integers(0, 30000, n),
+        "pk_wins": rng.integers(0, 20, n),
+        "days_worked": rng.integers(0, 31, n),
+        "additional_bonuses": rng.integers(0, 500, n).astype(float),
+        "deductions": rng.integers(0, 300, n).astype(float),
+    })
+
+
+def test_fractional_threshold_matches_paysheet():
+    roster = make_roster()
+    rules = {**RULES, "bonus_threshold": 10000.5}
+    grid = build_scenario_grid({"bonus_threshold": [10000.5, 12000.25]}, base_rules=rules)
+
+    summary, host_deltas = run_scenarios(roster, grid, baseline_rules=rules, include_host_deltas=True)
+
+    assert summary.loc[0, "Delta vs Baseline"] == 0
+    assert not host_deltas[0].any()
+    expected = _baseline_payments(build_roster(roster), {**rules, "bonus_threshold": 12000.25})
+    assert summary.loc[1, "Total Payout"] == expected.sum() / 100
+
+
+def test_host_deltas_are_opt_in_and_match_single_scenario():
+    roster = make_roster()
+    grid = build_scenario_grid({"base_rate": [0.3, 0.4, 0.5], "pk_win_bonus": [400, 600]}, base_rules=RULES)
+
+    summary, no_deltas = run_scenarios(roster, grid, baseline_rules=RULES)
+    assert no_deltas is None
+
+    _, host_deltas = run_scenarios(roster, grid, baseline_rules=RULES, include_host_deltas=True)
+    for position in range(len(summary)):
+        deltas = scenario_host_deltas(roster, summary.iloc[position], RULES)
+        np.testing.assert_array_equal(deltas, host_deltas[position])
+        assert deltas.dtype == np.int64
@@ -0,0 +1,65 @@
+"""
+Sessions and login lockouts are shared process-wide.
+"""
+
+import pytest
+
+from utils.sessions import LoginLimiter, SessionRegistry, client_ip, limiter_keys
+
+
+def test_revocation_applies_everywhere():
+    registry = SessionRegistry(db_path=None)
+    first = registry.create("admin", "admin", ttl=60)
+    second = registry.create("admin", "admin", ttl=60)
+    other = registry.create("markj", "dashboard", ttl=60)
+    assert registry.validate(first, "admin") is not None
+    assert registry.validate(other, "admin") is None  # wrong area
+
+    assert registry.revoke_user("admin") == 2
+    assert registry.validate(second) is None
+    assert registry.count() == 1
+    registry.revoke_all()
+    assert registry.validate(other) is None
+
+
+def test_expired_sessions_are_rejected():
+    registry = SessionRegistry(db_path=None)
+    token = registry.create("admin", "admin", ttl=-1)
+    assert registry.validate(token) is None
+    assert registry.count() == 0
+
+
+def test_lockout_per_username_and_ip():
+    limiter = LoginLimiter(capacity=3, window=900)
+    keys = limiter_keys("Admin ", "10.0.0.1")
+    assert keys == ["user:admin", "ip:10.0.0.1"]
+    for _ in range(3):
+        assert limiter.retry_after(keys) == 0
+        limiter.fail(keys)
+    assert limiter.retry_after(keys) == pytest.approx(300, rel=0.01)
+    # The same IP is locked out for any other username too
+    assert limiter.retry_after(limiter_keys("someone", "10.0.0.1")) > 0
+    limiter.reset(["user:admin"])
+    assert limiter.remaining("user:admin") == 3
+
+
+def test_successful_login_resets_every_charged_bucket(monkeypatch):
+    from pages import admin_panel
+
+    limiter = LoginLimiter(capacity=3, window=900)
+    monkeypatch.setattr(admin_panel, "get_login_limiter", lambda: limiter)
+    monkeypatch.setattr(admin_panel, "client_ip", lambda: "10.0.0.1")
+    monkeypatch.setattr(admin_panel, "audit", lambda *args, **kwargs: None)
+    auth = admin_panel.AdminAuth()
+    monkeypatch.setattr(auth, "verify_credentials", lambda username, password: password == "right")
+
+    for _ in range(2):
+        assert not auth.login("markj", "wrong")[0]
+    assert auth.login("markj", "right")[0]
+    # The next user on the same client starts with a full per-client bucket
+    assert limiter.remaining("ip:10.0.0.1") == 3
+    assert limiter.remaining("user:markj") == 3
+
+
+def test_client_ip_outside_a_session():
+    assert client_ip() == ""
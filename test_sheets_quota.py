@@ -0,0 +1,97 @@
+"""
+Sheets API calls are paced by the token buckets, served by priority and retried after a 429.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import SHEETS_API_CONFIG
+from utils.sheets_quota import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, SheetsScheduler, TokenBucket
+
+
+def scheduler(**overrides) -> SheetsScheduler:
+    return SheetsScheduler({**SHEETS_API_CONFIG, **overrides})
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        headers = {"Retry-After": retry_after} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(per_minute=60, burst=3)
+    now = bucket.updated
+    for _ in range(3):
+        assert bucket.wait(now) == 0
+        bucket.take(now)
+    assert bucket.wait(now) == pytest.approx(1.0)
+    assert bucket.wait(now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait(now + 10) == 0
+    bucket.take(now + 10)
+    # Refill is capped at the burst size
+    assert bucket.tokens == pytest.approx(2.0)
+
+
+def test_interactive_calls_go_before_queued_background_calls():
+    quota = scheduler(project_per_minute=300, sheet_per_minute=300, burst=1)
+    quota.call("sheet", lambda: None)  # spend the burst so later calls queue
+    order = []
+
+    def call(name, priority):
+        quota.call("sheet", lambda: order.append(name), priority)
+
+    background = [threading.Thread(target=call, args=(f"background {i}", PRIORITY_BACKGROUND)) for i in range(2)]
+    for thread in background:
+        thread.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=call, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    for thread in background + [interactive]:
+        thread.join(5)
+
+    assert order[0] == "interactive"
+    assert sorted(order[1:]) == ["background 0", "background 1"]
+
+
+def test_rate_limited_call_is_retried_after_retry_after():
+    quota = scheduler(project_per_minute=600, backoff_seconds=0.05)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimited(retry_after="0.3")
+        return "ok"
+
+    assert quota.call("sheet", flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 0.3
+    stats = quota.stats().set_index("Class").loc["Interactive reads"]
+    assert stats["Calls"] == 1 and stats["Rate Limited"] == 1 and stats["Retries"] == 1
+
+
+def test_gives_up_after_max_retries():
+    quota = scheduler(project_per_minute=600, max_retries=2, backoff_seconds=0.01, max_backoff_seconds=0.02)
+    attempts = []
+
+    def always_limited():
+        attempts.append(1)
+        raise RateLimited()
+
+    with pytest.raises(RateLimited):
+        quota.call("sheet", always_limited)
+    assert len(attempts) == 3
+
+
+def test_call_waiting_past_max_wait_times_out():
+    quota = scheduler(project_per_minute=1, burst=1, max_wait_seconds=0.2)
+    quota.call("sheet", lambda: None)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        quota.call("sheet", lambda: None)
+    assert time.monotonic() - started < 1
+    assert quota.stats().set_index("Class").loc["Interactive reads", "Timed Out"] == 1
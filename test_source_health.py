@@ -0,0 +1,120 @@
+"""
+Sheet downloads keep to their deadline, and failing sources are paused and served from their last good snapshot.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+
+from utils.gsheets import fetch_csv
+from utils.source_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, SourceHealth, SourceUnavailable
+
+
+class TrickleHandler(BaseHTTPRequestHandler):
+    """Sends a CSV one row every 0.2 s, so no single read times out."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.end_headers()
+        self.wfile.write(b"Date,Time\n")
+        for i in range(50):
+            self.wfile.write(f"2026-01-01,20:{i:02d}\n".encode())
+            self.wfile.flush()
+            time.sleep(0.2)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def trickle_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TrickleHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/export"
+    server.shutdown()
+
+
+def test_slow_download_stops_at_deadline(trickle_url):
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        fetch_csv(trickle_url, timeout=(1, 1))
+    assert time.monotonic() - started < 1.5
+
+
+def make_source():
+    state = {"fail": False, "calls": 0}
+
+    def fetch(timeout):
+        state["calls"] += 1
+        if state["fail"]:
+            raise ConnectionError("down")
+        return pd.DataFrame({"call": [state["calls"]]})
+
+    return state, fetch
+
+
+def load(health, fetch, source="sheet"):
+    return health.serve(source, lambda: health.fetch(source, fetch))
+
+
+def test_failing_source_opens_and_serves_snapshot():
+    health = SourceHealth()
+    state, fetch = make_source()
+    assert load(health, fetch)["call"].tolist() == [1]
+
+    state["fail"] = True
+    for _ in range(5):
+        assert load(health, fetch)["call"].tolist() == [1]
+    breaker = health._breakers["sheet"]
+    assert breaker.state == OPEN
+    # Once open, requests are rejected without calling the source
+    assert state["calls"] == 3 and breaker.rejected == 3
+    assert "sheet" in health.stale()
+
+
+def test_failure_without_snapshot_raises_source_error():
+    health = SourceHealth()
+    state, fetch = make_source()
+    state["fail"] = True
+    with pytest.raises(ConnectionError):
+        load(health, fetch)
+
+
+def test_probe_closes_recovered_source():
+    health = SourceHealth()
+    state, fetch = make_source()
+    load(health, fetch)
+    state["fail"] = True
+    for _ in range(3):
+        load(health, fetch)
+    breaker = health._breakers["sheet"]
+    breaker.open_seconds = 0
+    state["fail"] = False
+
+    with pytest.raises(SourceUnavailable):
+        health.fetch("sheet", fetch)  # starts the probe and keeps rejecting while it runs
+    for _ in range(50):
+        if breaker.state == CLOSED:
+            break
+        time.sleep(0.02)
+    assert breaker.state == CLOSED
+    assert health.stale() == {}
+    assert load(health, fetch)["call"].iloc[0] > 1
+
+
+def test_slow_fetches_open_breaker():
+    breaker = CircuitBreaker(window=10, min_requests=4, failure_rate=0.5, slow_seconds=1.0)
+    for seconds in (0.1, 2.5, 0.2, 3.0):
+        breaker.record(True, seconds)
+    assert breaker.state == OPEN and breaker.slow == 2 and breaker.failures == 0
+
+    breaker.opened_at -= breaker.open_seconds
+    assert breaker.probe_due(time.time()) and breaker.state == HALF_OPEN
+    breaker.record(True, 2.0)  # a slow probe opens it again
+    assert breaker.state == OPEN
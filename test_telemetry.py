@@ -0,0 +1,80 @@
+"""
+Usage telemetry stays within its ring buffers however much traffic it sees.
+"""
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from utils import telemetry
+
+START = 1_800_000_000  # on a minute boundary
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [float(START)]
+    monkeypatch.setattr(telemetry, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_pending_events_drop_the_oldest_when_unread(monkeypatch, clock):
+    monkeypatch.setattr(telemetry, "MAX_PENDING_EVENTS", 10)
+    usage = telemetry.Telemetry()
+    for i in range(25):
+        usage.record(f"session {i}", "Home", page_view=True)
+
+    summary = usage.summary()
+    assert summary["runs"] == summary["page_views"] == 10
+    assert summary["total_sessions"] == 10
+
+
+def test_minute_buckets_keep_only_the_newest(monkeypatch, clock):
+    monkeypatch.setattr(telemetry, "MAX_MINUTES", 5)
+    usage = telemetry.Telemetry()
+    for minute in range(8):
+        clock[0] = START + minute * 60 + 30
+        usage.record("session", "Home", page_view=True)
+        usage.record("session", "Home", duration_ms=10.0 * (minute + 1))
+        usage.minutes()  # drain each minute as the admin panel would
+
+    minutes = usage.minutes(window_minutes=60)
+    assert len(minutes) == 5
+    assert minutes["Minute"].iloc[0] == pd.Timestamp.fromtimestamp(START + 3 * 60)
+    assert minutes["Avg Rerun (ms)"].tolist() == [40.0, 50.0, 60.0, 70.0, 80.0]
+
+
+def test_tracked_sessions_forget_the_least_recently_seen(monkeypatch, clock):
+    monkeypatch.setattr(telemetry, "MAX_TRACKED_SESSIONS", 3)
+    usage = telemetry.Telemetry()
+    for session in ("a", "b", "c"):
+        usage.record(session, "Home")
+    clock[0] += 120
+    usage.record("a", "Home")
+    usage.record("d", "Home")
+    usage.summary()
+    assert list(usage._sessions) == ["c", "a", "d"]
+
+    # A forgotten session that comes back is counted as new
+    usage.record("b", "Home")
+    summary = usage.summary()
+    assert summary["total_sessions"] == 5
+    assert list(usage._sessions) == ["a", "d", "b"]
+    assert summary["avg_session_seconds"] == pytest.approx(40.0)
+
+
+def test_summary_splits_current_and_previous_windows(clock):
+    usage = telemetry.Telemetry()
+    usage.record("old", "Home", page_view=True)
+    clock[0] += 45 * 60
+    usage.record("new", "Leaderboards", page_view=True)
+    usage.record("new", "Leaderboards", duration_ms=30.0)
+    usage.record("new", "Leaderboards", duration_ms=90.0)
+
+    summary = usage.summary(window_minutes=30)
+    assert summary["page_views"] == 1 and summary["previous_page_views"] == 1
+    assert summary["avg_run_ms"] == 60.0 and summary["max_run_ms"] == 90.0
+    # "old" last reran 45 minutes ago, beyond the active window
+    assert summary["active_users"] == 1
+    assert usage.pages(window_minutes=30).values.tolist() == [["Leaderboards", 1]]
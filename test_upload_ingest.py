@@ -0,0 +1,53 @@
+"""
+Pay chart uploads are validated chunk by chunk and held to their row and memory budgets.
+"""
+
+import pytest
+
+from utils.upload_ingest import ingest_upload
+
+HEADER = "ranking;Target Beans ; Salary in Beans;Salary in Diamonds;Notes\n"
+
+
+def pay_chart_csv(rows: int, start: int = 0) -> bytes:
+    lines = [f"R{i};{i * 1000};{i * 3};{i * 2.5};note\n" for i in range(start, start + rows)]
+    return (HEADER + "".join(lines)).encode()
+
+
+def test_ingest_sniffs_delimiter_matches_headers_and_compacts():
+    progress = []
+    result = ingest_upload(pay_chart_csv(1200), "chart.txt", "host_pay",
+                           progress=lambda fraction, message: progress.append(fraction))
+
+    assert result.file_format == "csv" and result.rows == 1200
+    assert list(result.frame.columns) == ["Ranking", "Target Beans", "Salary in Beans", "Salary in Diamonds"]
+    assert str(result.frame["Target Beans"].dtype) == "int64"
+    assert str(result.frame["Salary in Diamonds"].dtype) == "float64"
+    assert progress[-1] == 1.0
+
+
+def test_row_budget_is_enforced():
+    with pytest.raises(ValueError, match="more than 1,000 rows"):
+        ingest_upload(pay_chart_csv(1001), "chart.csv", "host_pay", max_rows=1000)
+    assert ingest_upload(pay_chart_csv(1000), "chart.csv", "host_pay", max_rows=1000).rows == 1000
+
+
+def test_memory_budget_is_enforced():
+    with pytest.raises(ValueError, match="memory budget"):
+        ingest_upload(pay_chart_csv(5000), "chart.csv", "host_pay", max_memory_mb=0.1)
+
+
+def test_bad_value_names_its_row_across_chunks(monkeypatch):
+    from utils import upload_ingest
+
+    monkeypatch.setitem(upload_ingest.UPLOAD_CONFIG, "chunk_rows", 100)
+    data = pay_chart_csv(250).replace(b"R230;230000;", b"R230;-5;")
+    with pytest.raises(ValueError, match=r"Target Beans \(first at row 232\)"):
+        ingest_upload(data, "chart.csv", "host_pay")
+
+
+def test_duplicate_rankings_and_unknown_datasets_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate Ranking values: R3"):
+        ingest_upload(pay_chart_csv(5) + pay_chart_csv(1, start=3)[len(HEADER):], "chart.csv", "host_pay")
+    with pytest.raises(ValueError, match="cannot replace"):
+        ingest_upload(pay_chart_csv(5), "chart.csv", "sessions")
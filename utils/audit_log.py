@@ -0,0 +1,336 @@
+"""
+Append-only audit log of logins, data refreshes, write-backs and exports.
+Entries are JSON lines in size-rotated (optionally gzipped) files; an in-process index by time, user
+and event lets the admin viewer page through millions of entries by seeking to just the rows shown.
+"""
+
+import bisect
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import AUDIT_CONFIG, AUDIT_LOG_DIR
+
+ACTIVE_FILE = "audit.jsonl"
+ROTATED_PATTERN = "audit-*.jsonl*"
+
+# Event names
+LOGIN = "login"
+LOGIN_FAILED = "login_failed"
+LOGOUT = "logout"
+REFRESH = "refresh"
+WRITE_BACK = "write_back"
+EXPORT = "export"
+UPLOAD = "upload"
+RULES_UPDATE = "rules_update"
+SESSIONS_CLEARED = "sessions_cleared"
+
+
+def _session_user() -> str:
+    """The signed-in user of the running script, or "system" outside a session (e.g. background jobs)."""
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is None:
+            return "system"
+        return st.session_state.get("admin_user") or st.session_state.get("username") or "anonymous"
+    except Exception:
+        return "system"
+
+
+class AuditIndex:
+    """Columnar index of log entries: time, user, event and file position per sequence number.
+
+    Entries are only ever appended, and retention drops whole files from the front, so sequence
+    numbers stay valid and ``base`` is the sequence number of the oldest indexed entry.
+    """
+
+    def __init__(self):
+        self.base = 0
+        self.times = array("d")
+        self.users = array("i")
+        self.events = array("i")
+        self.files = array("i")
+        self.offsets = array("q")
+        self.user_codes: Dict[str, int] = {}
+        self.event_codes: Dict[str, int] = {}
+        self.by_user: Dict[int, array] = {}
+        self.by_event: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @staticmethod
+    def _code(codes: Dict[str, int], value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(self, at: float, user: str, event: str, file_id: int, offset: int):
+        seq = self.base + len(self.times)
+        # Keep times sorted for bisect even if the wall clock steps back
+        self.times.append(max(at, self.times[-1]) if self.times else at)
+        user_code = self._code(self.user_codes, user)
+        event_code = self._code(self.event_codes, event)
+        self.users.append(user_code)
+        self.events.append(event_code)
+        self.files.append(file_id)
+        self.offsets.append(offset)
+        self.by_user.setdefault(user_code, array("q")).append(seq)
+        self.by_event.setdefault(event_code, array("q")).append(seq)
+
+    def drop_file(self, file_id: int):
+        """Forget the leading entries that live in ``file_id``."""
+        count = 0
+        while count < len(self.files) and self.files[count] == file_id:
+            count += 1
+        if not count:
+            return
+        for column in (self.times, self.users, self.events, self.files, self.offsets):
+            del column[:count]
+        self.base += count
+        for postings in list(self.by_user.values()) + list(self.by_event.values()):
+            del postings[:bisect.bisect_left(postings, self.base)]
+
+    def seq_range(self, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        """Sequence numbers [lo, hi) of entries with start <= time < end."""
+        lo = bisect.bisect_left(self.times, start) if start is not None else 0
+        hi = bisect.bisect_left(self.times, end) if end is not None else len(self.times)
+        return self.base + lo, self.base + hi
+
+    def select(self, lo: int, hi: int, user: Optional[str], event: Optional[str]) -> Optional[array]:
+        """Matching sequence numbers in [lo, hi) in ascending order; None means every one of them."""
+        lists = []
+        for value, codes, postings in ((user, self.user_codes, self.by_user), (event, self.event_codes, self.by_event)):
+            if value is None:
+                continue
+            code = codes.get(value)
+            if code is None:
+                return array("q")
+            matches = postings[code]
+            lists.append(matches[bisect.bisect_left(matches, lo):bisect.bisect_left(matches, hi)])
+        if not lists:
+            return None
+        if len(lists) == 1:
+            return lists[0]
+        # Walk the shorter list and check the other filter column directly
+        shorter = min(lists, key=len)
+        user_code, event_code = self.user_codes[user], self.event_codes[event]
+        return array("q", (
+            seq for seq in shorter
+            if self.users[seq - self.base] == user_code and self.events[seq - self.base] == event_code
+        ))
+
+
+class AuditLog:
+    """Process-wide audit log writer and indexed reader."""
+
+    def __init__(self, root: str = AUDIT_LOG_DIR, max_file_mb: float = AUDIT_CONFIG["max_file_mb"],
+                 max_files: int = AUDIT_CONFIG["max_files"], compress: bool = AUDIT_CONFIG["compress"]):
+        self.root = root
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024)
+        self.max_files = max_files
+        self.compress = compress
+        self._lock = threading.RLock()
+        self._index: Optional[AuditIndex] = None
+        # file id -> path; the active file keeps its id when it is rotated and renamed
+        self._paths: Dict[int, str] = {}
+        self._active_id = 0
+
+    @property
+    def active_path(self) -> str:
+        return os.path.join(self.root, ACTIVE_FILE)
+
+    def _rotated_files(self) -> List[str]:
+        # Rotated names embed a sortable timestamp, so name order is time order
+        return sorted(glob.glob(os.path.join(self.root, ROTATED_PATTERN)))
+
+    def record(self, event: str, user: Optional[str] = None, ok: bool = True, **detail):
+        """Append one entry; never raises, so auditing cannot break the action being audited."""
+        at = time.time()
+        entry = {
+            "ts": datetime.fromtimestamp(at).isoformat(timespec="milliseconds"),
+            "event": event,
+            "user": user or _session_user(),
+            "ok": ok,
+        }
+        if detail:
+            entry["detail"] = detail
+        line = (json.dumps(entry, default=str, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                os.makedirs(self.root, exist_ok=True)
+                with open(self.active_path, "ab") as f:
+                    offset = f.tell()
+                    f.write(line)
+                if self._index is not None:
+                    self._index.add(at, entry["user"], event, self._active_id, offset)
+                if offset + len(line) >= self.max_file_bytes:
+                    self._rotate()
+        except OSError as e:
+            print(f"Warning: Could not write audit log entry: {e}")
+
+    def _rotate(self):
+        """Move the active file aside (gzipped when configured) and drop files beyond retention."""
+        rotated = os.path.join(self.root, f"audit-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.jsonl")
+        os.replace(self.active_path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as source, gzip.open(rotated + ".gz", "wb") as target:
+                while True:
+                    block = source.read(1024 * 1024)
+                    if not block:
+                        break
+                    target.write(block)
+            os.remove(rotated)
+            rotated += ".gz"
+
+        if self._index is not None:
+            self._paths[self._active_id] = rotated
+            self._active_id = max(self._paths) + 1
+            self._paths[self._active_id] = self.active_path
+
+        files = self._rotated_files()
+        for path in files[:max(len(files) - self.max_files, 0)]:
+            os.remove(path)
+            if self._index is not None:
+                file_id = next((fid for fid, known in self._paths.items() if known == path), None)
+                if file_id is not None:
+                    self._index.drop_file(file_id)
+                    del self._paths[file_id]
+
+    @staticmethod
+    def _open(path: str):
+        return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+    def _ensure_index(self) -> AuditIndex:
+        """Build the index by streaming every file once; later writes extend it in place."""
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            index = AuditIndex()
+            paths = self._rotated_files()
+            if os.path.exists(self.active_path):
+                paths.append(self.active_path)
+            self._paths = {}
+            for file_id, path in enumerate(paths):
+                self._paths[file_id] = path
+                offset = 0
+                try:
+                    with self._open(path) as f:
+                        for line in f:
+                            try:
+                                entry = json.loads(line)
+                                at = datetime.fromisoformat(entry["ts"]).timestamp()
+                                index.add(at, str(entry.get("user", "")), str(entry.get("event", "")), file_id, offset)
+                            except (ValueError, KeyError, TypeError):
+                                pass  # skip a torn or hand-edited line
+                            offset += len(line)
+                except (OSError, EOFError) as e:
+                    print(f"Warning: Could not index audit log {path}: {e}")
+            self._active_id = len(paths) - 1 if paths and paths[-1] == self.active_path else len(paths)
+            self._paths[self._active_id] = self.active_path
+            self._index = index
+            return index
+
+    def _read(self, seqs: List[int], index: AuditIndex) -> List[dict]:
+        """Entries for the given sequence numbers, seeking within each file once per entry."""
+        by_file: Dict[int, List[Tuple[int, int]]] = {}
+        for position, seq in enumerate(seqs):
+            row = seq - index.base
+            by_file.setdefault(index.files[row], []).append((index.offsets[row], position))
+        entries: List[Optional[dict]] = [None] * len(seqs)
+        for file_id, wanted in by_file.items():
+            path = self._paths.get(file_id)
+            try:
+                with self._open(path) as f:
+                    # Ascending offsets keep gzip seeks forward-only
+                    for offset, position in sorted(wanted):
+                        f.seek(offset)
+                        entries[position] = json.loads(f.readline())
+            except (OSError, EOFError, ValueError, TypeError) as e:
+                print(f"Warning: Could not read audit log {path}: {e}")
+        return [entry for entry in entries if entry is not None]
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None, user: Optional[str] = None,
+              event: Optional[str] = None, page: int = 0, page_size: int = 50) -> Tuple[pd.DataFrame, int]:
+        """One page of matching entries, newest first, and the total number of matches."""
+        with self._lock:
+            index = self._ensure_index()
+            lo, hi = index.seq_range(start.timestamp() if start else None, end.timestamp() if end else None)
+            matches = index.select(lo, hi, user, event)
+            total = hi - lo if matches is None else len(matches)
+            # Newest first: page 0 ends at the last match
+            stop = max(total - page * page_size, 0)
+            first = max(stop - page_size, 0)
+            if matches is None:
+                seqs = list(range(lo + first, lo + stop))
+            else:
+                seqs = list(matches[first:stop])
+            entries = self._read(seqs[::-1], index)
+        rows = [
+            {
+                "Time": entry.get("ts"),
+                "Event": entry.get("event"),
+                "User": entry.get("user"),
+                "OK": entry.get("ok", True),
+                "Detail": json.dumps(entry["detail"], ensure_ascii=False) if entry.get("detail") else "",
+            }
+            for entry in entries
+        ]
+        return pd.DataFrame(rows, columns=["Time", "Event", "User", "OK", "Detail"]), total
+
+    def count(self, event: Optional[str] = None, user: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None) -> int:
+        """Number of matching entries, answered from the index alone."""
+        with self._lock:
+            index = self._ensure_index()
+            lo, hi = index.seq_range(since.timestamp() if since else None, until.timestamp() if until else None)
+            matches = index.select(lo, hi, user, event)
+            return hi - lo if matches is None else len(matches)
+
+    def users(self) -> List[str]:
+        with self._lock:
+            return sorted(self._ensure_index().user_codes)
+
+    def event_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._ensure_index().event_codes)
+
+    def stats(self) -> Dict[str, int]:
+        """Indexed entries, files on disk and their total size."""
+        with self._lock:
+            index = self._ensure_index()
+            paths = [path for path in self._paths.values() if os.path.exists(path)]
+            return {
+                "entries": len(index),
+                "files": len(paths),
+                "bytes": sum(os.path.getsize(path) for path in paths),
+            }
+
+
+_audit_log: Optional[AuditLog] = None
+_audit_log_lock = threading.Lock()
+
+
+def get_audit_log() -> AuditLog:
+    """The process-wide audit log."""
+    global _audit_log
+    if _audit_log is None:
+        with _audit_log_lock:
+            if _audit_log is None:
+                _audit_log = AuditLog()
+    return _audit_log
+
+
+def audit(event: str, user: Optional[str] = None, ok: bool = True, **detail):
+    """Record an audit entry in the process-wide log."""
+    get_audit_log().record(event, user=user, ok=ok, **detail)
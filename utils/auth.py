@@ -7,6 +7,10 @@ import streamlit as st
 import hashlib
 from typing import Optional, Dict
 
+from config.settings import SECURITY_CONFIG
+from utils.audit_log import LOGIN, LOGIN_FAILED, LOGOUT, audit
+from utils.sessions import DASHBOARD_AREA, client_ip, get_login_limiter, get_session_registry, limiter_keys
+
 # Default credentials (should be moved to environment variables in production)
 DEFAULT_CREDENTIALS = {
     "admin": "admin123",
@@ -37,19 +41,37 @@ def login_form() -> Optional[str]:
         submit = st.form_submit_button("Login")
         
         if submit:
-            if verify_credentials(username, password):
+            # Lockouts are shared across every browser session, per username and per client address
+            limiter = get_login_limiter()
+            keys = limiter_keys(username, client_ip())
+            wait = limiter.retry_after(keys)
+            if wait > 0:
+                audit(LOGIN_FAILED, user=username, ok=False, locked=True)
+                st.error(f"Too many failed attempts. Try again in {int(wait // 60) + 1} minutes.")
+            elif verify_credentials(username, password):
+                limiter.reset(keys)
+                audit(LOGIN, user=username)
+                st.session_state["session_token"] = get_session_registry().create(
+                    username, DASHBOARD_AREA, SECURITY_CONFIG["session_timeout"], ip=client_ip()
+                )
                 st.session_state["authenticated"] = True
                 st.session_state["username"] = username
                 st.success(f"Welcome, {username}!")
                 st.rerun()
                 return username
             else:
+                limiter.fail(keys)
+                audit(LOGIN_FAILED, user=username, ok=False)
                 st.error("Invalid credentials")
     
     return None
 
 def logout():
     """Handle user logout."""
+    audit(LOGOUT)
+    get_session_registry().revoke(st.session_state.get("session_token"))
+    if "session_token" in st.session_state:
+        del st.session_state["session_token"]
     if "authenticated" in st.session_state:
         del st.session_state["authenticated"]
     if "username" in st.session_state:
@@ -58,7 +80,7 @@ def logout():
 
 def require_auth() -> Optional[str]:
     """Require authentication to access content."""
-    if "authenticated" not in st.session_state or not st.session_state["authenticated"]:
+    if not is_authenticated():
         return login_form()
     
     # Add logout button in sidebar
@@ -70,7 +92,10 @@ def require_auth() -> Optional[str]:
     return st.session_state.get("username")
 
 def is_authenticated() -> bool:
-    """Check if user is authenticated."""
+    """Check if user is authenticated against the shared session registry (expired and revoked sessions fail)."""
+    if get_session_registry().validate(st.session_state.get("session_token"), DASHBOARD_AREA) is None:
+        st.session_state["authenticated"] = False
+        return False
     return st.session_state.get("authenticated", False)
 
 def get_current_user() -> Optional[str]:
@@ -1,3 +1,21 @@
+from decimal import Decimal
+from typing import Any, Mapping
+
+import numpy as np
+
+from utils.money import apply_rate, to_minor_units
+
+# Host Pay Calculator inputs and their defaults
+HOST_PAY_METRICS = {
+    "diamonds_earned": 0,
+    "hours_streamed": 0.0,
+    "pk_wins": 0,
+    "pk_losses": 0,
+    "tasks_completed": 0,
+    "events_participated": 0,
+    "other_deductions": 0.0,
+}
+
 def calculate_diamonds_breakdown(beans: int) -> tuple[int, int, list[dict[str, int]]]:
     """
     Converts beans to diamonds based on a tiered exchange system
@@ -36,6 +54,39 @@ def calculate_diamonds(beans: int) -> tuple[int, int]:
     diamonds, remaining_beans, _ = calculate_diamonds_breakdown(beans)
     return diamonds, remaining_beans
 
+def calculate_host_pay_columns(metrics: Mapping[str, Any], rates: Mapping[str, float]) -> dict[str, np.ndarray]:
+    """
+    Calculates the Host Pay Calculator breakdown for scalars or whole columns.
+    All amounts are int64 minor units, each rounded once.
+    """
+    def metric(name: str) -> np.ndarray:
+        value = metrics.get(name)
+        return np.asarray(HOST_PAY_METRICS[name] if value is None else value)
+
+    base_pay = apply_rate(metric("hours_streamed"), rates["hourly_rate"])
+    diamond_earnings = apply_rate(metric("diamonds_earned"), Decimal(str(rates["diamond_rate_per_1000"])) / 1000)
+    pk_bonus = apply_rate(metric("pk_wins"), rates["pk_win_bonus_usd"])
+    task_earnings = apply_rate(metric("tasks_completed"), rates["task_bonus"])
+    event_earnings = apply_rate(metric("events_participated"), rates["event_bonus"])
+
+    pk_penalties = apply_rate(metric("pk_losses"), rates["pk_loss_penalty"])
+    other_deductions = to_minor_units(metric("other_deductions"))
+    total_deductions = pk_penalties + other_deductions
+
+    gross_pay = base_pay + diamond_earnings + pk_bonus + task_earnings + event_earnings
+    return {
+        "base_pay": base_pay,
+        "diamond_earnings": diamond_earnings,
+        "pk_bonus": pk_bonus,
+        "task_earnings": task_earnings,
+        "event_earnings": event_earnings,
+        "pk_penalties": pk_penalties,
+        "other_deductions": other_deductions,
+        "total_deductions": total_deductions,
+        "gross_pay": gross_pay,
+        "net_pay": gross_pay - total_deductions,
+    }
+
 if __name__ == "__main__":
     # Example usage:
     input_beans: int = int(input("Enter the number of beans: "))
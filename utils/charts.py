@@ -0,0 +1,100 @@
+"""
+Cached, downsampled Plotly figures.
+Line series are reduced to a pixel-proportional point budget with LTTB and the figure specs are cached per data version in the shared data cache.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.settings import CHART_CONFIG
+from utils.data_cache import FIGURE_KIND, get_data_cache
+
+
+def point_budget(width_px: Optional[int] = None) -> int:
+    """Points worth drawing across a chart of the given width."""
+    width_px = width_px or CHART_CONFIG["width_px"]
+    return max(3, int(width_px * CHART_CONFIG["points_per_pixel"]))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Positions of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between keeps the point forming the
+    largest triangle with the previously kept point and the average of the next bucket, which
+    preserves peaks and troughs that plain striding drops.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = stop, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+
+def _numeric_x(values: pd.Series) -> np.ndarray:
+    """X values as numbers for triangle areas: timestamps as nanoseconds, categories by position."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    return np.arange(len(values), dtype=np.float64)
+
+
+def downsample(frame: pd.DataFrame, x: str, y: str, threshold: int) -> pd.DataFrame:
+    """Rows of ``frame`` kept when the (x, y) series is downsampled to ``threshold`` points; NaN values are skipped."""
+    series = frame[[x, y]].dropna(subset=[y])
+    keep = lttb(_numeric_x(series[x]), series[y].to_numpy(dtype=np.float64), threshold)
+    return series.iloc[keep]
+
+
+def line_figure(frame: pd.DataFrame, x: str, series: Dict[str, str], title: str, version: str,
+                filters: Tuple = (), window: Optional[Tuple] = None, width_px: Optional[int] = None,
+                markers: bool = False, layout: Optional[dict] = None) -> dict:
+    """Cached Plotly line chart spec, one trace per ``{label: column}`` in ``series``.
+
+    ``version`` identifies the data (e.g. a DataManager version) and ``filters`` any selection
+    applied to it. ``window`` is an inclusive (low, high) range of x values to zoom into: each
+    series is downsampled to the point budget within the window, so narrowing the window shows
+    more of the underlying points until every point in it is drawn. The spec's
+    ``layout.meta`` holds the points shown and available.
+    """
+    budget = point_budget(width_px)
+    key = (title, version, x, tuple(series.items()), filters, window, budget, markers, repr(sorted((layout or {}).items())))
+
+    def build() -> dict:
+        data = frame
+        if window is not None:
+            low, high = window
+            values = data[x]
+            data = data[(values >= low) & (values <= high)]
+
+        fig = go.Figure()
+        shown = total = 0
+        for label, column in series.items():
+            points = downsample(data, x, column, budget)
+            shown += len(points)
+            total += int(data[column].notna().sum())
+            fig.add_trace(go.Scatter(x=points[x], y=points[column], name=label,
+                                     mode="lines+markers" if markers else "lines"))
+        fig.update_layout(title=title, showlegend=len(series) > 1, meta={"points": shown, "total": total},
+                          **(layout or {}))
+        return fig.to_plotly_json()
+
+    return get_data_cache().get(FIGURE_KIND, key, build)
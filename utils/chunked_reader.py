@@ -0,0 +1,154 @@
+"""
+Chunked readers for uploaded tabular files.
+Parses CSV, Excel, Parquet and JSON uploads in bounded-size DataFrame chunks.
+"""
+
+import io
+import json
+from typing import Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+SUPPORTED_FORMATS = {
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+    ".parquet": "parquet",
+    ".json": "json",
+    ".jsonl": "json",
+}
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Called with the fraction of the file parsed so far
+Progress = Optional[Callable[[float], None]]
+
+
+def detect_format(filename: str) -> str:
+    """Return the file format for an upload based on its extension."""
+    lowered = filename.lower()
+    for extension, file_format in SUPPORTED_FORMATS.items():
+        if lowered.endswith(extension):
+            return file_format
+    raise ValueError(f"Unsupported file type: {filename}")
+
+
+def _report(progress: Progress, fraction: float):
+    if progress is not None:
+        progress(min(max(fraction, 0.0), 1.0))
+
+
+def _iter_csv(data: bytes, chunk_rows: int, dtype: Optional[Dict[str, str]], progress: Progress = None,
+              sep: str = ",") -> Iterator[pd.DataFrame]:
+    buffer = io.BytesIO(data)
+    reader = pd.read_csv(buffer, chunksize=chunk_rows, dtype=dtype, sep=sep)
+    for chunk in reader:
+        # The parser reads ahead in blocks, so the buffer position is a close upper estimate
+        _report(progress, buffer.tell() / max(len(data), 1))
+        yield chunk
+
+
+def _iter_xlsx(data: bytes, chunk_rows: int, dtype: Optional[Dict[str, str]], progress: Progress = None,
+               sep: str = ",") -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row or 0
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col) if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+
+        buffer = []
+        seen = 1
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                seen += len(buffer)
+                _report(progress, seen / total_rows if total_rows else 0.0)
+                yield _frame_from_rows(buffer, columns, dtype)
+                buffer = []
+        if buffer:
+            _report(progress, 1.0)
+            yield _frame_from_rows(buffer, columns, dtype)
+    finally:
+        workbook.close()
+
+
+def _frame_from_rows(rows, columns, dtype: Optional[Dict[str, str]]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=columns).dropna(how="all")
+    if dtype:
+        present = {col: kind for col, kind in dtype.items() if col in frame.columns}
+        frame = frame.astype(present)
+    return frame
+
+
+def _iter_parquet(data: bytes, chunk_rows: int, dtype: Optional[Dict[str, str]], progress: Progress = None,
+                  sep: str = ",") -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet uploads require the 'pyarrow' package") from e
+
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    total_rows = parquet_file.metadata.num_rows
+    seen = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        frame = batch.to_pandas()
+        if dtype:
+            present = {col: kind for col, kind in dtype.items() if col in frame.columns}
+            frame = frame.astype(present)
+        seen += len(frame)
+        _report(progress, seen / total_rows if total_rows else 1.0)
+        yield frame
+
+
+def _is_json_lines(data: bytes) -> bool:
+    """True when the first line of a JSON upload is a complete object on its own."""
+    first_line = data.lstrip().split(b"\n", 1)[0]
+    try:
+        return isinstance(json.loads(first_line), dict) and len(first_line) < len(data.strip())
+    except ValueError:
+        return False
+
+
+def _iter_json(data: bytes, chunk_rows: int, dtype: Optional[Dict[str, str]], progress: Progress = None,
+               sep: str = ",") -> Iterator[pd.DataFrame]:
+    if _is_json_lines(data):
+        buffer = io.BytesIO(data)
+        for chunk in pd.read_json(buffer, lines=True, chunksize=chunk_rows, dtype=dtype):
+            _report(progress, buffer.tell() / max(len(data), 1))
+            yield chunk
+        return
+
+    # A JSON document (records array or column mapping) has to be parsed whole before it can be sliced
+    frame = pd.read_json(io.BytesIO(data), dtype=dtype)
+    for start in range(0, len(frame), chunk_rows):
+        _report(progress, min(start + chunk_rows, len(frame)) / len(frame))
+        yield frame.iloc[start:start + chunk_rows]
+
+
+_READERS = {
+    "csv": _iter_csv,
+    "xlsx": _iter_xlsx,
+    "parquet": _iter_parquet,
+    "json": _iter_json,
+}
+
+
+def iter_chunks(
+    data: bytes,
+    file_format: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    dtype: Optional[Dict[str, str]] = None,
+    progress: Progress = None,
+    sep: str = ",",
+) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks of at most ``chunk_rows`` rows from an uploaded file.
+
+    ``progress`` is called after each chunk with the fraction of the file parsed; ``sep`` is the CSV delimiter.
+    """
+    if file_format not in _READERS:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    return _READERS[file_format](data, chunk_rows, dtype, progress, sep)
@@ -0,0 +1,386 @@
+"""
+Process-wide cache of loaded source data and derived values with a control plane for the admin panel.
+Each kind of entry follows its policy from config/cache_config.py (TTL, entry count, memory budget,
+LRU or LFU eviction), and every entry's source, size, age and hit rate is tracked. Concurrent misses
+on one entry share a single load, and hot entries can be reloaded in the background before they expire.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.cache_config import CACHE_MEMORY_BUDGET_MB, CACHE_POLICIES, DEFAULT_CACHE_POLICY
+
+MB = 1024 * 1024
+
+# Kinds of cached data
+SHEET_KIND = "sheet"  # PK schedule sheets
+PK_TYPE_KIND = "pk_type"  # PK-type tabs
+DERIVED_KIND = "derived"  # frames built from other datasets
+UPLOAD_KIND = "upload"  # parsed uploads and the results computed from them
+EXPORT_KIND = "export"  # generated download files
+FIGURE_KIND = "figure"  # chart specs
+
+LRU = "lru"
+LFU = "lfu"
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if _depth < 6:
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(estimate_size(item, _depth + 1) for item in value.values())
+        if isinstance(value, (list, tuple)):
+            return sys.getsizeof(value) + sum(estimate_size(item, _depth + 1) for item in value)
+    return sys.getsizeof(value)
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame, for cache keys of values computed from it."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr(list(df.columns)).encode())
+    return digest.hexdigest()[:32]
+
+
+def cache_policy(kind: str) -> Dict[str, Any]:
+    return {**DEFAULT_CACHE_POLICY, **CACHE_POLICIES.get(kind, {})}
+
+
+class CacheEntry:
+    """One cached value and its usage counters."""
+
+    def __init__(self, kind: str, key: Hashable, value: Any, loader: Optional[Callable[[], Any]], ttl: float,
+                 load_seconds: float):
+        self.kind = kind
+        self.key = key
+        self.value = value
+        self.loader = loader
+        self.ttl = ttl
+        self.load_seconds = load_seconds
+        self.size = estimate_size(value)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+        self.loads = 1
+        self.stamp = 0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.loaded_at
+
+    @property
+    def expired(self) -> bool:
+        return self.age >= self.ttl
+
+
+class Flight:
+    """A load in progress that other callers of the same entry wait on."""
+
+    __slots__ = ("done", "entry", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: Optional[CacheEntry] = None
+        self.error: Optional[BaseException] = None
+
+
+class KindStats:
+    """Counters for one kind of entry."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+        self.coalesced = 0
+        self.early_refreshes = 0
+
+
+class DataCache:
+    """Values keyed by (kind, key), loaded on first use and reloaded once their TTL passes.
+
+    After every load the kind is trimmed to its entry count and memory budget, then the whole
+    cache to CACHE_MEMORY_BUDGET_MB, evicting by the kind's LRU or LFU policy.
+
+    Loads are single-flight: while one caller loads an entry, every other caller of that entry
+    waits for its result instead of starting its own fetch.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, Dict[str, Any]]] = None,
+                 memory_budget_mb: float = CACHE_MEMORY_BUDGET_MB):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Hashable], CacheEntry] = {}
+        self._policies = policies
+        self.memory_budget = int(memory_budget_mb * MB)
+        self._stats: Dict[str, KindStats] = {}
+        self._inflight: Dict[Tuple[str, Hashable], Flight] = {}
+        # Bumped on every load so callers can memoize work derived from several entries
+        self._stamp = 0
+
+    def policy(self, kind: str) -> Dict[str, Any]:
+        if self._policies is not None:
+            return {**DEFAULT_CACHE_POLICY, **self._policies.get(kind, {})}
+        return cache_policy(kind)
+
+    def _kind_stats(self, kind: str) -> KindStats:
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = KindStats()
+        return stats
+
+    def get(self, kind: str, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Cached value for (kind, key), calling ``loader`` on a miss or after the TTL.
+
+        Only one caller runs ``loader`` for an entry at a time; the others wait for its value
+        (or its exception). Within the kind's ``early_refresh`` window before expiry the current
+        value is returned while the entry reloads on a background thread.
+        """
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            stats = self._kind_stats(kind)
+            if entry is not None and not entry.expired:
+                entry.hits += 1
+                entry.last_used = time.time()
+                stats.hits += 1
+                early = self.policy(kind)["early_refresh"]
+                if early and entry.age >= entry.ttl - early and (kind, key) not in self._inflight:
+                    flight = self._inflight[(kind, key)] = Flight()
+                    stats.early_refreshes += 1
+                    threading.Thread(target=self._fly, args=(flight, kind, key, loader, ttl, entry),
+                                     name=f"cache-refresh-{kind}", daemon=True).start()
+                return entry.value
+            stats.misses += 1
+            if entry is not None:
+                stats.expirations += 1
+            flight = self._inflight.get((kind, key))
+            leader = flight is None
+            if leader:
+                flight = self._inflight[(kind, key)] = Flight()
+            else:
+                stats.coalesced += 1
+
+        if leader:
+            self._fly(flight, kind, key, loader, ttl, entry)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.entry.value
+
+    def _fly(self, flight: Flight, kind: str, key: Hashable, loader: Callable[[], Any], ttl: Optional[float],
+             previous: Optional[CacheEntry]):
+        """Run a load for everyone waiting on ``flight``; a failed background refresh keeps the old value."""
+        try:
+            flight.entry = self._load(kind, key, loader, ttl, previous=previous)
+        except BaseException as e:
+            flight.error = e
+            if threading.current_thread().name.startswith("cache-refresh-"):
+                print(f"Warning: Background refresh of {kind} {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop((kind, key), None)
+            flight.done.set()
+
+    def peek(self, kind: str, key: Hashable) -> Any:
+        """Cached value for (kind, key) without loading; None when absent or expired."""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is None or entry.expired:
+                return None
+            entry.hits += 1
+            entry.last_used = time.time()
+            self._kind_stats(kind).hits += 1
+            return entry.value
+
+    def put(self, kind: str, key: Hashable, value: Any, ttl: Optional[float] = None) -> Any:
+        """Cache an already computed value under the kind's policy."""
+        return self._load(kind, key, lambda: value, ttl).value
+
+    def _load(self, kind: str, key: Hashable, loader: Callable[[], Any], ttl: Optional[float],
+              previous: Optional[CacheEntry] = None) -> CacheEntry:
+        policy = self.policy(kind)
+        started = time.perf_counter()
+        value = loader()
+        entry = CacheEntry(kind, key, value, loader if policy["refreshable"] else None,
+                           ttl if ttl is not None else policy["ttl"], time.perf_counter() - started)
+        if previous is not None:
+            entry.hits, entry.loads = previous.hits, previous.loads + 1
+        with self._lock:
+            self._stamp += 1
+            entry.stamp = self._stamp
+            if entry.size > min(policy["max_mb"] * MB, self.memory_budget):
+                # Caching it would flush everything else of its kind; hand it back uncached
+                self._kind_stats(kind).oversized += 1
+                self._entries.pop((kind, key), None)
+                return entry
+            self._entries[(kind, key)] = entry
+            self._enforce(kind, policy, keep=entry)
+        return entry
+
+    @staticmethod
+    def _victim(entries: List[CacheEntry], eviction: str) -> CacheEntry:
+        if eviction == LFU:
+            return min(entries, key=lambda entry: (entry.hits + entry.loads, entry.last_used))
+        return min(entries, key=lambda entry: entry.last_used)
+
+    def _evict(self, entry: CacheEntry):
+        del self._entries[(entry.kind, entry.key)]
+        self._kind_stats(entry.kind).evictions += 1
+
+    def _enforce(self, kind: str, policy: Dict[str, Any], keep: CacheEntry):
+        """Trim ``kind`` to its policy, then the whole cache to the memory budget; ``keep`` is never evicted."""
+        for entry in [entry for entry in self._entries.values() if entry.expired and entry is not keep]:
+            del self._entries[(entry.kind, entry.key)]
+            self._kind_stats(entry.kind).expirations += 1
+
+        candidates = [entry for entry in self._entries.values() if entry.kind == kind and entry is not keep]
+        size = keep.size + sum(entry.size for entry in candidates)
+        while candidates and (len(candidates) + 1 > policy["max_entries"] or size > policy["max_mb"] * MB):
+            victim = self._victim(candidates, policy["eviction"])
+            candidates.remove(victim)
+            size -= victim.size
+            self._evict(victim)
+
+        total = sum(entry.size for entry in self._entries.values())
+        while total > self.memory_budget:
+            candidates = [entry for entry in self._entries.values() if entry is not keep]
+            if not candidates:
+                break
+            # Across kinds, the least recently used entry goes first
+            victim = min(candidates, key=lambda entry: entry.last_used)
+            total -= victim.size
+            self._evict(victim)
+
+    def stamp(self, kind: str, key: Hashable) -> int:
+        """Load counter of an entry's current value; 0 when it is not cached."""
+        entry = self._entries.get((kind, key))
+        return entry.stamp if entry is not None else 0
+
+    def invalidate(self, kind: Optional[str] = None, key: Optional[Hashable] = None,
+                   match: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop one entry, every entry of a kind (optionally whose key satisfies ``match``), or everything.
+
+        Returns the number of entries dropped.
+        """
+        with self._lock:
+            doomed = [
+                entry_key for entry_key in self._entries
+                if (kind is None or entry_key[0] == kind) and (key is None or entry_key[1] == key)
+                and (match is None or match(entry_key[1]))
+            ]
+            for entry_key in doomed:
+                del self._entries[entry_key]
+            return len(doomed)
+
+    def refresh(self, kind: str, key: Hashable) -> bool:
+        """Reload an entry now with its own loader; False when it is not cached or its kind keeps no loader.
+
+        Joins a load of the entry that is already in flight rather than starting a second one.
+        """
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is None or entry.loader is None:
+                return False
+            flight = self._inflight.get((kind, key))
+            leader = flight is None
+            if leader:
+                flight = self._inflight[(kind, key)] = Flight()
+            else:
+                self._kind_stats(kind).coalesced += 1
+        if leader:
+            self._fly(flight, kind, key, entry.loader, entry.ttl, entry)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return True
+
+    def keys(self, kind: Optional[str] = None):
+        """Cached (kind, key) pairs, optionally of one kind."""
+        with self._lock:
+            return [entry_key for entry_key in self._entries if kind is None or entry_key[0] == kind]
+
+    def entries(self) -> pd.DataFrame:
+        """Every cached entry with its size, age and hit rate, for the admin panel."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return pd.DataFrame([
+            {
+                "Kind": entry.kind,
+                "Source": str(entry.key),
+                "Size (KB)": round(entry.size / 1024, 1),
+                "Age (s)": int(entry.age),
+                "TTL (s)": int(entry.ttl),
+                "Loaded At": datetime.fromtimestamp(entry.loaded_at).strftime("%Y-%m-%d %H:%M:%S"),
+                "Load Time (s)": round(entry.load_seconds, 2),
+                "Hits": entry.hits,
+                "Loads": entry.loads,
+                "Hit Rate": f"{entry.hits / (entry.hits + entry.loads):.0%}",
+            }
+            for entry in sorted(entries, key=lambda entry: (entry.kind, str(entry.key)))
+        ], columns=["Kind", "Source", "Size (KB)", "Age (s)", "TTL (s)", "Loaded At", "Load Time (s)",
+                    "Hits", "Loads", "Hit Rate"])
+
+    def stats(self) -> pd.DataFrame:
+        """Per-kind usage against its policy, with hit, miss, eviction and expiry counters."""
+        with self._lock:
+            kinds = sorted(set(self._stats) | {entry.kind for entry in self._entries.values()})
+            rows = []
+            for kind in kinds:
+                policy = self.policy(kind)
+                stats = self._kind_stats(kind)
+                entries = [entry for entry in self._entries.values() if entry.kind == kind]
+                size = sum(entry.size for entry in entries)
+                lookups = stats.hits + stats.misses
+                rows.append({
+                    "Kind": kind,
+                    "Entries": f"{len(entries)}/{policy['max_entries']}",
+                    "Memory (MB)": f"{size / MB:.1f}/{policy['max_mb']}",
+                    "TTL (s)": policy["ttl"],
+                    "Eviction": policy["eviction"].upper(),
+                    "Hits": stats.hits,
+                    "Misses": stats.misses,
+                    "Hit Rate": f"{stats.hits / lookups:.0%}" if lookups else "",
+                    "Evictions": stats.evictions,
+                    "Expired": stats.expirations,
+                    "Too Large": stats.oversized,
+                    "Coalesced": stats.coalesced,
+                    "Early Refreshes": stats.early_refreshes,
+                })
+        return pd.DataFrame(rows, columns=["Kind", "Entries", "Memory (MB)", "TTL (s)", "Eviction", "Hits", "Misses",
+                                           "Hit Rate", "Evictions", "Expired", "Too Large", "Coalesced",
+                                           "Early Refreshes"])
+
+    def memory_used(self) -> int:
+        """Bytes held by every cached value."""
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+
+_data_cache: Optional[DataCache] = None
+_data_cache_lock = threading.Lock()
+
+
+def get_data_cache() -> DataCache:
+    """The process-wide data cache."""
+    global _data_cache
+    if _data_cache is None:
+        with _data_cache_lock:
+            if _data_cache is None:
+                _data_cache = DataCache()
+    return _data_cache
@@ -0,0 +1,149 @@
+"""
+Process-wide data manager for the Bigo Live Dashboard.
+Loads each dataset once, hands every caller its own view of the shared frame and memoizes derived frames in the
+shared data cache.
+"""
+
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+import pandas as pd
+
+from config.pay_charts import AGENCY_PAY_CHART, HOST_PAY_CHART
+from utils.data_cache import DERIVED_KIND, get_data_cache
+from utils.payment_rules import get_rule_registry
+
+
+def _copy_on_write() -> bool:
+    return int(pd.__version__.split(".")[0]) >= 3 or bool(pd.get_option("mode.copy_on_write"))
+
+
+def _view(df: pd.DataFrame) -> pd.DataFrame:
+    """A caller's own copy of a shared frame.
+
+    Under copy-on-write a shallow copy shares the data until either side writes, so it is cheap and
+    edits never reach the shared frame; without it only a deep copy isolates the caller.
+    """
+    return df.copy(deep=not _copy_on_write())
+
+
+class DataManager:
+    """Loads datasets once per process and caches frames derived from them."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaders: Dict[str, Callable[[], pd.DataFrame]] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._versions: Dict[str, int] = {}
+        self._sources: Dict[str, str] = {}
+        self._loaded_at: Dict[str, datetime] = {}
+
+        self.register_loader('host_pay', lambda: pd.DataFrame(HOST_PAY_CHART), source="config/pay_charts.py")
+        self.register_loader('agency_pay', lambda: pd.DataFrame(AGENCY_PAY_CHART), source="config/pay_charts.py")
+
+    def register_loader(self, name: str, loader: Callable[[], pd.DataFrame], source: str = "loader"):
+        """Register how to build a dataset the first time it is requested."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._sources.setdefault(name, source)
+
+    def datasets(self) -> Iterable[str]:
+        """Names of every dataset the manager can serve."""
+        return sorted(set(self._loaders) | set(self._frames))
+
+    def load_data(self, name: str) -> pd.DataFrame:
+        """A dataset, built at most once per version; callers may modify the frame they get."""
+        frame = self._frames.get(name)
+        if frame is not None:
+            return _view(frame)
+
+        with self._lock:
+            if name not in self._frames:
+                if name not in self._loaders:
+                    raise KeyError(f"Unknown dataset: {name}")
+                self._store(name, self._loaders[name](), self._sources.get(name, "loader"))
+            return _view(self._frames[name])
+
+    def set_data(self, name: str, df: pd.DataFrame, source: str = "upload") -> str:
+        """Publish a new version of a dataset and drop the derived frames built from it."""
+        with self._lock:
+            self._store(name, df.copy(), source)
+            get_data_cache().invalidate(DERIVED_KIND, match=lambda key: name in key[1])
+            return self.version(name)
+
+    def _store(self, name: str, df: pd.DataFrame, source: str):
+        version = self._versions.get(name, 0) + 1
+        df.attrs["dataset"] = name
+        df.attrs["version"] = f"{name}@{version}"
+        self._frames[name] = df
+        self._versions[name] = version
+        self._sources[name] = source
+        self._loaded_at[name] = datetime.now()
+
+    def version(self, name: str) -> str:
+        """Version stamp for a dataset, e.g. ``host_pay@2``; loads it if needed."""
+        if name not in self._versions:
+            self.load_data(name)
+        return f"{name}@{self._versions[name]}"
+
+    def info(self) -> pd.DataFrame:
+        """Summary of loaded datasets for admin views."""
+        return pd.DataFrame([
+            {
+                "Dataset": name,
+                "Version": self.version(name),
+                "Source": self._sources.get(name, ""),
+                "Rows": len(self._frames[name]),
+                "Loaded At": self._loaded_at[name].strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for name in sorted(self._frames)
+        ])
+
+    def derived(self, key: str, dependencies: Iterable[str], builder: Callable[..., pd.DataFrame]) -> pd.DataFrame:
+        """Memoized frame built from other datasets; rebuilt when a dependency version changes or the cache evicts it."""
+        dependencies = tuple(dependencies)
+        cache_key = (key, dependencies, tuple(self.version(dep) for dep in dependencies))
+        cache = get_data_cache()
+        frame = cache.peek(DERIVED_KIND, cache_key)
+        if frame is not None:
+            return _view(frame)
+
+        def build() -> pd.DataFrame:
+            frame = builder(*(self.load_data(dep) for dep in dependencies))
+            frame.attrs["version"] = "+".join(cache_key[2])
+            return frame
+
+        with self._lock:
+            return _view(cache.get(DERIVED_KIND, cache_key, build))
+
+    def pay_comparison(self) -> pd.DataFrame:
+        """Host pay chart joined to the agency pay chart by ranking."""
+        return self.derived(
+            'host_agency_comparison',
+            ['host_pay', 'agency_pay'],
+            lambda host, agency: host.merge(agency, on='Ranking', suffixes=('_host', '_agency')),
+        )
+
+    def update_conversion_rates(self, beans_to_diamond: float, diamond_to_usd: float,
+                                effective_from: Optional[datetime] = None):
+        """Publish new conversion rates through the payment rule registry, in force from ``effective_from``."""
+        return get_rule_registry().update(
+            {"beans_to_diamonds_rate": beans_to_diamond, "diamond_to_usd_rate": diamond_to_usd},
+            note="Conversion rates updated",
+            effective_from=effective_from,
+        )
+
+
+_data_manager: Optional[DataManager] = None
+_data_manager_lock = threading.Lock()
+
+
+def get_data_manager() -> DataManager:
+    """The process-wide data manager."""
+    global _data_manager
+    if _data_manager is None:
+        with _data_manager_lock:
+            if _data_manager is None:
+                _data_manager = DataManager()
+    return _data_manager
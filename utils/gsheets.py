@@ -1,7 +1,17 @@
+import io
+import time
 import pandas as pd
 import re
-from typing import Optional
+from typing import Optional, Tuple
 import requests
+import urllib3
+
+from config.settings import SOURCE_CONFIG
+
+# Columns kept from the PK schedule sheets
+SHEET_COLUMNS = ["Date", "Time", "Agency Name.1", "ID1", "Agency Name.2", "ID.2"]
+SHEET_TIMEOUT = (SOURCE_CONFIG["connect_timeout"], SOURCE_CONFIG["read_timeout"])
+DOWNLOAD_BLOCK_BYTES = 64 * 1024
 
 def url_to_csv(sheet_url: str) -> str:
     """Convert a Google Sheets URL to a downloadable CSV URL"""
@@ -21,39 +31,62 @@ def url_to_csv(sheet_url: str) -> str:
     
     return f"{base_url}/export?format=csv&gid={gid}"
 
+def fetch_csv(csv_url: str, timeout: Tuple[float, float] = SHEET_TIMEOUT) -> pd.DataFrame:
+    """Download a CSV export within ``timeout`` = (connect, total) seconds.
+
+    The total is a wall-clock deadline for the whole download, checked as the body streams in, so a
+    slowly trickling response cannot run past it. Raises requests.RequestException on network errors,
+    an error status or a missed deadline, and ValueError when Google answers with a web page
+    (usually a sheet that is not shared) instead of CSV.
+    """
+    connect_timeout, total = timeout
+    deadline = time.monotonic() + total
+    body = io.BytesIO()
+    with requests.get(csv_url, timeout=(connect_timeout, total), stream=True) as response:
+        response.raise_for_status()
+        if "text/html" in response.headers.get("Content-Type", ""):
+            raise ValueError("Sheet returned a web page instead of CSV; check that it is shared")
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"Sheet download took longer than {total:g}s")
+            # Each read waits at most until the deadline and returns whatever has arrived
+            sock = getattr(response.raw.connection, "sock", None)
+            if sock is not None:
+                sock.settimeout(remaining)
+            try:
+                block = response.raw.read1(DOWNLOAD_BLOCK_BYTES, decode_content=True)
+            except (urllib3.exceptions.ReadTimeoutError, TimeoutError) as e:
+                raise requests.exceptions.Timeout(f"Sheet download took longer than {total:g}s") from e
+            if not block:
+                break
+            body.write(block)
+    body.seek(0)
+    try:
+        return pd.read_csv(body)
+    except pd.errors.EmptyDataError:
+        print("Warning: Sheet appears to be empty")
+        return pd.DataFrame()
+
+
+def read_sheet_columns(sheet_url: str, timeout: Tuple[float, float] = SHEET_TIMEOUT) -> pd.DataFrame:
+    """PK columns of a Google Sheet with empty rows dropped; raises when the sheet cannot be fetched."""
+    df = fetch_csv(url_to_csv(sheet_url), timeout)
+    existing_columns = [col for col in SHEET_COLUMNS if col in df.columns]
+    if not existing_columns:
+        if not df.empty:
+            print(f"Warning: None of the expected columns found in sheet")
+        return pd.DataFrame()
+    return df.loc[:, existing_columns].dropna(how="all")
+
+
 def read_filtered_columns(sheet_url: str) -> pd.DataFrame:
     """Read specific columns from a Google Sheet and return filtered DataFrame"""
-    csv_url = url_to_csv(sheet_url)
-    
     try:
-        # First check if the URL is accessible
-        response = requests.head(csv_url, timeout=10)
-        if response.status_code != 200:
-            print(f"Warning: Sheet URL returned status {response.status_code}")
-            return pd.DataFrame()
-        
-        # Read the CSV data
-        df = pd.read_csv(csv_url)
-        
-        # Define columns to extract
-        columns_to_keep = ["Date", "Time", "Agency Name.1", "ID1", "Agency Name.2", "ID.2"]
-        existing_columns = [col for col in columns_to_keep if col in df.columns]
-        
-        if not existing_columns:
-            print(f"Warning: None of the expected columns found in sheet")
-            return pd.DataFrame()
-        
-        # Filter and clean the data
-        filtered_df = df.loc[:, existing_columns].dropna(how="all")  # Drop empty rows
-        
+        return read_sheet_columns(sheet_url)
     except requests.exceptions.RequestException as e:
         print(f"Network error loading sheet: {str(e)}")
         return pd.DataFrame()
-    except pd.errors.EmptyDataError:
-        print("Warning: Sheet appears to be empty")
-        return pd.DataFrame()
     except Exception as e:
         print(f"Error loading sheet: {str(e)}")
         return pd.DataFrame()
-    
-    return filtered_df
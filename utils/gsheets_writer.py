@@ -2,6 +2,9 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 
+from utils.audit_log import WRITE_BACK, audit
+from utils.sheets_quota import PRIORITY_WRITE_BACK, sheets_call
+
 SCOPES = ["https://spreadsheets.google.com/feeds",
           "https://www.googleapis.com/auth/drive"]
 
@@ -14,14 +17,29 @@ def get_client():
 def extract_sheet_id(url: str) -> str:
     return url.split("/d/")[1].split("/")[0]
 
-def write_dataframe_to_sheet(sheet_url: str, worksheet_name: str, df: pd.DataFrame, clear_existing=True):
-    gc = get_client()
+def write_dataframe_to_sheet(sheet_url: str, worksheet_name: str, df: pd.DataFrame, clear_existing=True,
+                             priority=PRIORITY_WRITE_BACK):
+    """Write ``df`` (with a header row) to a worksheet, creating it if needed.
+
+    Each API request waits its turn in the shared Sheets quota scheduler and is retried after 429s.
+    """
     sheet_id = extract_sheet_id(sheet_url)
-    sh = gc.open_by_key(sheet_id)
+
+    def api(fn):
+        return sheets_call(sheet_id, fn, priority)
+
     try:
-        ws = sh.worksheet(worksheet_name)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=worksheet_name, rows="1000", cols="26")
-    if clear_existing:
-        ws.clear()
-    ws.update([df.columns.tolist()] + df.values.tolist())
+        gc = get_client()
+        sh = api(lambda: gc.open_by_key(sheet_id))
+        try:
+            ws = api(lambda: sh.worksheet(worksheet_name))
+        except gspread.exceptions.WorksheetNotFound:
+            ws = api(lambda: sh.add_worksheet(title=worksheet_name, rows="1000", cols="26"))
+        if clear_existing:
+            api(ws.clear)
+        rows = [df.columns.tolist()] + df.values.tolist()
+        api(lambda: ws.update(rows))
+    except Exception as e:
+        audit(WRITE_BACK, ok=False, sheet=sheet_id, worksheet=worksheet_name, rows=len(df), error=str(e))
+        raise
+    audit(WRITE_BACK, sheet=sheet_id, worksheet=worksheet_name, rows=len(df), cleared=clear_existing)
@@ -0,0 +1,249 @@
+"""
+Append-only local history of PK sheet snapshots.
+Stores each distinct row once in date-partitioned Parquet files, with an add/remove event log for point-in-time reads.
+"""
+
+import glob
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import HISTORY_DIR
+from utils.pk_data import PK_ROW_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # history is optional; the dashboard still works from the live sheets
+    pa = pq = None
+
+HISTORY_COLUMNS = PK_ROW_COLUMNS + ["Source Sheet"]
+ROWS_DIR = "rows"
+EVENTS_DIR = "events"
+UNDATED_PARTITION = "date=unknown"
+# A partition with more part files than this is merged into one file after the next write
+COMPACT_AFTER_FILES = 8
+
+ADDED = 1
+REMOVED = -1
+
+
+def _partition_day(name: str) -> Optional[pd.Timestamp]:
+    """The day a partition directory holds, or None for undated rows."""
+    value = name.split("=", 1)[-1]
+    return None if name == UNDATED_PARTITION else pd.Timestamp(value)
+
+
+def _empty_events() -> pd.DataFrame:
+    return pd.DataFrame({
+        "row_hash": pd.Series(dtype="uint64"),
+        "event": pd.Series(dtype="int8"),
+        "source": pd.Series(dtype="string"),
+        "at": pd.Series(dtype="datetime64[ns]"),
+    })
+
+
+class HistoryStore:
+    """Snapshots of the combined PK frame, kept as unique rows plus the times they appeared and disappeared."""
+
+    def __init__(self, root: str = HISTORY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._events: Optional[pd.DataFrame] = None
+
+    @property
+    def available(self) -> bool:
+        return pq is not None
+
+    def _dir(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _write(self, frame: pd.DataFrame, directory: str, name: str):
+        """Write one Parquet file atomically so readers never see a partial file."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _read(files: List[str]) -> pd.DataFrame:
+        # Partition directories hold plain files; hive-style "date=" discovery would add a column
+        return pq.read_table(files, partitioning=None).to_pandas()
+
+    def _load_events(self) -> pd.DataFrame:
+        if self._events is None:
+            files = sorted(glob.glob(self._dir(EVENTS_DIR, "*.parquet")))
+            self._events = self._read(files) if files else _empty_events()
+        return self._events
+
+    def _present(self, as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """Add events of rows present at ``as_of`` (latest snapshot when None): their last event is an add."""
+        events = self._load_events()
+        if as_of is not None:
+            events = events[events["at"] <= pd.Timestamp(as_of)]
+        last = events.sort_values("at", kind="stable").drop_duplicates("row_hash", keep="last")
+        return last[last["event"] == ADDED]
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        """History columns as strings, so sheet type drift does not change row hashes."""
+        frame = pd.DataFrame(index=range(len(df)))
+        for col in HISTORY_COLUMNS:
+            values = df[col].reset_index(drop=True) if col in df.columns else pd.Series(pd.NA, index=frame.index)
+            frame[col] = values.astype("string").str.strip()
+        return frame
+
+    def append_snapshot(self, df: pd.DataFrame, taken_at: Optional[datetime] = None) -> Dict[str, int]:
+        """Persist a snapshot: new distinct rows go to their date partition, and adds/removes go to the event log."""
+        if not self.available:
+            raise RuntimeError("The history store requires the 'pyarrow' package")
+        taken_at = pd.Timestamp(taken_at or datetime.now())
+        stamp = taken_at.strftime("%Y%m%dT%H%M%S%f")
+
+        with self._lock:
+            frame = self._normalize(df)
+            frame["row_hash"] = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+            frame = frame.drop_duplicates("row_hash")
+            hashes = frame["row_hash"].to_numpy(dtype=np.uint64)
+
+            events = self._load_events()
+            present = self._present()
+            present_hashes = present["row_hash"].to_numpy(dtype=np.uint64)
+            stored = events.loc[events["event"] == ADDED, "row_hash"].to_numpy(dtype=np.uint64)
+            added = ~np.isin(hashes, present_hashes)
+            # Only sheets in this snapshot can lose rows; a sheet that failed to load keeps its rows
+            removed = present[present["source"].isin(frame["Source Sheet"].dropna().unique())
+                              & ~np.isin(present_hashes, hashes)]
+
+            new_rows = frame[~np.isin(hashes, stored)].copy()
+            new_rows["first_seen"] = taken_at
+            days = pd.to_datetime(new_rows["Date"], errors="coerce").dt.normalize()
+            touched = []
+            for day, rows in new_rows.groupby(days.dt.strftime("date=%Y-%m-%d").fillna(UNDATED_PARTITION)):
+                self._write(rows, self._dir(ROWS_DIR, day), f"part-{stamp}.parquet")
+                touched.append(day)
+
+            if added.any() or len(removed):
+                new_events = pd.concat([
+                    pd.DataFrame({"row_hash": hashes[added], "event": np.int8(ADDED), "source": frame["Source Sheet"].to_numpy()[added]}),
+                    pd.DataFrame({"row_hash": removed["row_hash"].to_numpy(), "event": np.int8(REMOVED), "source": removed["source"].to_numpy()}),
+                ], ignore_index=True)
+                new_events = new_events.astype({"row_hash": "uint64", "event": "int8", "source": "string"})
+                new_events["at"] = np.datetime64(taken_at.to_datetime64(), "ns")
+                self._write(new_events, self._dir(EVENTS_DIR), f"part-{stamp}.parquet")
+                self._events = pd.concat([events, new_events], ignore_index=True) if len(events) else new_events
+
+            for partition in touched:
+                if len(glob.glob(self._dir(ROWS_DIR, partition, "*.parquet"))) > COMPACT_AFTER_FILES:
+                    self._compact_dir(self._dir(ROWS_DIR, partition), stamp)
+            if len(glob.glob(self._dir(EVENTS_DIR, "*.parquet"))) > COMPACT_AFTER_FILES:
+                self._compact_dir(self._dir(EVENTS_DIR), stamp)
+
+            return {"added": int(added.sum()), "removed": int(len(removed)), "stored": int(len(new_rows))}
+
+    def _compact_dir(self, directory: str, stamp: str):
+        """Merge every part file in a directory into one."""
+        files = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+        if len(files) < 2:
+            return
+        merged = self._read(files)
+        self._write(merged, directory, f"part-{stamp}-compacted.parquet")
+        for path in files:
+            os.remove(path)
+
+    def compact(self) -> int:
+        """Merge the part files of every partition and of the event log; returns directories compacted."""
+        if not self.available:
+            return 0
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        compacted = 0
+        with self._lock:
+            for directory in self._partitions() + [self._dir(EVENTS_DIR)]:
+                if len(glob.glob(os.path.join(directory, "*.parquet"))) > 1:
+                    self._compact_dir(directory, stamp)
+                    compacted += 1
+        return compacted
+
+    def _partitions(self) -> List[str]:
+        return sorted(path for path in glob.glob(self._dir(ROWS_DIR, "date=*")) if os.path.isdir(path))
+
+    def read_range(self, start=None, end=None, as_of: Optional[datetime] = None,
+                   include_removed: bool = False) -> pd.DataFrame:
+        """Rows dated within [start, end] as they stood at ``as_of`` (latest snapshot when None).
+
+        Only partitions whose day falls in the range are opened; undated rows are included
+        when no date bound is given. ``include_removed`` returns every stored row version.
+        """
+        if not self.available:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        start = None if start is None else pd.Timestamp(start).normalize()
+        end = None if end is None else pd.Timestamp(end).normalize()
+
+        # Hold the lock while reading so compaction cannot remove files mid-read
+        with self._lock:
+            files = []
+            for directory in self._partitions():
+                day = _partition_day(os.path.basename(directory))
+                if day is None:
+                    if start is not None or end is not None:
+                        continue
+                elif (start is not None and day < start) or (end is not None and day > end):
+                    continue
+                files.extend(sorted(glob.glob(os.path.join(directory, "*.parquet"))))
+            if not files:
+                return pd.DataFrame(columns=HISTORY_COLUMNS + ["row_hash", "first_seen"])
+
+            rows = self._read(files)
+            if include_removed:
+                return rows
+            present = self._present(as_of)["row_hash"].to_numpy(dtype=np.uint64)
+        return rows[np.isin(rows["row_hash"].to_numpy(dtype=np.uint64), present)].reset_index(drop=True)
+
+    def events(self) -> pd.DataFrame:
+        """The add/remove event log, oldest first."""
+        if not self.available:
+            return _empty_events()
+        with self._lock:
+            return self._load_events().sort_values("at", kind="stable").reset_index(drop=True)
+
+    def snapshots(self) -> pd.DataFrame:
+        """Rows added and removed at each stored snapshot."""
+        with self._lock:
+            events = self._load_events()
+        if events.empty:
+            return pd.DataFrame(columns=["Snapshot", "Added", "Removed"])
+        summary = events.groupby(["at", "event"]).size().unstack(fill_value=0)
+        return pd.DataFrame({
+            "Snapshot": summary.index,
+            "Added": summary.get(ADDED, 0),
+            "Removed": summary.get(REMOVED, 0),
+        }).reset_index(drop=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Partition, file and size totals for the store."""
+        partitions = self._partitions()
+        files = [path for directory in partitions for path in glob.glob(os.path.join(directory, "*.parquet"))]
+        files += glob.glob(self._dir(EVENTS_DIR, "*.parquet"))
+        return {
+            "partitions": len(partitions),
+            "files": len(files),
+            "bytes": sum(os.path.getsize(path) for path in files),
+        }
+
+
+_history_store: Optional[HistoryStore] = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """The process-wide history store."""
+    global _history_store
+    if _history_store is None:
+        with _history_store_lock:
+            if _history_store is None:
+                _history_store = HistoryStore()
+    return _history_store
@@ -0,0 +1,177 @@
+"""
+Batch mode for the Host Pay Calculator.
+Computes the pay breakdown for a whole table of hosts and writes one streamed Excel report.
+"""
+
+import hashlib
+import io
+from datetime import datetime
+from typing import Dict, Mapping
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import xlsxwriter
+
+from utils.calculators import HOST_PAY_METRICS
+from utils.chunked_reader import detect_format, iter_chunks
+from utils.data_cache import EXPORT_KIND, UPLOAD_KIND, frame_fingerprint, get_data_cache
+from utils.money import from_minor_units, to_minor_units
+from utils.payment_rules import HOST_PAY_RULE_KEYS, RuleSet
+
+BATCH_COLUMN_ALIASES = {
+    "id": "host_id",
+    "name": "host_name",
+    "diamonds": "diamonds_earned",
+    "hours": "hours_streamed",
+    "daily_tasks_completed": "tasks_completed",
+    "tasks": "tasks_completed",
+    "special_events": "events_participated",
+    "events": "events_participated",
+}
+
+# Breakdown keys and the report columns they appear under
+BREAKDOWN_COLUMNS = {
+    "base_pay": "Base Pay",
+    "diamond_earnings": "Diamond Earnings",
+    "pk_bonus": "PK Win Bonus",
+    "task_earnings": "Task Bonus",
+    "event_earnings": "Event Bonus",
+    "pk_penalties": "PK Loss Penalty",
+    "other_deductions": "Other Deductions",
+    "total_deductions": "Total Deductions",
+    "gross_pay": "Gross Pay",
+    "net_pay": "Net Pay",
+}
+
+
+def batch_template() -> pd.DataFrame:
+    """Example table showing the columns batch mode accepts."""
+    row = {"host_id": "123456", "host_name": "Example Host", **HOST_PAY_METRICS}
+    row.update({"diamonds_earned": 25000, "hours_streamed": 40.5, "pk_wins": 12, "pk_losses": 4})
+    return pd.DataFrame([row])
+
+
+def _normalize_columns(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Map headers such as "Hours Streamed" or "Special Events" onto batch column names."""
+    renamed = {}
+    for col in chunk.columns:
+        key = str(col).strip().lower().replace(" ", "_")
+        renamed[col] = BATCH_COLUMN_ALIASES.get(key, key)
+    return chunk.rename(columns=renamed)
+
+
+def read_host_metrics(data: bytes, filename: str) -> pd.DataFrame:
+    """Read an uploaded host table chunk by chunk into typed metric columns.
+
+    Raises ValueError when required columns are missing or metric values are not non-negative numbers.
+    """
+    frames = []
+    row_offset = 0
+    for chunk in iter_chunks(data, detect_format(filename), dtype={"host_id": "string", "id": "string"}):
+        chunk = _normalize_columns(chunk)
+        if "host_id" not in chunk.columns:
+            raise ValueError("Missing required column: host_id")
+
+        table = pd.DataFrame({
+            "host_id": chunk["host_id"].astype("string").str.strip(),
+            "host_name": chunk["host_name"].astype("string").str.strip() if "host_name" in chunk.columns else "",
+        })
+        for name, default in HOST_PAY_METRICS.items():
+            if name not in chunk.columns:
+                table[name] = default
+                continue
+            values = pd.to_numeric(chunk[name], errors="coerce")
+            invalid = (values.isna() & chunk[name].notna()) | (values < 0)
+            if invalid.any():
+                first = int(np.flatnonzero(invalid.to_numpy())[0]) + row_offset + 2
+                raise ValueError(f"{int(invalid.sum())} invalid values in {name} (first at row {first})")
+            table[name] = values.fillna(default)
+
+        frames.append(table)
+        row_offset += len(chunk)
+
+    if not frames:
+        raise ValueError("The uploaded file has no rows")
+    return pd.concat(frames, ignore_index=True)
+
+
+def _cached_host_metrics(content_hash: str, filename: str, data: bytes) -> pd.DataFrame:
+    """Parsed host table, cached by upload content hash."""
+    def load() -> pd.DataFrame:
+        with st.spinner("Reading host table..."):
+            return read_host_metrics(data, filename)
+
+    return get_data_cache().get(UPLOAD_KIND, ("host_metrics", content_hash, filename), load)
+
+
+def load_host_metrics_upload(uploaded_file) -> pd.DataFrame:
+    """Parse an uploaded host table once per distinct file content."""
+    data = uploaded_file.getvalue()
+    return _cached_host_metrics(hashlib.sha256(data).hexdigest(), uploaded_file.name, data)
+
+
+def calculate_host_pay_batch(metrics: pd.DataFrame, rules: RuleSet, overrides: Mapping[str, float] = None) -> pd.DataFrame:
+    """Full pay breakdown for every host row, computed column-wise in minor units."""
+    breakdown = rules.host_pay({name: metrics[name].to_numpy() for name in HOST_PAY_METRICS}, overrides)
+    host_count = len(metrics)
+    results = metrics.copy()
+    for key, column in BREAKDOWN_COLUMNS.items():
+        results[column] = from_minor_units(np.broadcast_to(breakdown[key], host_count))
+    return results
+
+
+def batch_totals(results: pd.DataFrame) -> Dict[str, float]:
+    """Column totals for the money columns, summed exactly in minor units."""
+    return {
+        column: float(from_minor_units(to_minor_units(results[column].to_numpy()).sum()))
+        for column in BREAKDOWN_COLUMNS.values()
+    }
+
+
+def write_host_pay_report(results: pd.DataFrame, rates: Mapping[str, float]) -> bytes:
+    """Write a multi-host report, streaming rows with xlsxwriter's constant-memory mode."""
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    header_format = workbook.add_format({"bold": True, "bg_color": "#FF6A00", "font_color": "white"})
+    money_format = workbook.add_format({"num_format": "$#,##0.00"})
+    total_format = workbook.add_format({"bold": True, "num_format": "$#,##0.00", "top": 1})
+
+    worksheet = workbook.add_worksheet("Host Pay")
+    columns = list(results.columns)
+    money_start = len(columns) - len(BREAKDOWN_COLUMNS)
+    worksheet.set_column(0, money_start - 1, 16)
+    worksheet.set_column(money_start, len(columns) - 1, 16, money_format)
+    worksheet.write_row(0, 0, columns, header_format)
+
+    # Rows must be written in order in constant-memory mode; blanks become empty cells
+    cells = results.astype(object).where(results.notna(), None)
+    row = 0
+    for row, values in enumerate(cells.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row, 0, values)
+
+    totals = batch_totals(results)
+    total_row = row + 1
+    worksheet.write(total_row, 0, "TOTAL", header_format)
+    for offset, column in enumerate(BREAKDOWN_COLUMNS.values()):
+        worksheet.write_number(total_row, money_start + offset, totals[column], total_format)
+
+    rates_sheet = workbook.add_worksheet("Rates")
+    rates_sheet.set_column(0, 1, 24)
+    rates_sheet.write_row(0, 0, ["Report Generated", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+    rates_sheet.write_row(1, 0, ["Hosts", len(results)])
+    for i, name in enumerate(HOST_PAY_RULE_KEYS, start=3):
+        rates_sheet.write_row(i, 0, [name.replace("_", " ").title(), rates[name]])
+
+    workbook.close()
+    return output.getvalue()
+
+
+def build_host_pay_report(results: pd.DataFrame, rates: Dict[str, float]) -> bytes:
+    """Cached multi-host report so reruns do not rewrite the workbook."""
+    def build() -> bytes:
+        with st.spinner("Building report..."):
+            return write_host_pay_report(results, rates)
+
+    key = ("host_pay_report", frame_fingerprint(results), tuple(sorted(rates.items())))
+    return get_data_cache().get(EXPORT_KIND, key, build)
@@ -0,0 +1,127 @@
+"""
+Tracked background jobs for long admin operations.
+Runs work on a daemon thread and records its state and progress so any rerun can show it.
+"""
+
+import itertools
+import threading
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs kept for display
+MAX_FINISHED_JOBS = 20
+
+
+class Job:
+    """State of one background job; ``report`` is handed to the work function to publish progress."""
+
+    def __init__(self, job_id: int, name: str):
+        self.id = job_id
+        self.name = name
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error: Optional[str] = None
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def report(self, progress: float, message: str = ""):
+        self.progress = min(max(progress, 0.0), 1.0)
+        self.message = message
+
+    @property
+    def active(self) -> bool:
+        return self.state in (QUEUED, RUNNING)
+
+
+class JobRunner:
+    """Starts jobs on background threads, at most one active job per name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, Job] = {}
+
+    def submit(self, name: str, work: Callable[[Job], object]) -> Job:
+        """Run ``work(job)`` in the background; returns the already active job of that name if there is one."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.name == name and job.active:
+                    return job
+            job = Job(next(self._ids), name)
+            self._jobs[job.id] = job
+            self._prune()
+
+        thread = threading.Thread(target=self._run, args=(job, work), name=f"job-{job.id}-{name}", daemon=True)
+        thread.start()
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], object]):
+        job.state = RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.result = work(job)
+            job.report(1.0, "Finished")
+            job.state = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.state = FAILED
+            print(f"Background job {job.name} failed: {e}")
+            traceback.print_exc()
+        finally:
+            job.finished_at = datetime.now()
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.id)
+        for job in finished[:-MAX_FINISHED_JOBS]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def latest(self, name: str) -> Optional[Job]:
+        """Most recently submitted job with this name."""
+        jobs: List[Job] = [job for job in self._jobs.values() if job.name == name]
+        return max(jobs, key=lambda job: job.id) if jobs else None
+
+    def jobs(self) -> pd.DataFrame:
+        """Every tracked job, newest first."""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.id, reverse=True)
+        return pd.DataFrame([
+            {
+                "Job": job.id,
+                "Name": job.name,
+                "State": job.state,
+                "Progress": f"{job.progress:.0%}",
+                "Message": job.error or job.message,
+                "Started": job.started_at.strftime("%H:%M:%S") if job.started_at else "",
+                "Duration (s)": round(((job.finished_at or datetime.now()) - job.started_at).total_seconds(), 1)
+                if job.started_at else None,
+            }
+            for job in jobs
+        ], columns=["Job", "Name", "State", "Progress", "Message", "Started", "Duration (s)"])
+
+
+_job_runner: Optional[JobRunner] = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """The process-wide background job runner."""
+    global _job_runner
+    if _job_runner is None:
+        with _job_runner_lock:
+            if _job_runner is None:
+                _job_runner = JobRunner()
+    return _job_runner
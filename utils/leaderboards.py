@@ -0,0 +1,212 @@
+"""
+Incremental top-k leaderboards for hosts and agencies.
+Keeps all-time, daily, weekly and monthly boards by PK count, diamonds and payout as new rows arrive.
+"""
+
+import heapq
+import threading
+from datetime import date
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.money import from_minor_units, to_minor_units
+from utils.pk_data import AppendTracker, normalize_ids, normalize_names
+from utils.pk_rollups import participants
+
+# Entries kept per board; pages read any prefix of it
+LEADERBOARD_SIZE = 100
+
+PERIODS = ["all", "day", "week", "month"]
+HOST = "host"
+AGENCY = "agency"
+PK_COUNT = "pk_count"
+DIAMONDS = "diamonds"
+PAYOUT = "payout"
+
+# metric: (score column, entities it is tracked for)
+METRICS = {
+    PK_COUNT: ("Matches", (HOST, AGENCY)),
+    DIAMONDS: ("Diamonds", (HOST,)),
+    PAYOUT: ("Net Pay", (HOST,)),
+}
+ENTITY_COLUMNS = {HOST: "Host ID", AGENCY: "Agency"}
+
+
+def period_start(days: pd.Series, period: str) -> pd.Series:
+    """First day of the day, week (Monday) or month each day falls in."""
+    days = pd.to_datetime(days, errors="coerce").dt.normalize()
+    if period == "week":
+        return days - pd.to_timedelta(days.dt.weekday, unit="D")
+    if period == "month":
+        return days - pd.to_timedelta(days.dt.day - 1, unit="D")
+    return days
+
+
+class TopK:
+    """Running totals per key with the k highest kept in order.
+
+    While every update only raises scores, a key outside the board can only enter it by being
+    updated itself, so each batch re-ranks just the current board plus the updated keys. A lowered
+    score on the board falls back to a full O(n log k) selection over the totals.
+    """
+
+    def __init__(self, k: int = LEADERBOARD_SIZE):
+        self.k = k
+        self.totals: Dict[str, int] = {}
+        self._board: List[Tuple[str, int]] = []
+
+    def update(self, keys: Iterable[str], deltas: Iterable[int]):
+        """Add a batch of (key, delta) pairs; keys should be distinct within the batch."""
+        keys, deltas = list(keys), [int(delta) for delta in deltas]
+        on_board = {key for key, _ in self._board}
+        totals = self.totals
+        totals.update({key: totals.get(key, 0) + delta for key, delta in zip(keys, deltas)})
+
+        if any(delta < 0 and key in on_board for key, delta in zip(keys, deltas)):
+            candidates = totals.items()
+        else:
+            candidates = [(key, totals[key]) for key in on_board.union(keys)]
+        self._board = heapq.nsmallest(self.k, candidates, key=lambda item: (-item[1], item[0]))
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """The n highest (key, score) pairs, best first."""
+        return self._board if n is None else self._board[:n]
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+
+class PeriodBoards:
+    """One metric's all-time board plus a board per day, week and month."""
+
+    def __init__(self):
+        self.boards: Dict[Tuple[str, Optional[pd.Timestamp]], TopK] = {}
+
+    def update(self, keys: pd.Series, days: pd.Series, scores: pd.Series):
+        frame = pd.DataFrame({"key": keys.to_numpy(dtype=object), "day": pd.to_datetime(days).to_numpy(),
+                              "score": scores.to_numpy()}).dropna(subset=["key"])
+        if frame.empty:
+            return
+        totals = frame.groupby("key", sort=False)["score"].sum()
+        self.boards.setdefault(("all", None), TopK()).update(totals.index.tolist(), totals.tolist())
+
+        dated = frame.dropna(subset=["day"])
+        for period in PERIODS[1:]:
+            grouped = dated.groupby([period_start(dated["day"], period), "key"], sort=False)["score"].sum()
+            for start, group in grouped.groupby(level=0, sort=False):
+                board = self.boards.setdefault((period, pd.Timestamp(start)), TopK())
+                board.update(group.index.get_level_values("key").tolist(), group.tolist())
+
+    def board(self, period: str = "all", day: Optional[date] = None) -> Optional[TopK]:
+        if period == "all":
+            return self.boards.get(("all", None))
+        start = period_start(pd.Series([pd.Timestamp(day)]), period).iloc[0]
+        return self.boards.get((period, start))
+
+    def periods(self, period: str) -> List[pd.Timestamp]:
+        return sorted(start for kind, start in self.boards if kind == period)
+
+
+class Leaderboards:
+    """Host and agency leaderboards fed by the combined PK frame and by batch pay results."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tracker = AppendTracker()
+        self._boards: Dict[Tuple[str, str], PeriodBoards] = {}
+        # (batch, day) -> per-host diamonds and payout that batch last added to the boards
+        self._batches: Dict[Tuple[Hashable, pd.Timestamp], pd.DataFrame] = {}
+        self.reset()
+
+    def reset(self):
+        """Drop every board and forget which rows and batches have been seen."""
+        self._tracker.reset()
+        self._boards = {(entity, metric): PeriodBoards() for metric, (_, entities) in METRICS.items() for entity in entities}
+        self._batches = {}
+
+    def _clear_pk(self):
+        for entity in METRICS[PK_COUNT][1]:
+            self._boards[(entity, PK_COUNT)] = PeriodBoards()
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Count PK matches from rows appended to the combined PK frame; returns the rows applied."""
+        with self._lock:
+            positions = self._tracker.new_rows(df)
+            if positions is None:
+                self._clear_pk()
+                positions = np.arange(len(df))
+            rows = df.iloc[positions]
+            if rows.empty:
+                return 0
+
+            dates = rows["Date"] if "Date" in rows.columns else pd.Series(pd.NaT, index=rows.index)
+            days = pd.to_datetime(dates, errors="coerce").dt.normalize()
+            for entity, column_index, normalize in ((AGENCY, 0, normalize_names), (HOST, 1, normalize_ids)):
+                matches = participants(rows, days, column_index, normalize)
+                self._boards[(entity, PK_COUNT)].update(matches["key"], matches["day"],
+                                                        pd.Series(1, index=matches.index))
+            return len(rows)
+
+    def record_payouts(self, results: pd.DataFrame, batch: Hashable, day: Optional[date] = None) -> bool:
+        """Put a batch of host pay results (diamonds and net pay) on the boards for ``day`` (today when None).
+
+        ``batch`` identifies the uploaded input rather than the results: recording the same batch
+        again, e.g. on a rerun at other rates, replaces its hosts' previous totals instead of adding
+        to them. Returns False when the boards did not change.
+        """
+        if results.empty:
+            return False
+        day = pd.Timestamp(day or date.today()).normalize()
+        totals = pd.DataFrame({
+            "host": normalize_ids(results["host_id"]).to_numpy(dtype=object),
+            DIAMONDS: np.rint(results["diamonds_earned"].to_numpy(dtype=np.float64)).astype(np.int64),
+            # Payouts are ranked in exact minor units
+            PAYOUT: to_minor_units(results["Net Pay"].to_numpy()),
+        }).groupby("host", sort=False).sum()
+        with self._lock:
+            previous = self._batches.get((batch, day))
+            deltas = totals if previous is None else totals.sub(previous, fill_value=0).astype(np.int64)
+            deltas = deltas[deltas.ne(0).any(axis=1)]
+            self._batches[(batch, day)] = totals
+            if deltas.empty:
+                return False
+
+            hosts = pd.Series(deltas.index, dtype=object)
+            days = pd.Series(day, index=hosts.index)
+            for metric in (DIAMONDS, PAYOUT):
+                self._boards[(HOST, metric)].update(hosts, days, pd.Series(deltas[metric].to_numpy()))
+            return True
+
+    def periods(self, entity: str, metric: str, period: str) -> List[pd.Timestamp]:
+        """Start days of the periods that have a board."""
+        return self._boards[(entity, metric)].periods(period)
+
+    def top(self, entity: str = HOST, metric: str = PK_COUNT, n: int = 10, period: str = "all",
+            day: Optional[date] = None) -> pd.DataFrame:
+        """The current top n for an entity and metric, all time or for the period containing ``day``."""
+        score_column = METRICS[metric][0]
+        board = self._boards[(entity, metric)].board(period, day)
+        entries = board.top(n) if board is not None else []
+        keys = [key for key, _ in entries]
+        scores = np.array([score for _, score in entries], dtype=np.int64)
+        return pd.DataFrame({
+            "Rank": np.arange(1, len(entries) + 1),
+            ENTITY_COLUMNS[entity]: keys,
+            score_column: from_minor_units(scores) if metric == PAYOUT else scores,
+        })
+
+
+_leaderboards: Optional[Leaderboards] = None
+_leaderboards_lock = threading.Lock()
+
+
+def get_leaderboards() -> Leaderboards:
+    """The process-wide leaderboards."""
+    global _leaderboards
+    if _leaderboards is None:
+        with _leaderboards_lock:
+            if _leaderboards is None:
+                _leaderboards = Leaderboards()
+    return _leaderboards
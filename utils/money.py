@@ -0,0 +1,79 @@
+"""
+Fixed-point money helpers for the Bigo Live Dashboard.
+Amounts are held as int64 minor units (cents) so totals are exact and reproducible.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Union
+
+import numpy as np
+
+MINOR_UNITS = 100  # cents per currency unit
+RATE_SCALE = 1_000_000  # rates are held as millionths of a currency unit per quantity unit
+QUANTITY_SCALE = 1_000  # fractional quantities (e.g. hours) are held as thousandths
+
+# Divisor that brings quantity * rate back to minor units in a single rounding step
+_RATE_DIVISOR = QUANTITY_SCALE * RATE_SCALE // MINOR_UNITS
+
+Number = Union[int, float, Decimal, str]
+
+
+def round_half_up_div(numerator, denominator: int) -> np.ndarray:
+    """Integer division rounding halves away from zero, applied element-wise."""
+    numerator = np.asarray(numerator, dtype=np.int64)
+    magnitude = (np.abs(numerator) + denominator // 2) // denominator
+    return np.where(numerator < 0, -magnitude, magnitude).astype(np.int64)
+
+
+def to_fixed(values, scale: int) -> np.ndarray:
+    """Convert numbers to int64 fixed-point values at the given scale (half-up rounding)."""
+    array = np.asarray(values)
+    if array.dtype.kind in "iub":
+        return array.astype(np.int64) * scale
+    if array.dtype.kind == "O":
+        scaled = [Decimal(str(v)) * scale for v in array.ravel()]
+        rounded = [int(v.quantize(Decimal(1), rounding=ROUND_HALF_UP)) for v in scaled]
+        return np.array(rounded, dtype=np.int64).reshape(array.shape)
+
+    # Round away float representation noise (1.005 * 100 == 100.49999...) before the half-up step
+    scaled = np.round(np.abs(array.astype(np.float64)) * scale, 6)
+    magnitude = np.floor(scaled + 0.5).astype(np.int64)
+    return np.where(array < 0, -magnitude, magnitude).astype(np.int64)
+
+
+def to_minor_units(amounts) -> np.ndarray:
+    """Convert currency amounts to int64 minor units."""
+    return to_fixed(amounts, MINOR_UNITS)
+
+
+def rate_to_fixed(rate: Number) -> int:
+    """Convert a per-unit rate to an exact integer number of millionths."""
+    scaled = Decimal(str(rate)) * RATE_SCALE
+    return int(scaled.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def apply_rate(quantities, rate) -> np.ndarray:
+    """Multiply quantities by a currency rate, rounding once to minor units.
+
+    ``rate`` may be a scalar or an array broadcastable against ``quantities``.
+    Intermediate products stay within int64 while each unrounded amount is below ~9.2 billion.
+    """
+    fixed_quantities = to_fixed(quantities, QUANTITY_SCALE)
+    if np.ndim(rate) == 0:
+        fixed_rate = np.int64(rate_to_fixed(rate))
+    else:
+        fixed_rate = to_fixed(rate, RATE_SCALE)
+    return round_half_up_div(fixed_quantities * fixed_rate, _RATE_DIVISOR)
+
+
+def from_minor_units(minor) -> np.ndarray:
+    """Convert minor units back to float currency values for display and export."""
+    return np.asarray(minor, dtype=np.int64) / MINOR_UNITS
+
+
+def format_minor_units(minor: int, symbol: str = "$") -> str:
+    """Format a single minor-unit amount as a currency string without float rounding."""
+    minor = int(minor)
+    sign = "-" if minor < 0 else ""
+    units, cents = divmod(abs(minor), MINOR_UNITS)
+    return f"{sign}{symbol}{units:,}.{cents:02d}"
@@ -0,0 +1,303 @@
+"""
+Versioned payment rule registry for the Bigo Live Dashboard.
+Every calculator reads its rates from one validated, immutable rule set, and each set has an
+effective-from time so past activity can be priced at the rates in force when it happened.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import CONFIG_DIR, PAYMENT_CONFIG
+from utils.money import apply_rate, rate_to_fixed
+
+RULES_FILE = os.path.join(CONFIG_DIR, "payment_rules.json")
+# The seed version covers all earlier activity, so backdated versions can be ordered after it
+BASELINE_EFFECTIVE_FROM = "2000-01-01T00:00:00"
+
+# name: (minimum, maximum, description); maximum of None means unbounded
+RULE_SCHEMA = {
+    "base_rate": (0.0, 1.0, "Share of earned diamonds paid as base payment"),
+    "bonus_threshold": (0, None, "Diamonds above which the performance bonus applies"),
+    "bonus_rate": (0.0, 1.0, "Share of diamonds above the threshold paid as bonus"),
+    "pk_win_bonus": (0.0, None, "Paysheet bonus per PK win"),
+    "attendance_bonus": (0.0, None, "Paysheet bonus for meeting the attendance target"),
+    "beans_to_diamonds_rate": (0.0, None, "Beans that equal one diamond"),
+    "diamond_to_usd_rate": (0.0, None, "USD value of one diamond"),
+    "hourly_rate": (0.0, None, "Host Pay Calculator base rate per streamed hour (USD)"),
+    "diamond_rate_per_1000": (0.0, None, "Host Pay Calculator rate per 1000 diamonds (USD)"),
+    "pk_win_bonus_usd": (0.0, None, "Host Pay Calculator bonus per PK win (USD)"),
+    "task_bonus": (0.0, None, "Host Pay Calculator bonus per completed task (USD)"),
+    "event_bonus": (0.0, None, "Host Pay Calculator bonus per special event (USD)"),
+    "pk_loss_penalty": (0.0, None, "Host Pay Calculator penalty per PK loss (USD)"),
+}
+
+# Rules each evaluator reads; cache keys are derived from these so unrelated updates keep caches warm
+PAYSHEET_RULE_KEYS = ["base_rate", "bonus_threshold", "bonus_rate", "pk_win_bonus", "attendance_bonus"]
+HOST_PAY_RULE_KEYS = ["hourly_rate", "diamond_rate_per_1000", "pk_win_bonus_usd", "task_bonus", "event_bonus", "pk_loss_penalty"]
+CONVERSION_RULE_KEYS = ["beans_to_diamonds_rate", "diamond_to_usd_rate"]
+
+
+def validate_rules(values: Mapping[str, Any]) -> Dict[str, float]:
+    """Validate a complete set of rule values, returning them as numbers."""
+    unknown = [name for name in values if name not in RULE_SCHEMA]
+    if unknown:
+        raise ValueError(f"Unknown payment rules: {', '.join(unknown)}")
+    missing = [name for name in RULE_SCHEMA if name not in values]
+    if missing:
+        raise ValueError(f"Missing payment rules: {', '.join(missing)}")
+
+    validated = {}
+    for name, (minimum, maximum, _) in RULE_SCHEMA.items():
+        value = values[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number, got {value!r}")
+        if value < minimum or (maximum is not None and value > maximum):
+            bound = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+            raise ValueError(f"{name} must be {bound}, got {value}")
+        rate_to_fixed(value)  # must be representable as fixed-point
+        validated[name] = value
+    if validated["beans_to_diamonds_rate"] <= 0:
+        raise ValueError("beans_to_diamonds_rate must be greater than 0")
+    return validated
+
+
+class RuleSet:
+    """An immutable, validated version of the payment rules with bound evaluators."""
+
+    def __init__(self, version: int, values: Mapping[str, float], created_at: str,
+                 created_by: str = "system", note: str = "", effective_from: Optional[str] = None):
+        self.version = version
+        self.values = MappingProxyType(validate_rules(values))
+        self.created_at = created_at
+        self.created_by = created_by
+        self.note = note
+        # Versions saved before effective dates existed take effect when they were published
+        self.effective_from = effective_from or created_at
+        self.effective_at = datetime.fromisoformat(self.effective_from)
+
+    def __getitem__(self, name: str) -> float:
+        return self.values[name]
+
+    def key_for(self, names: Iterable[str]) -> str:
+        """Cache key covering only the given rules, so caches survive unrelated updates."""
+        subset = {name: self.values[name] for name in names}
+        return hashlib.sha256(json.dumps(subset, sort_keys=True).encode()).hexdigest()[:16]
+
+    @property
+    def fingerprint(self) -> str:
+        """Cache key covering every rule in this version."""
+        return self.key_for(RULE_SCHEMA)
+
+    def paysheet(self, hosts_data):
+        """Evaluate the paysheet for a roster under this rule set."""
+        from utils.paysheet import generate_paysheet
+        return generate_paysheet(hosts_data, rules=self.values)
+
+    def host_pay(self, metrics: Mapping[str, Any], overrides: Optional[Mapping[str, float]] = None):
+        """Evaluate the Host Pay Calculator breakdown (minor units) for scalar or column metrics."""
+        from utils.calculators import calculate_host_pay_columns
+        rates = dict(self.values)
+        if overrides:
+            rates.update(overrides)
+        return calculate_host_pay_columns(metrics, rates)
+
+    def beans_to_diamonds(self, beans):
+        """Convert beans to diamonds at this version's conversion rate."""
+        return beans / self.values["beans_to_diamonds_rate"]
+
+    def diamonds_to_usd(self, diamonds):
+        """Convert diamonds to USD minor units at this version's conversion rate."""
+        return apply_rate(diamonds, self.values["diamond_to_usd_rate"])
+
+    def to_record(self) -> Dict[str, Any]:
+        """Serializable form used for persistence and history display."""
+        return {
+            "version": self.version,
+            "values": dict(self.values),
+            "created_at": self.created_at,
+            "created_by": self.created_by,
+            "note": self.note,
+            "effective_from": self.effective_from,
+        }
+
+
+class RuleTimeline:
+    """Rule versions ordered by effective-from time, for binary-search as-of lookups.
+
+    A version stays in force until the next later-effective one; when two share an effective time
+    the newer version wins. Times before the first version resolve to the first version.
+    """
+
+    def __init__(self, versions: List[RuleSet]):
+        ordered = sorted(versions, key=lambda rules: (rules.effective_at, rules.version))
+        self.rules = ordered
+        self.starts = [rules.effective_at for rules in ordered]
+        self.starts_ns = np.array([pd.Timestamp(start).value for start in self.starts], dtype=np.int64)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def index_at(self, when: datetime) -> int:
+        return max(bisect.bisect_right(self.starts, when) - 1, 0)
+
+    def indices_at(self, when_ns: np.ndarray) -> np.ndarray:
+        return np.maximum(np.searchsorted(self.starts_ns, when_ns, side="right") - 1, 0)
+
+    def column(self, name: str) -> np.ndarray:
+        """One rule's value in every version, in timeline order."""
+        values = self._columns.get(name)
+        if values is None:
+            values = np.array([rules.values[name] for rules in self.rules], dtype=np.float64)
+            self._columns[name] = values
+        return values
+
+
+class RuleRegistry:
+    """Process-wide history of rule versions, loaded once and persisted as JSON."""
+
+    def __init__(self, rules_file: str = RULES_FILE):
+        self.rules_file = rules_file
+        self._lock = threading.Lock()
+        self._versions: List[RuleSet] = []
+        self._timeline = RuleTimeline([])
+        self.load()
+
+    def load(self):
+        """Load rule history from disk, seeding version 1 from PAYMENT_CONFIG."""
+        versions = []
+        try:
+            if os.path.exists(self.rules_file):
+                with open(self.rules_file, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+                for record in records:
+                    if record.get("version") == 1:
+                        record.setdefault("effective_from", BASELINE_EFFECTIVE_FROM)
+                versions = [RuleSet(**record) for record in records]
+        except (json.JSONDecodeError, IOError, TypeError, ValueError) as e:
+            print(f"Warning: Could not load payment rules, using defaults: {e}")
+            versions = []
+
+        if not versions:
+            seed = {name: PAYMENT_CONFIG[name] for name in RULE_SCHEMA}
+            versions = [RuleSet(1, seed, datetime.now().isoformat(timespec="seconds"), note="Defaults from settings",
+                                effective_from=BASELINE_EFFECTIVE_FROM)]
+        self._versions = versions
+        self._timeline = RuleTimeline(versions)
+
+    def save(self):
+        """Persist rule history to disk."""
+        try:
+            os.makedirs(os.path.dirname(self.rules_file), exist_ok=True)
+            with open(self.rules_file, 'w', encoding='utf-8') as f:
+                json.dump([rules.to_record() for rules in self._versions], f, indent=2)
+        except IOError as e:
+            print(f"Warning: Could not save payment rules: {e}")
+
+    def current(self) -> RuleSet:
+        """The rule set in force now; versions scheduled for later are not applied yet."""
+        return self.rules_at(datetime.now())
+
+    def latest(self) -> RuleSet:
+        """The most recently published rule set, whatever its effective time."""
+        return self._versions[-1]
+
+    def rules_at(self, when: datetime) -> RuleSet:
+        """The rule set in force at ``when``."""
+        timeline = self._timeline
+        return timeline.rules[timeline.index_at(pd.Timestamp(when).to_pydatetime())]
+
+    def versions_at(self, when) -> np.ndarray:
+        """Rule version in force at each timestamp; one vectorized binary search for the whole column."""
+        timeline, when_ns = self._timeline, self._as_ns(when)
+        versions = np.array([rules.version for rules in timeline.rules], dtype=np.int64)
+        return versions[timeline.indices_at(when_ns)]
+
+    def rates_at(self, when, names: Iterable[str] = CONVERSION_RULE_KEYS) -> Dict[str, np.ndarray]:
+        """Each named rule's value in force at each timestamp, as aligned arrays."""
+        timeline, when_ns = self._timeline, self._as_ns(when)
+        indices = timeline.indices_at(when_ns)
+        return {name: timeline.column(name)[indices] for name in names}
+
+    @staticmethod
+    def _as_ns(when) -> np.ndarray:
+        stamps = pd.DatetimeIndex(pd.to_datetime(when))
+        if stamps.hasnans:
+            raise ValueError("Rate lookups need a valid timestamp for every row")
+        if stamps.tz is not None:
+            stamps = stamps.tz_convert(None)
+        return stamps.as_unit("ns").asi8
+
+    def timeline(self) -> pd.DataFrame:
+        """Conversion rates per version with the period each was in force, earliest first."""
+        timeline = self._timeline
+        ends = timeline.starts[1:] + [None]
+        return pd.DataFrame([
+            {
+                "Effective From": rules.effective_at,
+                "Until": end,
+                "Version": rules.version,
+                **{name: rules.values[name] for name in CONVERSION_RULE_KEYS},
+                "Note": rules.note,
+            }
+            for rules, end in zip(timeline.rules, ends)
+        ], columns=["Effective From", "Until", "Version", *CONVERSION_RULE_KEYS, "Note"])
+
+    def get(self, version: int) -> RuleSet:
+        """A specific historical rule set."""
+        for rules in self._versions:
+            if rules.version == version:
+                return rules
+        raise KeyError(f"Unknown payment rules version: {version}")
+
+    def history(self) -> List[RuleSet]:
+        """All rule versions, oldest first."""
+        return list(self._versions)
+
+    def update(self, changes: Mapping[str, float], created_by: str = "admin", note: str = "",
+               effective_from: Optional[datetime] = None) -> RuleSet:
+        """Validate changes and publish them as a new version effective from ``effective_from`` (default now).
+
+        The new version starts from the rules in force at that time, so a backdated change applies
+        until the next later-effective version. No-op changes keep the version in force.
+        """
+        with self._lock:
+            now = datetime.now().isoformat(timespec="seconds")
+            effective = effective_from.isoformat(timespec="seconds") if effective_from is not None else now
+            base = self.rules_at(datetime.fromisoformat(effective))
+            values = dict(base.values)
+            values.update(changes)
+            if values == dict(base.values):
+                return base
+
+            rules = RuleSet(self.latest().version + 1, values, now, created_by=created_by, note=note,
+                            effective_from=effective)
+            self._versions.append(rules)
+            self._timeline = RuleTimeline(self._versions)
+            self.save()
+            return rules
+
+
+_registry: Optional[RuleRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_rule_registry() -> RuleRegistry:
+    """The process-wide rule registry, loaded on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = RuleRegistry()
+    return _registry
+
+
+def active_rules() -> RuleSet:
+    """Shortcut for the current rule set."""
+    return get_rule_registry().current()
@@ -3,20 +3,110 @@ Paysheet generation utilities for Bigo Live hosts.
 Calculates payments based on performance metrics and agency rules.
 """
 
+import hashlib
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-
-# Default payment rules (should be configurable)
-PAYMENT_RULES = {
-    "base_rate": 0.4,  # 40% of diamonds earned
-    "bonus_threshold": 10000,  # diamonds
-    "bonus_rate": 0.1,  # additional 10% for exceeding threshold
-    "pk_win_bonus": 500,  # diamonds bonus per PK win
-    "attendance_bonus": 1000,  # diamonds bonus for perfect attendance
+from typing import Dict, List, Optional, Any, Tuple, Union
+
+from utils.chunked_reader import detect_format, iter_chunks
+from utils.data_cache import UPLOAD_KIND, get_data_cache
+from utils.payment_rules import PAYSHEET_RULE_KEYS, active_rules
+from utils.money import apply_rate, to_minor_units, from_minor_units, format_minor_units, round_half_up_div
+
+# Paysheet money columns (int64 minor units) and the breakdown keys they are built from
+MONEY_COLUMNS = {
+    "Base Payment": "base_payment",
+    "Performance Bonus": "performance_bonus",
+    "PK Bonus": "pk_bonus",
+    "Attendance Bonus": "attendance_bonus",
+    "Additional Bonuses": "additional_bonuses",
+    "Total Bonuses": "total_bonuses",
+    "Deductions": "deductions",
+    "Final Payment": "final_payment",
+}
+
+# Roster columns consumed by the columnar engine and their defaults
+ROSTER_DEFAULTS = {
+    "diamonds_earned": 0,
+    "pk_wins": 0,
+    "days_worked": 0,
+    "target_days": 30,
+    "additional_bonuses": 0,
+    "deductions": 0,
 }
 
+# Bulk roster import schema
+ROSTER_REQUIRED_COLUMNS = ["id", "name", "diamonds_earned"]
+ROSTER_INTEGER_COLUMNS = ["diamonds_earned", "pk_wins", "days_worked", "target_days"]
+ROSTER_AMOUNT_COLUMNS = ["additional_bonuses", "deductions"]
+ROSTER_COLUMN_ALIASES = {
+    "host_id": "id",
+    "host_name": "name",
+    "diamonds": "diamonds_earned",
+}
+ROSTER_ID_DTYPES = {"id": "string", "host_id": "string", "Host ID": "string", "ID": "string"}
+MAX_REPORTED_ISSUES = 1000
+
+def _base_payment(diamonds: np.ndarray, rules: Dict[str, float]) -> np.ndarray:
+    """Base payment in minor units."""
+    return apply_rate(diamonds, rules["base_rate"])
+
+def _performance_bonus(diamonds: np.ndarray, rules: Dict[str, float]) -> np.ndarray:
+    """Performance bonus in minor units for diamonds above the threshold."""
+    excess = np.maximum(diamonds - rules["bonus_threshold"], 0)
+    return apply_rate(excess, rules["bonus_rate"])
+
+def _pk_bonus(pk_wins: np.ndarray, rules: Dict[str, float]) -> np.ndarray:
+    """PK win bonus in minor units."""
+    return apply_rate(pk_wins, rules["pk_win_bonus"])
+
+def _attendance_bonus(days_worked: np.ndarray, target_days: np.ndarray, rules: Dict[str, float]) -> np.ndarray:
+    """Attendance bonus in minor units for hosts meeting their target days."""
+    bonus = to_minor_units(rules["attendance_bonus"])
+    return np.where(days_worked >= target_days, bonus, 0).astype(np.int64)
+
+def calculate_payment_columns(
+    diamonds_earned,
+    pk_wins,
+    days_worked,
+    additional_bonuses=0,
+    deductions=0,
+    target_days=30,
+    rules: Optional[Dict[str, float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Calculate the payment breakdown for whole columns (or scalars) at once.
+
+    Every amount is returned as int64 minor units; rates are rounded exactly once per component.
+    """
+    if rules is None:
+        rules = active_rules().values
+
+    diamonds = np.asarray(diamonds_earned)
+    additional = to_minor_units(additional_bonuses)
+    deducted = to_minor_units(deductions)
+
+    base = _base_payment(diamonds, rules)
+    performance = _performance_bonus(diamonds, rules)
+    pk_bonus = _pk_bonus(np.asarray(pk_wins), rules)
+    attendance = _attendance_bonus(np.asarray(days_worked), np.asarray(target_days), rules)
+
+    total_bonuses = performance + pk_bonus + attendance + additional
+    total_before_deductions = base + total_bonuses
+
+    return {
+        "base_payment": base,
+        "performance_bonus": performance,
+        "pk_bonus": pk_bonus,
+        "attendance_bonus": attendance,
+        "additional_bonuses": additional,
+        "total_bonuses": total_bonuses,
+        "total_before_deductions": total_before_deductions,
+        "deductions": deducted,
+        "final_payment": np.maximum(total_before_deductions - deducted, 0),  # Ensure non-negative
+    }
+
 class HostPayment:
     """Class to handle individual host payment calculations."""
     
@@ -32,96 +122,216 @@ class HostPayment:
     
     def calculate_base_payment(self) -> float:
         """Calculate base payment from diamonds earned."""
-        return self.diamonds_earned * PAYMENT_RULES["base_rate"]
+        return float(from_minor_units(_base_payment(np.asarray(self.diamonds_earned), active_rules().values)))
     
     def calculate_performance_bonus(self) -> float:
         """Calculate performance-based bonus."""
-        if self.diamonds_earned > PAYMENT_RULES["bonus_threshold"]:
-            excess = self.diamonds_earned - PAYMENT_RULES["bonus_threshold"]
-            return excess * PAYMENT_RULES["bonus_rate"]
-        return 0
+        return float(from_minor_units(_performance_bonus(np.asarray(self.diamonds_earned), active_rules().values)))
     
     def calculate_pk_bonus(self) -> float:
         """Calculate PK win bonus."""
-        return self.pk_wins * PAYMENT_RULES["pk_win_bonus"]
+        return float(from_minor_units(_pk_bonus(np.asarray(self.pk_wins), active_rules().values)))
     
     def calculate_attendance_bonus(self) -> float:
         """Calculate attendance bonus."""
-        if self.days_worked >= self.target_days:
-            return PAYMENT_RULES["attendance_bonus"]
-        return 0
+        bonus = _attendance_bonus(np.asarray(self.days_worked), np.asarray(self.target_days), active_rules().values)
+        return float(from_minor_units(bonus))
     
     def calculate_total_payment(self) -> Dict[str, float]:
         """Calculate total payment with breakdown."""
-        base = self.calculate_base_payment()
-        performance = self.calculate_performance_bonus()
-        pk_bonus = self.calculate_pk_bonus()
-        attendance = self.calculate_attendance_bonus()
-        
-        total_bonuses = performance + pk_bonus + attendance + self.additional_bonuses
-        total_before_deductions = base + total_bonuses
-        final_payment = total_before_deductions - self.deductions
-        
-        return {
-            "base_payment": base,
-            "performance_bonus": performance,
-            "pk_bonus": pk_bonus,
-            "attendance_bonus": attendance,
-            "additional_bonuses": self.additional_bonuses,
-            "total_bonuses": total_bonuses,
-            "total_before_deductions": total_before_deductions,
-            "deductions": self.deductions,
-            "final_payment": max(0, final_payment)  # Ensure non-negative
-        }
-
-def generate_paysheet(hosts_data: List[Dict[str, Any]]) -> pd.DataFrame:
-    """Generate paysheet DataFrame from hosts data."""
-    paysheet_data = []
-    
-    for host_data in hosts_data:
-        host = HostPayment(host_data["id"], host_data["name"])
-        host.diamonds_earned = host_data.get("diamonds_earned", 0)
-        host.pk_wins = host_data.get("pk_wins", 0)
-        host.days_worked = host_data.get("days_worked", 0)
-        host.additional_bonuses = host_data.get("additional_bonuses", 0)
-        host.deductions = host_data.get("deductions", 0)
-        
-        payment_breakdown = host.calculate_total_payment()
-        
-        row = {
-            "Host ID": host.host_id,
-            "Host Name": host.host_name,
-            "Diamonds Earned": host.diamonds_earned,
-            "Days Worked": host.days_worked,
-            "PK Wins": host.pk_wins,
-            "Base Payment": payment_breakdown["base_payment"],
-            "Performance Bonus": payment_breakdown["performance_bonus"],
-            "PK Bonus": payment_breakdown["pk_bonus"],
-            "Attendance Bonus": payment_breakdown["attendance_bonus"],
-            "Additional Bonuses": payment_breakdown["additional_bonuses"],
-            "Total Bonuses": payment_breakdown["total_bonuses"],
-            "Deductions": payment_breakdown["deductions"],
-            "Final Payment": payment_breakdown["final_payment"]
-        }
-        
-        paysheet_data.append(row)
-    
-    return pd.DataFrame(paysheet_data)
+        breakdown = calculate_payment_columns(
+            self.diamonds_earned,
+            self.pk_wins,
+            self.days_worked,
+            additional_bonuses=self.additional_bonuses,
+            deductions=self.deductions,
+            target_days=self.target_days,
+        )
+        return {key: float(from_minor_units(value)) for key, value in breakdown.items()}
+
+def build_roster(hosts_data: Union[pd.DataFrame, List[Dict[str, Any]]]) -> pd.DataFrame:
+    """Normalize host records into a columnar roster with every engine column present."""
+    roster = hosts_data.copy() if isinstance(hosts_data, pd.DataFrame) else pd.DataFrame(list(hosts_data))
+    if roster.empty:
+        roster = pd.DataFrame(columns=["id", "name"])
+
+    missing = {col: default for col, default in ROSTER_DEFAULTS.items() if col not in roster.columns}
+    if missing:
+        roster = roster.assign(**missing)
+
+    numeric = list(ROSTER_DEFAULTS)
+    roster[numeric] = roster[numeric].fillna(ROSTER_DEFAULTS)
+    return roster
+
+def generate_paysheet(
+    hosts_data: Union[pd.DataFrame, List[Dict[str, Any]]],
+    rules: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """Generate paysheet DataFrame from hosts data using whole-column operations.
+
+    Money columns hold int64 minor units; use ``paysheet_in_currency`` to show or export them.
+    """
+    roster = build_roster(hosts_data)
+    breakdown = calculate_payment_columns(
+        roster["diamonds_earned"].to_numpy(),
+        roster["pk_wins"].to_numpy(),
+        roster["days_worked"].to_numpy(),
+        additional_bonuses=roster["additional_bonuses"].to_numpy(),
+        deductions=roster["deductions"].to_numpy(),
+        target_days=roster["target_days"].to_numpy(),
+        rules=rules,
+    )
+
+    return pd.DataFrame({
+        "Host ID": roster["id"].to_numpy(),
+        "Host Name": roster["name"].to_numpy(),
+        "Diamonds Earned": roster["diamonds_earned"].to_numpy(),
+        "Days Worked": roster["days_worked"].to_numpy(),
+        "PK Wins": roster["pk_wins"].to_numpy(),
+        **{column: np.asarray(breakdown[key], dtype=np.int64) for column, key in MONEY_COLUMNS.items()},
+    })
+
+def paysheet_in_currency(paysheet_df: pd.DataFrame) -> pd.DataFrame:
+    """The paysheet with its money columns converted to currency values for display and export."""
+    return paysheet_df.assign(**{column: from_minor_units(paysheet_df[column]) for column in MONEY_COLUMNS})
+
+def summarize_paysheet(paysheet_df: pd.DataFrame) -> Dict[str, int]:
+    """Exact payout totals for a paysheet, in minor units."""
+    final_minor = paysheet_df["Final Payment"].to_numpy(dtype=np.int64)
+    total = int(final_minor.sum())
+    count = len(final_minor)
+    return {
+        "hosts": count,
+        "total_payout": total,
+        "average_payout": int(round_half_up_div(total, count)) if count else 0,
+    }
+
+def _normalize_roster_columns(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Map uploaded column headers (e.g. "Host ID", "Diamonds Earned") onto roster names."""
+    renamed = {}
+    for col in chunk.columns:
+        key = str(col).strip().lower().replace(" ", "_")
+        renamed[col] = ROSTER_COLUMN_ALIASES.get(key, key)
+    return chunk.rename(columns=renamed)
+
+def validate_roster_chunk(chunk: pd.DataFrame, row_offset: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Validate one roster chunk with column-wise checks.
+
+    Returns the valid rows (roster columns only) and a frame describing every rejected value.
+    """
+    chunk = _normalize_roster_columns(chunk)
+    missing = [col for col in ROSTER_REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    # Spreadsheet row numbers (header is row 1)
+    row_numbers = np.arange(len(chunk)) + row_offset + 2
+    valid = np.ones(len(chunk), dtype=bool)
+    issue_frames = []
+
+    def reject(mask: np.ndarray, column: str, values: pd.Series, problem: str):
+        nonlocal valid
+        if mask.any():
+            valid &= ~mask
+            issue_frames.append(pd.DataFrame({
+                "Row": row_numbers[mask],
+                "Column": column,
+                "Value": values.astype("string").fillna("").to_numpy()[mask],
+                "Problem": problem,
+            }))
+
+    roster = pd.DataFrame(index=chunk.index)
+    for col in ["id", "name"]:
+        text = chunk[col].astype("string").str.strip()
+        reject((text.isna() | (text == "")).to_numpy(), col, chunk[col], "missing value")
+        roster[col] = text
+
+    for col in ROSTER_INTEGER_COLUMNS + ROSTER_AMOUNT_COLUMNS:
+        if col not in chunk.columns:
+            roster[col] = ROSTER_DEFAULTS[col]
+            continue
+        raw = chunk[col]
+        numbers = pd.to_numeric(raw, errors="coerce")
+        blank = raw.isna().to_numpy()
+        reject((numbers.isna().to_numpy() & ~blank), col, raw, "not a number")
+        reject((numbers < 0).to_numpy(), col, raw, "negative value")
+        if col in ROSTER_INTEGER_COLUMNS:
+            fractional = (numbers.notna() & (numbers % 1 != 0)).to_numpy()
+            reject(fractional, col, raw, "not a whole number")
+        roster[col] = numbers.fillna(ROSTER_DEFAULTS[col])
+
+    roster = roster[valid]
+    roster[ROSTER_INTEGER_COLUMNS] = roster[ROSTER_INTEGER_COLUMNS].astype(np.int64)
+    issues = pd.concat(issue_frames, ignore_index=True) if issue_frames else pd.DataFrame(
+        columns=["Row", "Column", "Value", "Problem"]
+    )
+    return roster.reset_index(drop=True), issues
+
+def load_roster(data: bytes, filename: str) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+    """Parse and validate an uploaded roster chunk by chunk.
+
+    Returns the columnar roster, up to MAX_REPORTED_ISSUES rejected values and the total issue count.
+    """
+    rosters = []
+    issues = []
+    issue_count = 0
+    row_offset = 0
+
+    for chunk in iter_chunks(data, detect_format(filename), dtype=ROSTER_ID_DTYPES):
+        valid_rows, chunk_issues = validate_roster_chunk(chunk, row_offset)
+        row_offset += len(chunk)
+        rosters.append(valid_rows)
+        issue_count += len(chunk_issues)
+        reported = sum(len(frame) for frame in issues)
+        if reported < MAX_REPORTED_ISSUES and not chunk_issues.empty:
+            issues.append(chunk_issues.head(MAX_REPORTED_ISSUES - reported))
+
+    roster = pd.concat(rosters, ignore_index=True) if rosters else build_roster([])
+    issues_df = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(
+        columns=["Row", "Column", "Value", "Problem"]
+    )
+    return roster, issues_df, issue_count
+
+def _paysheet_for_upload(content_hash: str, filename: str, rules_key: str, data: bytes, rules):
+    """Roster and paysheet for an upload, cached by content hash and the paysheet rules it used."""
+    def load():
+        with st.spinner("Computing paysheet..."):
+            roster, issues, issue_count = load_roster(data, filename)
+            return roster, issues, issue_count, rules.paysheet(roster)
+
+    return get_data_cache().get(UPLOAD_KIND, ("paysheet", content_hash, filename, rules_key), load)
+
+def upload_hash(uploaded_file) -> str:
+    """SHA-256 of an uploaded file's content."""
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+def import_roster_upload(uploaded_file, content_hash: str) -> Tuple[pd.DataFrame, pd.DataFrame, int, pd.DataFrame]:
+    """Import an uploaded roster file, computing its paysheet once per distinct file content."""
+    rules = active_rules()
+    return _paysheet_for_upload(
+        content_hash, uploaded_file.name, rules.key_for(PAYSHEET_RULE_KEYS), uploaded_file.getvalue(), rules
+    )
+
+def _set_roster(roster: pd.DataFrame, paysheet: Optional[pd.DataFrame] = None):
+    """Store the roster columnarly and compute its paysheet once per change."""
+    st.session_state.roster = roster
+    st.session_state.paysheet = paysheet if paysheet is not None else generate_paysheet(roster)
 
 def paysheet_generator_widget():
     """Streamlit widget for paysheet generation."""
     st.subheader("💰 Paysheet Generator")
     
     # Display current payment rules
-    with st.expander("📋 Current Payment Rules"):
+    rules = active_rules()
+    with st.expander(f"📋 Current Payment Rules (v{rules.version})"):
         col1, col2 = st.columns(2)
         with col1:
-            st.write(f"Base Rate: {PAYMENT_RULES['base_rate']*100}%")
-            st.write(f"Bonus Threshold: {PAYMENT_RULES['bonus_threshold']:,} diamonds")
+            st.write(f"Base Rate: {rules['base_rate']*100}%")
+            st.write(f"Bonus Threshold: {rules['bonus_threshold']:,} diamonds")
         with col2:
-            st.write(f"Bonus Rate: {PAYMENT_RULES['bonus_rate']*100}%")
-            st.write(f"PK Win Bonus: {PAYMENT_RULES['pk_win_bonus']:,} diamonds")
-            st.write(f"Attendance Bonus: {PAYMENT_RULES['attendance_bonus']:,} diamonds")
+            st.write(f"Bonus Rate: {rules['bonus_rate']*100}%")
+            st.write(f"PK Win Bonus: {rules['pk_win_bonus']:,} diamonds")
+            st.write(f"Attendance Bonus: {rules['attendance_bonus']:,} diamonds")
     
     # Manual host data entry
     st.subheader("📝 Add Host Data")
@@ -145,12 +355,8 @@ def paysheet_generator_widget():
         submit = st.form_submit_button("Add Host")
         
         if submit and host_id and host_name:
-            # Initialize session state for hosts data
-            if "hosts_data" not in st.session_state:
-                st.session_state.hosts_data = []
-            
-            # Add new host data
-            new_host = {
+            # Add new host data to the columnar roster
+            new_host = build_roster([{
                 "id": host_id,
                 "name": host_name,
                 "diamonds_earned": diamonds_earned,
@@ -158,30 +364,61 @@ def paysheet_generator_widget():
                 "pk_wins": pk_wins,
                 "additional_bonuses": additional_bonuses,
                 "deductions": deductions
-            }
+            }])
             
-            st.session_state.hosts_data.append(new_host)
+            current = st.session_state.get("roster")
+            roster = new_host if current is None or current.empty else pd.concat([current, new_host], ignore_index=True)
+            _set_roster(roster)
             st.success(f"Added {host_name} to paysheet!")
     
-    # Display current hosts and generate paysheet
-    if "hosts_data" in st.session_state and st.session_state.hosts_data:
+    # Bulk import
+    st.subheader("📤 Bulk Import Hosts")
+    uploaded_file = st.file_uploader(
+        "Upload host roster",
+        type=["csv", "xlsx", "parquet"],
+        help="Columns: id, name, diamonds_earned and optionally pk_wins, days_worked, additional_bonuses, deductions"
+    )
+    
+    if uploaded_file is not None:
+        content_hash = upload_hash(uploaded_file)
+        # The uploader hands back the same file on every rerun; only a new file is imported
+        if st.session_state.get("roster_upload_hash") != content_hash:
+            try:
+                roster, issues, issue_count, paysheet = import_roster_upload(uploaded_file, content_hash)
+            except ValueError as e:
+                st.error(f"❌ {str(e)}")
+            else:
+                _set_roster(roster, paysheet)
+                st.session_state.roster_upload_hash = content_hash
+                st.session_state.roster_upload_issues = (issues, issue_count)
+                st.success(f"✅ Imported {len(roster):,} hosts from {uploaded_file.name}")
+        
+        if st.session_state.get("roster_upload_hash") == content_hash:
+            issues, issue_count = st.session_state.roster_upload_issues
+            if issue_count:
+                st.warning(f"⚠️ {issue_count:,} invalid values were skipped")
+                st.dataframe(issues, use_container_width=True)
+    
+    # Display current hosts and paysheet
+    paysheet_df = st.session_state.get("paysheet")
+    if paysheet_df is not None and not paysheet_df.empty:
         st.subheader("👥 Current Hosts")
         
-        # Generate and display paysheet
-        paysheet_df = generate_paysheet(st.session_state.hosts_data)
-        st.dataframe(paysheet_df, use_container_width=True)
+        paysheet_view = paysheet_in_currency(paysheet_df)
+        st.dataframe(paysheet_view, use_container_width=True)
         
         # Summary statistics
+        summary = summarize_paysheet(paysheet_df)
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Hosts", len(paysheet_df))
+            st.metric("Total Hosts", summary["hosts"])
         with col2:
-            st.metric("Total Payout", f"${paysheet_df['Final Payment'].sum():.2f}")
+            st.metric("Total Payout", format_minor_units(summary["total_payout"]))
         with col3:
-            st.metric("Avg per Host", f"${paysheet_df['Final Payment'].mean():.2f}")
+            st.metric("Avg per Host", format_minor_units(summary["average_payout"]))
         
-        # Download button
-        csv = paysheet_df.to_csv(index=False)
+        # Download button (money columns are exact cents, so a single float format suffices)
+        csv = paysheet_view.to_csv(index=False, float_format="%.2f")
         st.download_button(
             label="📥 Download Paysheet CSV",
             data=csv,
@@ -191,7 +428,9 @@ def paysheet_generator_widget():
         
         # Clear data button
         if st.button("🗑️ Clear All Data"):
-            st.session_state.hosts_data = []
+            _set_roster(build_roster([]))
+            st.session_state.roster_upload_hash = None
+            st.session_state.roster_upload_issues = None
             st.rerun()
 
 def individual_payment_calculator():
@@ -0,0 +1,217 @@
+"""
+Host double-booking detection across PK schedules.
+Normalizes every scheduled slot to a time interval per host ID and finds overlaps with a sort-and-sweep.
+"""
+
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import PK_SCHEDULE_CONFIG
+from utils.pk_data import (
+    PK_ROW_COLUMNS, PK_SIDES, PK_TYPE_COLUMNS, AppendTracker, normalize_ids, normalize_names, row_ids
+)
+
+PK_SHEETS_FEED = "pk_sheets"
+PK_TYPE_FEED = "pk_types"
+
+# feed: (slot time column, (agency column, host ID column) per booked side, columns tracked for appends)
+FEEDS = {
+    PK_SHEETS_FEED: ("Time", PK_SIDES, PK_ROW_COLUMNS),
+    PK_TYPE_FEED: ("PK Time", [("Agency Name", "ID 1"), ("Agency Name", "ID 2")], PK_TYPE_COLUMNS),
+}
+
+# Slots such as "20:00-20:30", "8 PM – 9 PM" or "20:00 to 20:30" carry their own end time
+RANGE_SEPARATOR = r"\s*(?:-|–|to)\s*"
+
+CONFLICT_COLUMNS = ["Host ID", "Source", "Slot", "Start", "End", "Conflicting Source", "Conflicting Slot",
+                    "Conflicting Start", "Conflicting End"]
+
+
+def _empty_intervals() -> pd.DataFrame:
+    return pd.DataFrame({
+        "host_id": pd.Series(dtype="string"),
+        "agency": pd.Series(dtype="string"),
+        "start": pd.Series(dtype="datetime64[ns]"),
+        "end": pd.Series(dtype="datetime64[ns]"),
+        "source": pd.Series(dtype=object),
+        "slot": pd.Series(dtype="string"),
+        "feed": pd.Series(dtype=object),
+        "row": pd.Series(dtype=object),
+    })
+
+
+def _offsets(values: pd.Series) -> np.ndarray:
+    """Offsets from midnight for times like "20:00", "8:00 PM" or "20.30"."""
+    parsed = pd.to_datetime(values.str.strip().str.replace(".", ":", regex=False), format="mixed", errors="coerce")
+    return (parsed - parsed.dt.normalize()).to_numpy()
+
+
+def _slot_offsets(slots: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets for each slot, parsing every distinct slot string only once; NaT when absent."""
+    uniques = pd.Index(slots.dropna().unique())
+    if not len(uniques):
+        missing = np.full(len(slots), np.timedelta64("NaT"), dtype="timedelta64[ns]")
+        return missing, missing.copy()
+
+    parts = pd.Series(uniques.astype(str)).str.strip().str.split(RANGE_SEPARATOR, n=1, expand=True, regex=True)
+    starts = np.append(_offsets(parts[0]), np.timedelta64("NaT"))
+    ends = np.append(_offsets(parts[1]) if parts.shape[1] > 1 else np.full(len(uniques), np.timedelta64("NaT")),
+                     np.timedelta64("NaT")).astype("timedelta64[ns]")
+    codes = uniques.get_indexer(slots)  # -1 (missing slot) picks the trailing NaT
+    return starts[codes], ends[codes]
+
+
+def slot_intervals(df: pd.DataFrame, feed: str, rows: Optional[np.ndarray] = None,
+                   default_minutes: Optional[int] = None) -> pd.DataFrame:
+    """One [start, end) interval per (slot, host ID) for a PK feed, tagged with the host's agency.
+
+    Slots without an end time last ``default_minutes``; ranges that end before they start cross midnight.
+    ``rows`` identifies each input row (see ``row_ids``) and defaults to its position.
+    """
+    time_column, sides, _ = FEEDS[feed]
+    if df.empty or "Date" not in df.columns or time_column not in df.columns:
+        return _empty_intervals()
+    if rows is None:
+        rows = np.arange(len(df))
+    if default_minutes is None:
+        default_minutes = PK_SCHEDULE_CONFIG["default_slot_minutes"]
+
+    days = pd.to_datetime(df["Date"], errors="coerce").dt.normalize().to_numpy()
+    slots = df[time_column]
+    start_offsets, end_offsets = _slot_offsets(slots)
+    start = pd.Series(days + start_offsets)
+    end = pd.Series(days + end_offsets)
+    end = end.mask(end <= start, end + pd.Timedelta(days=1))
+    end = end.fillna(start + pd.Timedelta(minutes=default_minutes))
+    sources = df["Source Sheet"] if "Source Sheet" in df.columns else pd.Series(feed, index=df.index)
+
+    frames = []
+    for agency_column, id_column in sides:
+        if id_column in df.columns:
+            agencies = normalize_names(df[agency_column]) if agency_column in df.columns else pd.Series(pd.NA, index=df.index)
+            frames.append(pd.DataFrame({
+                "host_id": normalize_ids(df[id_column]).to_numpy(),
+                "agency": agencies.to_numpy(),
+                "start": start.to_numpy(),
+                "end": end.to_numpy(),
+                "source": sources.to_numpy(),
+                "slot": slots.to_numpy(),
+                "feed": feed,
+                "row": rows,
+            }))
+    if not frames:
+        return _empty_intervals()
+
+    # A host listed on both sides of one row is a single booking
+    intervals = pd.concat(frames, ignore_index=True).dropna(subset=["host_id", "start"])
+    return intervals.drop_duplicates(["feed", "row", "host_id"]).reset_index(drop=True)
+
+
+def find_overlaps(intervals: pd.DataFrame) -> pd.DataFrame:
+    """Bookings that start before an earlier booking of the same host has ended.
+
+    Sorts by (host, start) and sweeps each host's running maximum end time, so the cost is
+    O(n log n); each conflicting booking is paired with the earlier booking that reaches furthest.
+    Ties are broken by (feed, row), so the pairing does not depend on the order rows arrived in.
+    """
+    if intervals.empty:
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+
+    ordered = intervals.sort_values(["host_id", "start", "end", "feed", "row"], kind="stable").reset_index(drop=True)
+    hosts = ordered["host_id"]
+    running_end = ordered.groupby(hosts, sort=False)["end"].cummax()
+    holder = pd.Series(np.arange(len(ordered)), dtype="float64").where(ordered["end"].eq(running_end))
+    holder = holder.groupby(hosts, sort=False).ffill()
+
+    previous_end = running_end.groupby(hosts, sort=False).shift()
+    previous_holder = holder.groupby(hosts, sort=False).shift()
+    clash = (ordered["start"] < previous_end).to_numpy()
+    if not clash.any():
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+
+    booking = ordered[clash]
+    other = ordered.iloc[previous_holder[clash].astype(np.int64).to_numpy()]
+    return pd.DataFrame({
+        "Host ID": booking["host_id"].to_numpy(),
+        "Source": booking["source"].to_numpy(),
+        "Slot": booking["slot"].to_numpy(),
+        "Start": booking["start"].to_numpy(),
+        "End": booking["end"].to_numpy(),
+        "Conflicting Source": other["source"].to_numpy(),
+        "Conflicting Slot": other["slot"].to_numpy(),
+        "Conflicting Start": other["start"].to_numpy(),
+        "Conflicting End": other["end"].to_numpy(),
+    })
+
+
+class HostConflictDetector:
+    """Double bookings across every PK feed, re-checking only hosts touched by newly appended rows."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trackers = {feed: AppendTracker(columns) for feed, (_, _, columns) in FEEDS.items()}
+        self.reset()
+
+    def reset(self):
+        """Drop every interval and forget which rows have been seen."""
+        for tracker in self._trackers.values():
+            tracker.reset()
+        self._intervals: Dict[str, pd.DataFrame] = {feed: _empty_intervals() for feed in FEEDS}
+        self._conflicts = pd.DataFrame(columns=CONFLICT_COLUMNS)
+        self.last_rechecked_hosts = 0
+
+    def refresh(self, df: pd.DataFrame, feed: str = PK_SHEETS_FEED) -> int:
+        """Fold a feed's appended rows into the detector; returns the number of hosts re-checked."""
+        with self._lock:
+            positions = self._trackers[feed].new_rows(df)
+            previous = self._intervals[feed]
+            if positions is None:
+                # Existing rows changed: replace the feed and re-check everyone it touched before or now
+                added = slot_intervals(df, feed, rows=row_ids(df))
+                self._intervals[feed] = added
+                affected = set(previous["host_id"]) | set(added["host_id"])
+            else:
+                added = slot_intervals(df.iloc[positions], feed, rows=row_ids(df)[positions])
+                if not added.empty:
+                    self._intervals[feed] = added if previous.empty else pd.concat([previous, added], ignore_index=True)
+                affected = set(added["host_id"])
+            self._recheck(affected)
+            return len(affected)
+
+    def _recheck(self, hosts: Iterable[str]):
+        hosts = list(hosts)
+        self.last_rechecked_hosts = len(hosts)
+        if not hosts:
+            return
+        candidates = [intervals[intervals["host_id"].isin(hosts)] for intervals in self._intervals.values()]
+        found = find_overlaps(pd.concat([frame for frame in candidates if not frame.empty] or candidates, ignore_index=True))
+        kept = self._conflicts[~self._conflicts["Host ID"].isin(hosts)]
+        self._conflicts = pd.concat([frame for frame in (kept, found) if not frame.empty] or [kept], ignore_index=True)
+
+    @property
+    def intervals(self) -> int:
+        return sum(len(frame) for frame in self._intervals.values())
+
+    def conflicts(self, host_id: Optional[str] = None) -> pd.DataFrame:
+        """Current double bookings, earliest first, optionally for one host."""
+        conflicts = self._conflicts
+        if host_id is not None:
+            conflicts = conflicts[conflicts["Host ID"] == host_id]
+        return conflicts.sort_values(["Start", "Host ID"]).reset_index(drop=True)
+
+
+_detector: Optional[HostConflictDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_conflict_detector() -> HostConflictDetector:
+    """The process-wide double-booking detector."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = HostConflictDetector()
+    return _detector
@@ -0,0 +1,269 @@
+"""
+PK schedule data for the Bigo Live Dashboard.
+Sheet locations, the combined loader and helpers for normalizing agency and host columns.
+"""
+
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data_cache import PK_TYPE_KIND, SHEET_KIND, get_data_cache
+from utils.gsheets import SHEET_TIMEOUT, fetch_csv, read_sheet_columns
+from utils.source_health import get_source_health
+
+PK_SHEETS = {
+    "Training PKs": "https://docs.google.com/spreadsheets/d/1T2Za-VeqUe4hN-00X-Qa5T3FAgXMExz2B1Brhspbr7w/edit?gid=920344037",
+    "Tasks": "https://docs.google.com/spreadsheets/d/1DD7I5sMu55wRVwGjPEv43iygq2b8oudfMspGlOY1zck/edit?gid=1990132269",
+    "Mystery Matches": "https://docs.google.com/spreadsheets/d/1iS9acwW9DrjZQh_d51_Pv4DcN9_X4alzK3wC2KIWXYw/edit?gid=1234468340",
+}
+
+# PK-type tabs share one spreadsheet; each tab lists a single agency with two host IDs
+PK_TYPE_SHEET_ID = "1DD7I5sMu55wRVwGjPEv43iygq2b8oudfMspGlOY1zck"
+PK_TYPE_SHEETS = {
+    "Star Task PK": "124426109",
+    "Talent PK": "1441823487",
+    "2 vs 2 PK": "1623495727",
+    "Agency PK Party": "1135840848",
+    "Daily PK": "539805742",
+}
+PK_TYPE_COLUMNS = ["Date", "PK Time", "Agency Name", "ID 1", "ID 2"]
+
+# Each PK row pairs two sides: (agency column, host ID column)
+PK_SIDES = [("Agency Name.1", "ID1"), ("Agency Name.2", "ID.2")]
+
+# Columns that identify a PK row; a change to any of them in existing rows forces consumers to rebuild
+PK_ROW_COLUMNS = ["Date", "Time", "Agency Name.1", "ID1", "Agency Name.2", "ID.2"]
+
+
+def _download_pk_sheet(name: str, timeout=SHEET_TIMEOUT) -> pd.DataFrame:
+    df = read_sheet_columns(PK_SHEETS[name], timeout)
+    if not df.empty:
+        df["Source Sheet"] = name
+    return df
+
+
+def _read_pk_sheet(name: str) -> pd.DataFrame:
+    return get_source_health().fetch(name, lambda timeout: _download_pk_sheet(name, timeout))
+
+
+def fetch_pk_sheet(name: str) -> pd.DataFrame:
+    """One PK sheet with a "Source Sheet" column, from the shared data cache; do not modify the result.
+
+    While the sheet is failing, slow or over the render's time budget, its last good snapshot is returned.
+    """
+    return get_source_health().serve(name, lambda: get_data_cache().get(SHEET_KIND, name, lambda: _read_pk_sheet(name)))
+
+
+def show_stale_badges(names):
+    """Badge each source that is being shown from its last good snapshot."""
+    for name, (fetched_at, reason) in get_source_health().stale(names).items():
+        st.badge(f"{name}: saved data from {datetime.fromtimestamp(fetched_at):%H:%M}", icon="🕒", color="orange",
+                 help=f"Showing the last good copy because the sheet is unavailable: {reason}")
+
+
+# The combined frame and the sheet loads it was built from
+_combined_lock = threading.Lock()
+_combined = {"stamps": None, "frame": pd.DataFrame()}
+
+
+def combine_pk_sheets() -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """All PK sheets combined, plus the error for each sheet that failed to load.
+
+    Derived PK structures and the history are refreshed only when a sheet was reloaded,
+    so this is safe to call from background jobs and on every rerun.
+    """
+    all_dfs = []
+    errors = {}
+    for name in PK_SHEETS:
+        try:
+            df = fetch_pk_sheet(name)
+            if not df.empty:
+                all_dfs.append(df)
+        except Exception as e:
+            errors[name] = str(e)
+
+    cache = get_data_cache()
+    stamps = tuple(cache.stamp(SHEET_KIND, name) for name in PK_SHEETS)
+    with _combined_lock:
+        if stamps == _combined["stamps"]:
+            return _combined["frame"], errors
+
+        combined = pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+
+        # Derived PK structures only process rows that arrived since the last load
+        from utils.pk_rollups import get_pk_rollups
+        from utils.pk_matchups import get_agency_matchups
+        from utils.pk_conflicts import get_conflict_detector
+        from utils.pk_schedule import get_pk_schedule
+        from utils.query_engine import get_query_engine
+        from utils.leaderboards import get_leaderboards
+        for consumer in (get_pk_rollups(), get_agency_matchups(), get_conflict_detector(), get_pk_schedule(),
+                         get_query_engine(), get_leaderboards()):
+            consumer.refresh(combined)
+
+        if not combined.empty:
+            from utils.history_store import get_history_store
+            history = get_history_store()
+            if history.available:
+                try:
+                    history.append_snapshot(combined)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Could not record PK history snapshot: {e}")
+
+        _combined.update(stamps=stamps, frame=combined)
+        return combined, errors
+
+
+def load_all_data() -> pd.DataFrame:
+    """All PK sheets combined into one frame with a "Source Sheet" column; a copy callers may modify."""
+    combined, errors = combine_pk_sheets()
+    for name, error in errors.items():
+        st.warning(f"⚠️ Could not load {name}: {error}")
+    show_stale_badges(PK_SHEETS)
+    return combined.copy()
+
+
+def refresh_pk_sources(progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, str]:
+    """Reload every PK sheet and PK-type tab now and rebuild the combined frame; returns errors by source.
+
+    Makes no Streamlit calls, so it can run as a background job.
+    """
+    cache = get_data_cache()
+    sources = [(SHEET_KIND, name, _read_pk_sheet) for name in PK_SHEETS]
+    sources += [(PK_TYPE_KIND, name, _read_pk_type_tab) for name in PK_TYPE_SHEETS]
+    errors = {}
+    for done, (kind, name, reader) in enumerate(sources):
+        if progress is not None:
+            progress(done / (len(sources) + 1), f"Loading {name}...")
+        try:
+            if not cache.refresh(kind, name):
+                cache.get(kind, name, lambda: reader(name))
+        except Exception as e:
+            errors[name] = str(e)
+    if progress is not None:
+        progress(len(sources) / (len(sources) + 1), "Updating PK indexes...")
+    _, sheet_errors = combine_pk_sheets()
+    errors.update(sheet_errors)
+    return errors
+
+
+def pk_type_csv_url(gid: str) -> str:
+    """CSV export link for one PK-type tab."""
+    return f"https://docs.google.com/spreadsheets/d/{PK_TYPE_SHEET_ID}/export?format=csv&gid={gid}"
+
+
+def _download_pk_type_tab(name: str, timeout=SHEET_TIMEOUT) -> pd.DataFrame:
+    df = fetch_csv(pk_type_csv_url(PK_TYPE_SHEETS[name]), timeout)
+    columns = [col for col in PK_TYPE_COLUMNS if col in df.columns]
+    df = df.loc[:, columns].dropna(how="all")
+    df["Source Sheet"] = name
+    return df
+
+
+def _read_pk_type_tab(name: str) -> pd.DataFrame:
+    return get_source_health().fetch(name, lambda timeout: _download_pk_type_tab(name, timeout))
+
+
+def fetch_pk_type_tab(name: str) -> pd.DataFrame:
+    """One PK-type tab's known columns with a "Source Sheet" column, from the shared data cache.
+
+    While the tab is failing, slow or over the render's time budget, its last good snapshot is returned.
+    """
+    return get_source_health().serve(name, lambda: get_data_cache().get(PK_TYPE_KIND, name, lambda: _read_pk_type_tab(name)))
+
+
+_combined_tabs = {"stamps": None, "frame": pd.DataFrame()}
+
+
+def load_pk_type_tabs() -> pd.DataFrame:
+    """All PK-type tabs combined into one frame with a "Source Sheet" column."""
+    all_dfs = []
+    for name in PK_TYPE_SHEETS:
+        try:
+            df = fetch_pk_type_tab(name)
+            if len(df.columns) > 1:
+                all_dfs.append(df)
+        except Exception as e:
+            st.warning(f"⚠️ Could not load {name}: {str(e)}")
+
+    cache = get_data_cache()
+    stamps = tuple(cache.stamp(PK_TYPE_KIND, name) for name in PK_TYPE_SHEETS)
+    with _combined_lock:
+        if stamps != _combined_tabs["stamps"]:
+            combined = pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+            from utils.pk_conflicts import PK_TYPE_FEED, get_conflict_detector
+            get_conflict_detector().refresh(combined, feed=PK_TYPE_FEED)
+            _combined_tabs.update(stamps=stamps, frame=combined)
+        frame = _combined_tabs["frame"].copy()
+    show_stale_badges(PK_TYPE_SHEETS)
+    return frame
+
+
+def row_ids(df: pd.DataFrame) -> np.ndarray:
+    """Stable id per row of the combined PK frame: its source sheet and its ordinal within that sheet.
+
+    Positions in the combined frame shift when an earlier sheet grows; since sheets are append-only,
+    a row's ordinal within its own sheet does not.
+    """
+    sources = df["Source Sheet"].astype(str) if "Source Sheet" in df.columns else pd.Series("", index=df.index)
+    ordinals = sources.groupby(sources, sort=False).cumcount()
+    return (sources + "#" + ordinals.astype(str)).to_numpy(dtype=object)
+
+
+class AppendTracker:
+    """Finds the rows of the combined PK frame appended since the previous call.
+
+    Sheets are treated as append-only: rows are hashed per source sheet and, as long as a
+    sheet's previously seen rows are unchanged, only its new tail is reported.
+    """
+
+    def __init__(self, columns: List[str] = PK_ROW_COLUMNS):
+        self.columns = columns
+        self._row_hashes: Dict[str, np.ndarray] = {}
+
+    def reset(self):
+        """Forget every row seen so far."""
+        self._row_hashes = {}
+
+    def new_rows(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Positions of appended rows, or None when earlier rows changed and consumers must rebuild."""
+        if df.empty:
+            rebuild = bool(self._row_hashes)
+            self._row_hashes = {}
+            return None if rebuild else np.arange(0)
+
+        sources = df["Source Sheet"] if "Source Sheet" in df.columns else pd.Series("", index=df.index)
+        columns = [col for col in self.columns if col in df.columns]
+        hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+        new_hashes = {}
+        tails = []
+        rebuild = bool(set(self._row_hashes) - set(sources.unique()))
+        for source, positions in sources.groupby(sources, sort=False).indices.items():
+            current = hashes[positions]
+            known = self._row_hashes.get(source)
+            if known is not None and (len(current) < len(known) or not np.array_equal(current[:len(known)], known)):
+                rebuild = True
+            new_hashes[source] = current
+            tails.append(positions[0 if known is None else len(known):])
+
+        self._row_hashes = new_hashes
+        if rebuild:
+            return None
+        return np.sort(np.concatenate(tails)) if tails else np.arange(0)
+
+
+def normalize_ids(values: pd.Series) -> pd.Series:
+    """Host IDs as trimmed strings; numeric IDs read as floats lose their trailing ".0"."""
+    ids = values.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+    return ids.mask(ids.isin(["", "nan", "None"]))
+
+
+def normalize_names(values: pd.Series) -> pd.Series:
+    """Agency names as trimmed strings with blanks treated as missing."""
+    names = values.astype("string").str.strip()
+    return names.mask(names.isin(["", "nan", "None"]))
@@ -0,0 +1,241 @@
+"""
+Agency head-to-head matchups from PK schedule data.
+Stores the symmetric agency-vs-agency match counts sparsely over categorical agency codes.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.pk_data import PK_SIDES, AppendTracker, normalize_names
+
+# Sentinel day for matches without a parseable date; sorts before every real day
+NO_DAY = np.iinfo(np.int64).min
+# Date-window matrices kept per process; the full-range matrix is always kept
+MAX_CACHED_WINDOWS = 16
+
+
+def _pair_codes(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Pack (lower code, higher code) into one sortable integer per match."""
+    return (lo.astype(np.int64) << 32) | hi.astype(np.int64)
+
+
+def _count_pairs(codes: np.ndarray, weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct pair codes and their (weighted) counts."""
+    pairs, inverse = np.unique(codes, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights, minlength=len(pairs)).astype(np.int64)
+    return pairs, counts
+
+
+class SparseMatchupMatrix:
+    """Symmetric agency-vs-agency counts in CSR form: row i holds every agency i has faced."""
+
+    def __init__(self, pairs: np.ndarray, counts: np.ndarray, size: int):
+        lo = (pairs >> 32).astype(np.int64)
+        hi = (pairs & 0xFFFFFFFF).astype(np.int64)
+        mirrored = lo != hi
+        rows = np.concatenate([lo, hi[mirrored]])
+        cols = np.concatenate([hi, lo[mirrored]])
+        data = np.concatenate([counts, counts[mirrored]])
+
+        order = np.lexsort((cols, rows))
+        self.size = size
+        self.indices = cols[order]
+        self.data = data[order]
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=self.indptr[1:])
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def row(self, code: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Opponent codes and match counts for one agency."""
+        start, stop = self.indptr[code], self.indptr[code + 1]
+        return self.indices[start:stop], self.data[start:stop]
+
+    def get(self, a: int, b: int) -> int:
+        """Matches between two agencies (the diagonal holds matches within one agency)."""
+        opponents, counts = self.row(a)
+        position = np.searchsorted(opponents, b)
+        if position < len(opponents) and opponents[position] == b:
+            return int(counts[position])
+        return 0
+
+    def totals(self) -> np.ndarray:
+        """Matches per agency across all opponents."""
+        rows = np.repeat(np.arange(self.size), np.diff(self.indptr))
+        return np.bincount(rows, weights=self.data, minlength=self.size).astype(np.int64)
+
+
+class AgencyMatchups:
+    """Head-to-head counts for every pair of agencies, kept current as PK rows are appended."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tracker = AppendTracker()
+        self.reset()
+
+    def reset(self):
+        """Drop every match and forget which rows have been seen."""
+        self._tracker.reset()
+        self._clear()
+
+    def _clear(self):
+        self.agencies: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._days = np.empty(0, dtype=np.int64)
+        self._pairs = np.empty(0, dtype=np.int64)
+        self._days_sorted = True
+        self._total_pairs = np.empty(0, dtype=np.int64)
+        self._total_counts = np.empty(0, dtype=np.int64)
+        self._matrices: Dict[Tuple, SparseMatchupMatrix] = {}
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Fold rows appended to the combined PK frame into the matchups; returns the rows applied."""
+        with self._lock:
+            positions = self._tracker.new_rows(df)
+            if positions is None:
+                self._clear()
+                positions = np.arange(len(df))
+            return self._apply(df.iloc[positions])
+
+    def _encode(self, names: pd.Series) -> np.ndarray:
+        """Categorical codes for agency names, extending the dictionary with unseen names; -1 when missing."""
+        names = normalize_names(names)
+        for name in names.dropna().unique():
+            if name not in self._codes:
+                self._codes[name] = len(self.agencies)
+                self.agencies.append(name)
+        return names.map(self._codes).fillna(-1).to_numpy(dtype=np.int64)
+
+    def _apply(self, rows: pd.DataFrame) -> int:
+        (agency1, _), (agency2, _) = PK_SIDES
+        if rows.empty or agency1 not in rows.columns or agency2 not in rows.columns:
+            return 0
+
+        first = self._encode(rows[agency1])
+        second = self._encode(rows[agency2])
+        valid = (first >= 0) & (second >= 0)
+        if not valid.any():
+            return 0
+
+        dates = rows["Date"] if "Date" in rows.columns else pd.Series(pd.NaT, index=rows.index)
+        days = pd.to_datetime(dates, errors="coerce").dt.normalize()
+        day_values = np.where(days.isna(), NO_DAY, days.to_numpy(dtype="datetime64[ns]").astype(np.int64))[valid]
+        pairs = _pair_codes(np.minimum(first, second)[valid], np.maximum(first, second)[valid])
+
+        appended_in_order = np.all(np.diff(day_values) >= 0) and (not len(self._days) or day_values[0] >= self._days[-1])
+        self._days_sorted = self._days_sorted and bool(appended_in_order)
+        self._days = np.concatenate([self._days, day_values])
+        self._pairs = np.concatenate([self._pairs, pairs])
+
+        # Fold the new pair counts into the running full-range counts in O(distinct pairs)
+        new_pairs, new_counts = _count_pairs(pairs)
+        self._total_pairs, self._total_counts = _count_pairs(
+            np.concatenate([self._total_pairs, new_pairs]),
+            np.concatenate([self._total_counts, new_counts]),
+        )
+        self._matrices = {}
+        return int(valid.sum())
+
+    @property
+    def matches(self) -> int:
+        return len(self._pairs)
+
+    def _window(self, start, end) -> Tuple[np.ndarray, np.ndarray]:
+        """Pair codes and days for matches within an inclusive date window, via binary search on sorted days."""
+        if not self._days_sorted:
+            order = np.argsort(self._days, kind="stable")
+            self._days, self._pairs = self._days[order], self._pairs[order]
+            self._days_sorted = True
+        # Undated matches fall outside every window
+        if start is None:
+            lo = np.searchsorted(self._days, NO_DAY, side="right")
+        else:
+            lo = np.searchsorted(self._days, pd.Timestamp(start).normalize().value, side="left")
+        hi = len(self._days) if end is None else np.searchsorted(self._days, pd.Timestamp(end).normalize().value, side="right")
+        return self._pairs[lo:hi], self._days[lo:hi]
+
+    def matrix(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> SparseMatchupMatrix:
+        """Sparse symmetric matchup matrix for all matches, or for an inclusive date window."""
+        key = (None if start is None else pd.Timestamp(start).normalize(),
+               None if end is None else pd.Timestamp(end).normalize())
+        with self._lock:
+            matrix = self._matrices.get(key)
+            if matrix is not None:
+                return matrix
+
+            if key == (None, None):
+                matrix = SparseMatchupMatrix(self._total_pairs, self._total_counts, len(self.agencies))
+            else:
+                pairs, _ = self._window(*key)
+                matrix = SparseMatchupMatrix(*_count_pairs(pairs), len(self.agencies))
+
+            if len(self._matrices) >= MAX_CACHED_WINDOWS:
+                self._matrices.pop(next(k for k in self._matrices if k != (None, None)), None)
+            self._matrices[key] = matrix
+            return matrix
+
+    def top_rivals(self, agency: str, k: int = 5, start: Optional[pd.Timestamp] = None,
+                   end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """The k agencies an agency has faced most often, excluding matches within the agency."""
+        code = self._codes.get(agency)
+        if code is None:
+            return pd.DataFrame(columns=["Rival", "Matches"])
+
+        opponents, counts = self.matrix(start, end).row(code)
+        others = opponents != code
+        opponents, counts = opponents[others], counts[others]
+        if len(counts) > k:
+            top = np.argpartition(-counts, k - 1)[:k]
+            opponents, counts = opponents[top], counts[top]
+        order = np.lexsort((opponents, -counts))
+        return pd.DataFrame({
+            "Rival": [self.agencies[i] for i in opponents[order]],
+            "Matches": counts[order],
+        })
+
+    def head_to_head(self, agency_a: str, agency_b: str, start: Optional[pd.Timestamp] = None,
+                     end: Optional[pd.Timestamp] = None) -> int:
+        """Matches between two agencies."""
+        a, b = self._codes.get(agency_a), self._codes.get(agency_b)
+        if a is None or b is None:
+            return 0
+        return self.matrix(start, end).get(a, b)
+
+    def matrix_frame(self, n: int = 15, start: Optional[pd.Timestamp] = None,
+                     end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Dense head-to-head table for the n most active agencies, for display."""
+        matrix = self.matrix(start, end)
+        if not matrix.nnz:
+            return pd.DataFrame()
+        totals = matrix.totals()
+        top = np.argsort(-totals, kind="stable")[:n]
+        top = top[totals[top] > 0]
+        position = np.full(matrix.size, -1, dtype=np.int64)
+        position[top] = np.arange(len(top))
+
+        dense = np.zeros((len(top), len(top)), dtype=np.int64)
+        for i, code in enumerate(top):
+            opponents, counts = matrix.row(code)
+            keep = position[opponents] >= 0
+            dense[i, position[opponents[keep]]] = counts[keep]
+        names = [self.agencies[i] for i in top]
+        return pd.DataFrame(dense, index=names, columns=names)
+
+
+_matchups: Optional[AgencyMatchups] = None
+_matchups_lock = threading.Lock()
+
+
+def get_agency_matchups() -> AgencyMatchups:
+    """The process-wide agency matchups."""
+    global _matchups
+    if _matchups is None:
+        with _matchups_lock:
+            if _matchups is None:
+                _matchups = AgencyMatchups()
+    return _matchups
@@ -0,0 +1,135 @@
+"""
+Materialized rollups of PK schedule activity.
+Keeps per-day, per-agency and per-host match counts up to date as new PK rows arrive.
+"""
+
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.pk_data import PK_SIDES, AppendTracker, normalize_ids, normalize_names
+
+
+def _empty_counts(index_names=None) -> pd.Series:
+    if index_names:
+        index = pd.MultiIndex.from_arrays([[] for _ in index_names], names=index_names)
+        return pd.Series([], index=index, dtype="int64")
+    return pd.Series([], dtype="int64")
+
+
+def _add_counts(total: pd.Series, delta: pd.Series) -> pd.Series:
+    if delta.empty:
+        return total
+    if total.empty:
+        return delta.astype("int64")
+    return total.add(delta, fill_value=0).astype("int64")
+
+
+def participants(rows: pd.DataFrame, days: pd.Series, column_index: int, normalize) -> pd.DataFrame:
+    """One row per (match, participant) so a match between two sides of the same agency counts once."""
+    parts = []
+    for side in PK_SIDES:
+        column = side[column_index]
+        if column in rows.columns:
+            parts.append(pd.DataFrame({"match": np.arange(len(rows)), "day": days.to_numpy(), "key": normalize(rows[column]).to_numpy()}))
+    if not parts:
+        return pd.DataFrame(columns=["match", "day", "key"])
+    return pd.concat(parts, ignore_index=True).dropna(subset=["key"]).drop_duplicates(["match", "key"])
+
+
+class PKRollups:
+    """Running PK match counts, updated from only the rows appended since the last refresh."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tracker = AppendTracker()
+        # Bumped whenever the counts change, so charts built from them can be cached
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        """Drop every count and forget which rows have been seen."""
+        self._tracker.reset()
+        self._clear()
+
+    def _clear(self):
+        self.version += 1
+        self.rows = 0
+        self.daily = _empty_counts()
+        self.agency = _empty_counts()
+        self.agency_daily = _empty_counts(["day", "agency"])
+        self.host = _empty_counts()
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Bring the rollups up to date with the combined PK frame; returns the number of rows applied.
+
+        Only rows appended since the last refresh are aggregated; edited or removed rows rebuild every count.
+        """
+        with self._lock:
+            positions = self._tracker.new_rows(df)
+            if positions is None:
+                self._clear()
+                positions = np.arange(len(df))
+            return self._apply(df.iloc[positions])
+
+    def _apply(self, rows: pd.DataFrame) -> int:
+        if rows.empty:
+            return 0
+
+        dates = rows["Date"] if "Date" in rows.columns else pd.Series(pd.NaT, index=rows.index)
+        days = pd.to_datetime(dates, errors="coerce").dt.normalize()
+
+        self.daily = _add_counts(self.daily, days.dropna().value_counts())
+
+        agencies = participants(rows, days, 0, normalize_names)
+        self.agency = _add_counts(self.agency, agencies["key"].value_counts())
+        dated = agencies.dropna(subset=["day"])
+        self.agency_daily = _add_counts(
+            self.agency_daily,
+            dated.groupby(["day", "key"]).size().rename_axis(["day", "agency"]),
+        )
+
+        hosts = participants(rows, days, 1, normalize_ids)
+        self.host = _add_counts(self.host, hosts["key"].value_counts())
+
+        self.rows += len(rows)
+        self.version += 1
+        return len(rows)
+
+    def daily_counts(self) -> pd.DataFrame:
+        """Matches per day, oldest first."""
+        return self.daily.sort_index().rename_axis("Date").reset_index(name="Matches")
+
+    def top_agencies(self, n: int = 10, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Agencies with the most matches, optionally within an inclusive date window."""
+        if start is None and end is None:
+            counts = self.agency
+        else:
+            days = self.agency_daily.index.get_level_values("day")
+            mask = np.ones(len(days), dtype=bool)
+            if start is not None:
+                mask &= days >= pd.Timestamp(start)
+            if end is not None:
+                mask &= days <= pd.Timestamp(end)
+            counts = self.agency_daily[mask].groupby(level="agency").sum()
+        return counts.nlargest(n).rename_axis("Agency").reset_index(name="Matches")
+
+    def top_hosts(self, n: int = 10) -> pd.DataFrame:
+        """Host IDs booked into the most matches."""
+        return self.host.nlargest(n).rename_axis("Host ID").reset_index(name="Matches")
+
+
+_rollups: Optional[PKRollups] = None
+_rollups_lock = threading.Lock()
+
+
+def get_pk_rollups() -> PKRollups:
+    """The process-wide PK rollups."""
+    global _rollups
+    if _rollups is None:
+        with _rollups_lock:
+            if _rollups is None:
+                _rollups = PKRollups()
+    return _rollups
@@ -0,0 +1,206 @@
+"""
+Schedule index over PK bookings for the Schedule page.
+Answers time-range lookups per host and agency and keeps calendar buckets precomputed.
+"""
+
+import threading
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.pk_conflicts import PK_SHEETS_FEED, slot_intervals
+from utils.pk_data import AppendTracker, row_ids
+
+EVENT_COLUMNS = ["Start", "End", "Slot", "Host ID", "Agency", "Source"]
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+class IntervalIndex:
+    """Intervals sorted by start within each key, for overlap queries by binary search.
+
+    A booking overlapping [t1, t2) must start in (t1 - longest, t2), so a lookup costs two
+    bisections over the key's slice plus the bookings it returns.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, keys: Optional[np.ndarray] = None):
+        if keys is None:
+            codes, uniques = np.zeros(len(starts), dtype=np.int64), pd.Index(["*"])
+        else:
+            codes, uniques = pd.factorize(keys, sort=True)
+        order = np.lexsort((starts, codes))
+        self.positions = order
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.longest = int((ends - starts).max()) if len(starts) else 0
+
+        sorted_codes = codes[order]
+        valid = sorted_codes >= 0  # missing keys were given code -1 and sort first
+        first = int(np.argmax(valid)) if valid.any() else len(order)
+        offsets = np.searchsorted(sorted_codes[first:], np.arange(len(uniques) + 1)) + first
+        self._slices: Dict[str, Tuple[int, int]] = {
+            key: (int(offsets[i]), int(offsets[i + 1])) for i, key in enumerate(uniques)
+        }
+
+    def keys(self):
+        return self._slices.keys()
+
+    def query(self, t1: int, t2: int, key: Optional[str] = None) -> np.ndarray:
+        """Positions of intervals overlapping [t1, t2), optionally for one key."""
+        lo, hi = self._slices.get("*" if key is None else key, (0, 0))
+        starts = self.starts[lo:hi]
+        first = lo + np.searchsorted(starts, t1 - self.longest, side="right")
+        last = lo + np.searchsorted(starts, t2, side="left")
+        overlapping = self.ends[first:last] > t1
+        return self.positions[first:last][overlapping]
+
+
+class PKSchedule:
+    """Bookings from the combined PK sheets, indexed per host and per agency with calendar buckets."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tracker = AppendTracker()
+        self.reset()
+
+    def reset(self):
+        """Drop every booking and forget which rows have been seen."""
+        self._tracker.reset()
+        self._clear()
+
+    def _clear(self):
+        self._bookings = slot_intervals(pd.DataFrame(), PK_SHEETS_FEED)
+        self._hourly = pd.Series([], index=pd.DatetimeIndex([]), dtype="int64")
+        self._daily = pd.Series([], index=pd.DatetimeIndex([]), dtype="int64")
+        self._indexes: Optional[Dict[str, IntervalIndex]] = None
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Add bookings from rows appended to the combined PK frame; returns the number of bookings added."""
+        with self._lock:
+            positions = self._tracker.new_rows(df)
+            if positions is None:
+                self._clear()
+                positions = np.arange(len(df))
+            # Bookings are keyed by stable row ids: positions shift when an earlier sheet grows
+            added = slot_intervals(df.iloc[positions], PK_SHEETS_FEED, rows=row_ids(df)[positions])
+            if added.empty:
+                return 0
+
+            self._bookings = added if self._bookings.empty else pd.concat([self._bookings, added], ignore_index=True)
+            # Buckets count PK matches, not the hosts booked into them
+            matches = added.drop_duplicates("row")["start"]
+            self._hourly = self._add_counts(self._hourly, matches.dt.floor("h").value_counts())
+            self._daily = self._add_counts(self._daily, matches.dt.normalize().value_counts())
+            self._indexes = None
+            return len(added)
+
+    @staticmethod
+    def _add_counts(total: pd.Series, delta: pd.Series) -> pd.Series:
+        combined = delta if total.empty else total.add(delta, fill_value=0)
+        return combined.astype("int64").sort_index()
+
+    def _index(self, name: str) -> IntervalIndex:
+        """Interval indexes are rebuilt lazily, once per data change."""
+        with self._lock:
+            if self._indexes is None:
+                starts = self._bookings["start"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+                ends = self._bookings["end"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+                self._indexes = {
+                    "all": IntervalIndex(starts, ends),
+                    "host": IntervalIndex(starts, ends, self._bookings["host_id"].to_numpy(dtype=object)),
+                    "agency": IntervalIndex(starts, ends, self._bookings["agency"].to_numpy(dtype=object)),
+                }
+            return self._indexes[name]
+
+    @property
+    def bookings(self) -> int:
+        return len(self._bookings)
+
+    def hosts(self):
+        return sorted(self._index("host").keys())
+
+    def agencies(self):
+        return sorted(self._index("agency").keys())
+
+    def events(self, start, end, host_id: Optional[str] = None, agency: Optional[str] = None) -> pd.DataFrame:
+        """Bookings overlapping [start, end), one row per PK match unless filtered to a host."""
+        t1, t2 = pd.Timestamp(start).value, pd.Timestamp(end).value
+        if host_id is not None:
+            positions = self._index("host").query(t1, t2, host_id)
+        elif agency is not None:
+            positions = self._index("agency").query(t1, t2, agency)
+        else:
+            positions = self._index("all").query(t1, t2)
+
+        found = self._bookings.iloc[positions]
+        if host_id is None:
+            found = found.drop_duplicates("row")
+        found = found.sort_values("start")
+        return pd.DataFrame({
+            "Start": found["start"].to_numpy(),
+            "End": found["end"].to_numpy(),
+            "Slot": found["slot"].to_numpy(),
+            "Host ID": found["host_id"].to_numpy(),
+            "Agency": found["agency"].to_numpy(),
+            "Source": found["source"].to_numpy(),
+        })
+
+    def _bucket(self, start, end, freq: str, host_id: Optional[str], agency: Optional[str]) -> pd.Series:
+        """Match counts per hour or day in [start, end): precomputed buckets, or the filtered lookup."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if host_id is None and agency is None:
+            buckets = self._hourly if freq == "h" else self._daily
+            # Sorted DatetimeIndex slicing is a binary search
+            counts = buckets.loc[start:end - pd.Timedelta(1)]
+        else:
+            starts = pd.Series(self.events(start, end, host_id, agency)["Start"])
+            starts = starts[starts >= start]
+            counts = (starts.dt.floor("h") if freq == "h" else starts.dt.normalize()).value_counts()
+        slots = pd.date_range(start, end, freq=freq, inclusive="left")
+        return counts.reindex(slots, fill_value=0).astype("int64")
+
+    def day_view(self, day: date, host_id: Optional[str] = None, agency: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """Bookings on one day and the matches per hour."""
+        start = pd.Timestamp(day).normalize()
+        end = start + pd.Timedelta(days=1)
+        hourly = self._bucket(start, end, "h", host_id, agency)
+        hourly.index = hourly.index.strftime("%H:00")
+        return self.events(start, end, host_id, agency), hourly
+
+    def week_view(self, day: date, host_id: Optional[str] = None, agency: Optional[str] = None) -> pd.DataFrame:
+        """Matches per hour (rows) and weekday (columns) for the week containing ``day``."""
+        start = pd.Timestamp(day).normalize() - pd.Timedelta(days=pd.Timestamp(day).weekday())
+        hourly = self._bucket(start, start + pd.Timedelta(days=7), "h", host_id, agency)
+        grid = hourly.to_numpy().reshape(7, 24).T
+        columns = [f"{name} {(start + timedelta(days=i)).strftime('%d %b')}" for i, name in enumerate(WEEKDAYS)]
+        return pd.DataFrame(grid, index=[f"{hour:02d}:00" for hour in range(24)], columns=columns)
+
+    def month_view(self, day: date, host_id: Optional[str] = None, agency: Optional[str] = None) -> pd.DataFrame:
+        """Calendar grid of matches per day for the month containing ``day``; blank outside the month."""
+        first = pd.Timestamp(day).normalize().replace(day=1)
+        following = first + pd.offsets.MonthBegin(1)
+        grid_start = first - pd.Timedelta(days=first.weekday())
+        weeks = -(-(following - grid_start).days // 7)
+        daily = self._bucket(grid_start, grid_start + pd.Timedelta(days=7 * weeks), "D", host_id, agency)
+
+        cells = [
+            f"{stamp.day}: {count}" if first <= stamp < following else ""
+            for stamp, count in daily.items()
+        ]
+        index = [f"Week of {(grid_start + timedelta(weeks=i)).strftime('%d %b')}" for i in range(weeks)]
+        return pd.DataFrame(np.array(cells, dtype=object).reshape(weeks, 7), index=index, columns=WEEKDAYS)
+
+
+_schedule: Optional[PKSchedule] = None
+_schedule_lock = threading.Lock()
+
+
+def get_pk_schedule() -> PKSchedule:
+    """The process-wide PK schedule."""
+    global _schedule
+    if _schedule is None:
+        with _schedule_lock:
+            if _schedule is None:
+                _schedule = PKSchedule()
+    return _schedule
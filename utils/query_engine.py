@@ -0,0 +1,253 @@
+"""
+Embedded SQL query layer over dashboard data.
+Registers the live PK snapshot, its history and the pay charts as indexed tables in DuckDB or SQLite.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.pk_data import AppendTracker, normalize_ids, normalize_names
+
+try:
+    import duckdb
+except ImportError:  # SQLite from the standard library is the fallback engine
+    duckdb = None
+
+ENGINE_ERRORS = (sqlite3.Error,) if duckdb is None else (sqlite3.Error, duckdb.Error)
+
+# Combined PK frame columns and their SQL names
+PK_SQL_COLUMNS = {
+    "Date": "date",
+    "Time": "time",
+    "Agency Name.1": "agency_1",
+    "ID1": "host_id_1",
+    "Agency Name.2": "agency_2",
+    "ID.2": "host_id_2",
+    "Source Sheet": "source_sheet",
+}
+PK_INDEXES = ["date", "agency_1", "agency_2", "host_id_1", "host_id_2"]
+PAY_CHART_TABLES = ["host_pay", "agency_pay"]
+
+MAX_RESULT_ROWS = 10_000
+MAX_CACHED_QUERIES = 32
+READ_ONLY_STATEMENTS = ("select", "with", "explain")
+
+
+def sql_name(column: str) -> str:
+    """Column name usable unquoted in SQL, e.g. "Target Beans" -> target_beans."""
+    return re.sub(r"[^0-9a-z]+", "_", str(column).strip().lower()).strip("_") or "column"
+
+
+def pk_table(df: pd.DataFrame) -> pd.DataFrame:
+    """The combined PK frame with SQL column names, ISO dates and normalized agencies and host IDs."""
+    table = pd.DataFrame(index=range(len(df)))
+    for column, name in PK_SQL_COLUMNS.items():
+        values = df[column].reset_index(drop=True) if column in df.columns else pd.Series(None, index=table.index, dtype=object)
+        if name == "date":
+            values = pd.to_datetime(values, errors="coerce").dt.strftime("%Y-%m-%d")
+        elif name.startswith("agency"):
+            values = normalize_names(values)
+        elif name.startswith("host_id"):
+            values = normalize_ids(values)
+        else:
+            values = values.astype("string").str.strip()
+        table[name] = values.astype(object).where(values.notna(), None)
+    return table
+
+
+def _check_read_only(sql: str) -> str:
+    """Accept a statement starting with SELECT/WITH/EXPLAIN; returns it without the trailing semicolon.
+
+    Splitting statements is left to the engine, which understands semicolons inside string literals.
+    """
+    statement = sql.strip().rstrip(";").strip()
+    if not statement:
+        raise ValueError("Enter a query to run")
+    if statement.split(None, 1)[0].lower() not in READ_ONLY_STATEMENTS:
+        raise ValueError("Only SELECT, WITH and EXPLAIN queries are allowed")
+    return statement
+
+
+class QueryEngine:
+    """In-process analytical database over the dashboard's data, with cached, timed queries."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.backend = "duckdb" if duckdb is not None else "sqlite"
+        if duckdb is not None:
+            # Queries come from the admin SQL box: no reading server files or URLs, and no turning that back on
+            self._con = duckdb.connect(":memory:", config={"enable_external_access": False})
+            self._execute("SET lock_configuration = true")
+        else:
+            self._con = sqlite3.connect(":memory:", check_same_thread=False)
+        self._tracker = AppendTracker()
+        self._versions: Dict[str, int] = {}
+        self._sources: Dict[str, object] = {}
+        self._results: "OrderedDict[Tuple, Tuple[pd.DataFrame, bool]]" = OrderedDict()
+
+    # --- Table registration ---
+
+    def _execute(self, sql: str, params=()):
+        return self._con.execute(sql, params)
+
+    def _check_single(self, statement: str):
+        """Reject input the engine parses as several statements, or as anything but a query."""
+        if self.backend == "duckdb":
+            try:
+                parsed = self._con.extract_statements(statement)
+            except duckdb.Error as e:
+                raise ValueError(str(e)) from e
+            if len(parsed) != 1:
+                raise ValueError("Only one statement can be run at a time")
+            if parsed[0].type not in (duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN):
+                raise ValueError("Only SELECT, WITH and EXPLAIN queries are allowed")
+        # sqlite3 refuses to execute more than one statement, and query_only blocks writes
+
+    def _replace(self, table: str, df: pd.DataFrame, indexes: List[str] = ()):
+        """Create or replace a table from a frame and index the given columns."""
+        self._execute(f'DROP TABLE IF EXISTS "{table}"')
+        if self.backend == "duckdb":
+            self._con.register("_incoming", df)
+            self._execute(f'CREATE TABLE "{table}" AS SELECT * FROM _incoming')
+            self._con.unregister("_incoming")
+        else:
+            df.to_sql(table, self._con, index=False)
+        for column in indexes:
+            self._execute(f'CREATE INDEX "idx_{table}_{column}" ON "{table}" ("{column}")')
+        self._bump(table)
+
+    def _append(self, table: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        if self.backend == "duckdb":
+            self._con.register("_incoming", df)
+            self._execute(f'INSERT INTO "{table}" SELECT * FROM _incoming')
+            self._con.unregister("_incoming")
+        else:
+            df.to_sql(table, self._con, index=False, if_exists="append")
+        self._bump(table)
+
+    def _bump(self, table: str):
+        self._versions[table] = self._versions.get(table, 0) + 1
+
+    def register(self, table: str, df: pd.DataFrame, indexes: List[str] = ()):
+        """Register any frame as a table, renaming columns to SQL-friendly names."""
+        with self._lock:
+            frame = df.rename(columns=sql_name)
+            self._replace(table, frame, [sql_name(col) for col in indexes])
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Keep the ``pk_snapshot`` table in step with the combined PK frame, inserting only appended rows."""
+        with self._lock:
+            positions = self._tracker.new_rows(df)
+            if positions is None or "pk_snapshot" not in self._versions:
+                self._replace("pk_snapshot", pk_table(df), PK_INDEXES)
+                return len(df)
+            self._append("pk_snapshot", pk_table(df.iloc[positions]))
+            return len(positions)
+
+    def _sync_sources(self):
+        """Re-register history and pay chart tables whose source data changed since the last query."""
+        from utils.data_manager import get_data_manager
+        from utils.history_store import get_history_store
+
+        manager = get_data_manager()
+        for name in PAY_CHART_TABLES:
+            version = manager.version(name)
+            if self._sources.get(name) != version:
+                self.register(name, manager.load_data(name).copy())
+                self._sources[name] = version
+
+        history = get_history_store()
+        if history.available:
+            events = history.events()
+            marker = (len(events), events["at"].max() if len(events) else None)
+            if self._sources.get("pk_history") != marker:
+                rows = history.read_range(include_removed=True)
+                table = pk_table(rows)
+                table["row_hash"] = rows["row_hash"].astype("uint64").astype(str).to_numpy() if len(rows) else []
+                table["first_seen"] = rows["first_seen"].astype(str).to_numpy() if len(rows) else []
+                self._replace("pk_history", table, PK_INDEXES + ["row_hash"])
+
+                log = events.assign(
+                    row_hash=events["row_hash"].astype("uint64").astype(str),
+                    event=np.where(events["event"] > 0, "added", "removed"),
+                    at=events["at"].astype(str),
+                    source=events["source"].astype(object),
+                )
+                self._replace("pk_history_events", log.rename(columns={"source": "source_sheet"}), ["row_hash", "at"])
+                self._sources["pk_history"] = marker
+
+    # --- Queries ---
+
+    def tables(self) -> pd.DataFrame:
+        """Registered tables with their row counts and columns."""
+        with self._lock:
+            self._sync_sources()
+            rows = []
+            for table in sorted(self._versions):
+                cursor = self._execute(f'SELECT * FROM "{table}" LIMIT 0')
+                count = self._execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                rows.append({
+                    "Table": table,
+                    "Rows": count,
+                    "Columns": ", ".join(col[0] for col in cursor.description),
+                })
+            return pd.DataFrame(rows, columns=["Table", "Rows", "Columns"])
+
+    def query(self, sql: str, max_rows: int = MAX_RESULT_ROWS) -> Tuple[pd.DataFrame, float, bool, bool]:
+        """Run a read-only query.
+
+        Returns (result, elapsed milliseconds, served from cache, truncated to ``max_rows``).
+        Results are cached until one of the registered tables changes.
+        """
+        statement = _check_read_only(sql)
+        started = time.perf_counter()
+        with self._lock:
+            self._check_single(statement)
+            self._sync_sources()
+            key = (" ".join(statement.split()), max_rows, tuple(sorted(self._versions.items())))
+            if key in self._results:
+                self._results.move_to_end(key)
+                result, truncated = self._results[key]
+                return result, (time.perf_counter() - started) * 1000, True, truncated
+
+            if self.backend == "sqlite":
+                self._execute("PRAGMA query_only = ON")
+            try:
+                cursor = self._execute(statement)
+                rows = cursor.fetchmany(max_rows + 1)
+                columns = [col[0] for col in cursor.description] if cursor.description else []
+            except ENGINE_ERRORS as e:
+                raise ValueError(str(e)) from e
+            finally:
+                if self.backend == "sqlite":
+                    self._execute("PRAGMA query_only = OFF")
+
+            truncated = len(rows) > max_rows
+            result = pd.DataFrame(rows[:max_rows], columns=columns)
+            self._results[key] = (result, truncated)
+            if len(self._results) > MAX_CACHED_QUERIES:
+                self._results.popitem(last=False)
+            return result, (time.perf_counter() - started) * 1000, False, truncated
+
+
+_engine: Optional[QueryEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_query_engine() -> QueryEngine:
+    """The process-wide query engine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = QueryEngine()
+    return _engine
@@ -0,0 +1,149 @@
+"""
+Recalculation of dated earnings at the conversion rates in force when they were earned.
+Looks up every row's rule version with one vectorized binary search and prices it in minor units, chunk by chunk.
+"""
+
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.chunked_reader import detect_format, iter_chunks
+from utils.money import apply_rate, from_minor_units
+from utils.payment_rules import RuleRegistry, get_rule_registry
+
+EARNINGS_COLUMN_ALIASES = {
+    "day": "date",
+    "earned_at": "date",
+    "id": "host_id",
+    "beans_earned": "beans",
+    "diamonds_earned": "diamonds",
+}
+QUANTITY_COLUMNS = ["beans", "diamonds"]
+# Output columns added to the uploaded table
+RESULT_COLUMNS = ["Rules Version", "Beans per Diamond", "Diamonds", "USD per Diamond", "USD"]
+# Hidden column carrying each row's USD as int64 minor units for exact totals; dropped on export
+USD_MINOR_COLUMN = "_usd_minor"
+RECALC_CHUNK_ROWS = 100_000
+
+
+def earnings_template() -> pd.DataFrame:
+    """Example table showing the columns recalculation accepts."""
+    return pd.DataFrame([
+        {"date": "2025-01-15", "host_id": "123456", "beans": 36100},
+        {"date": "2025-02-03", "host_id": "123456", "beans": 18050},
+    ])
+
+
+def _normalize_columns(chunk: pd.DataFrame) -> pd.DataFrame:
+    renamed = {}
+    for col in chunk.columns:
+        key = str(col).strip().lower().replace(" ", "_")
+        renamed[col] = EARNINGS_COLUMN_ALIASES.get(key, key)
+    return chunk.rename(columns=renamed)
+
+
+def read_earnings(data: bytes, filename: str) -> pd.DataFrame:
+    """Read an uploaded earnings table with a date and beans and/or diamonds per row.
+
+    Other columns are kept as they are. Raises ValueError naming the first bad row when a date
+    does not parse or a quantity is not a non-negative number.
+    """
+    frames = []
+    row_offset = 0
+    for chunk in iter_chunks(data, detect_format(filename), dtype={"host_id": "string", "id": "string"}):
+        chunk = _normalize_columns(chunk).reset_index(drop=True)
+        if "date" not in chunk.columns:
+            raise ValueError("Missing required column: date")
+        if not any(name in chunk.columns for name in QUANTITY_COLUMNS):
+            raise ValueError("The table needs a beans or diamonds column")
+
+        dates = pd.to_datetime(chunk["date"], errors="coerce")
+        checks = {"date": dates.isna()}
+        for name in QUANTITY_COLUMNS:
+            if name in chunk.columns:
+                values = pd.to_numeric(chunk[name], errors="coerce")
+                checks[name] = values.isna() | (values < 0)
+                chunk[name] = values
+        for name, invalid in checks.items():
+            if invalid.any():
+                first = int(np.flatnonzero(invalid.to_numpy())[0]) + row_offset + 2
+                raise ValueError(f"{int(invalid.sum())} invalid values in {name} (first at row {first})")
+
+        chunk["date"] = dates
+        frames.append(chunk)
+        row_offset += len(chunk)
+
+    if not frames:
+        raise ValueError("The uploaded file has no rows")
+    return pd.concat(frames, ignore_index=True)
+
+
+def recalculate_earnings(earnings: pd.DataFrame, registry: Optional[RuleRegistry] = None,
+                         progress: Optional[Callable[[float, str], None]] = None,
+                         chunk_rows: int = RECALC_CHUNK_ROWS) -> pd.DataFrame:
+    """Price every row at the conversion rates in force on its date.
+
+    Diamonds are derived from beans when a beans column is present, otherwise taken as given.
+    ``progress`` is called with the fraction done after each chunk, so this can run as a background job.
+    """
+    registry = registry or get_rule_registry()
+    total = len(earnings)
+    parts = []
+    for start in range(0, max(total, 1), chunk_rows):
+        chunk = earnings.iloc[start:start + chunk_rows]
+        dates = chunk["date"].to_numpy()
+        rates = registry.rates_at(dates)
+        beans_rate, usd_rate = rates["beans_to_diamonds_rate"], rates["diamond_to_usd_rate"]
+        if "beans" in chunk.columns:
+            diamonds = chunk["beans"].to_numpy(dtype=np.float64) / beans_rate
+        else:
+            diamonds = chunk["diamonds"].to_numpy(dtype=np.float64)
+        diamonds = np.round(diamonds, 3)
+
+        part = chunk.copy()
+        part["Rules Version"] = registry.versions_at(dates)
+        part["Beans per Diamond"] = beans_rate
+        part["Diamonds"] = diamonds
+        part["USD per Diamond"] = usd_rate
+        usd_minor = apply_rate(diamonds, usd_rate)
+        part["USD"] = from_minor_units(usd_minor)
+        part[USD_MINOR_COLUMN] = usd_minor
+        parts.append(part)
+        if progress is not None:
+            done = min(start + chunk_rows, total)
+            progress(done / total if total else 1.0, f"Recalculated {done:,} of {total:,} rows")
+
+    if not total:
+        empty = earnings.assign(**{column: pd.Series(dtype="float64") for column in RESULT_COLUMNS})
+        return empty.assign(**{USD_MINOR_COLUMN: pd.Series(dtype="int64")})
+    return pd.concat(parts, ignore_index=True)
+
+
+def export_earnings(results: pd.DataFrame) -> pd.DataFrame:
+    """Recalculated earnings without the hidden minor-unit column, for display and download."""
+    return results.drop(columns=USD_MINOR_COLUMN)
+
+
+def monthly_totals(results: pd.DataFrame) -> pd.DataFrame:
+    """Diamonds and USD per month and rules version, with USD summed exactly in minor units."""
+    frame = pd.DataFrame({
+        "Month": results["date"].dt.to_period("M").astype(str),
+        "Rules Version": results["Rules Version"],
+        "Rows": 1,
+        "Diamonds": results["Diamonds"],
+        "USD (cents)": results[USD_MINOR_COLUMN].to_numpy(dtype=np.int64),
+    })
+    totals = frame.groupby(["Month", "Rules Version"], as_index=False).sum()
+    totals["USD"] = from_minor_units(totals.pop("USD (cents)").to_numpy())
+    return totals
+
+
+def recalc_summary(results: pd.DataFrame) -> Dict[str, float]:
+    """Headline totals of a recalculation."""
+    return {
+        "rows": len(results),
+        "versions": int(results["Rules Version"].nunique()) if len(results) else 0,
+        "diamonds": float(results["Diamonds"].sum()),
+        "usd": float(from_minor_units(results[USD_MINOR_COLUMN].to_numpy(dtype=np.int64).sum())),
+    }
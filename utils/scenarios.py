@@ -0,0 +1,205 @@
+"""
+Payment policy scenario sweeps for Bigo Live paysheets.
+Evaluates a grid of payment-rule variations against a roster in one broadcast pass.
+"""
+
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.money import apply_rate, to_minor_units, from_minor_units, format_minor_units
+from utils.payment_rules import active_rules
+from utils.paysheet import build_roster, calculate_payment_columns
+
+SCENARIO_PARAMETERS = ["base_rate", "bonus_threshold", "bonus_rate", "pk_win_bonus", "attendance_bonus"]
+
+# Scenario x host cells evaluated per block; bounds the size of every temporary array (~8 bytes per cell)
+BLOCK_CELLS = 2_000_000
+# Grids larger than this are split across worker threads (NumPy releases the GIL on large arrays)
+PARALLEL_THRESHOLD_CELLS = 20_000_000
+
+
+def build_scenario_grid(variations: Dict[str, List[float]], base_rules: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """Build the cartesian product of rule variations; unvaried parameters keep their base value."""
+    if base_rules is None:
+        base_rules = active_rules().values
+
+    unknown = [name for name in variations if name not in SCENARIO_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {', '.join(unknown)}")
+
+    axes = [list(variations.get(name) or [base_rules[name]]) for name in SCENARIO_PARAMETERS]
+    grid = pd.DataFrame(list(itertools.product(*axes)), columns=SCENARIO_PARAMETERS)
+    grid.insert(0, "scenario", np.arange(len(grid)))
+    return grid
+
+
+def _roster_arrays(roster: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Host-level inputs shaped as (1, hosts) rows for broadcasting against scenarios."""
+    return {
+        "diamonds": roster["diamonds_earned"].to_numpy(dtype=np.int64)[None, :],
+        "pk_wins": roster["pk_wins"].to_numpy(dtype=np.int64)[None, :],
+        "attended": (roster["days_worked"].to_numpy() >= roster["target_days"].to_numpy())[None, :],
+        "adjustments": (to_minor_units(roster["additional_bonuses"].to_numpy())
+                        - to_minor_units(roster["deductions"].to_numpy()))[None, :],
+    }
+
+
+def _evaluate_block(grid_block: pd.DataFrame, hosts: Dict[str, np.ndarray]) -> np.ndarray:
+    """Final payments in minor units for a block of scenarios, shaped (scenarios, hosts)."""
+    def column(name: str) -> np.ndarray:
+        return grid_block[name].to_numpy()[:, None]
+
+    # Same expressions as calculate_payment_columns, so the baseline scenario reproduces the paysheet exactly
+    excess = np.maximum(hosts["diamonds"] - column("bonus_threshold"), 0)
+    attendance = np.where(hosts["attended"], to_minor_units(column("attendance_bonus")), 0)
+
+    total = apply_rate(hosts["diamonds"], column("base_rate"))
+    total += apply_rate(excess, column("bonus_rate"))
+    total += apply_rate(hosts["pk_wins"], column("pk_win_bonus"))
+    total += attendance
+    total += hosts["adjustments"]
+    return np.maximum(total, 0)
+
+
+def _baseline_payments(roster: pd.DataFrame, rules: Optional[Dict[str, float]]) -> np.ndarray:
+    return calculate_payment_columns(
+        roster["diamonds_earned"].to_numpy(),
+        roster["pk_wins"].to_numpy(),
+        roster["days_worked"].to_numpy(),
+        additional_bonuses=roster["additional_bonuses"].to_numpy(),
+        deductions=roster["deductions"].to_numpy(),
+        target_days=roster["target_days"].to_numpy(),
+        rules=rules,
+    )["final_payment"]
+
+
+def run_scenarios(
+    hosts_data,
+    grid: pd.DataFrame,
+    baseline_rules: Optional[Dict[str, float]] = None,
+    include_host_deltas: bool = False,
+    workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, Optional[np.ndarray]]:
+    """Evaluate every scenario in ``grid`` against the roster.
+
+    Returns a per-scenario summary and, when ``include_host_deltas`` is set, a (scenarios, hosts)
+    int64 matrix of per-host payment deltas versus the baseline rules in minor units. The matrix
+    takes 8 bytes per cell, so for large sweeps use ``scenario_host_deltas`` for one scenario instead.
+    """
+    roster = build_roster(hosts_data)
+    hosts = _roster_arrays(roster)
+    host_count = len(roster)
+    baseline = _baseline_payments(roster, baseline_rules)
+
+    scenario_count = len(grid)
+    block_rows = max(1, BLOCK_CELLS // max(host_count, 1))
+    blocks = [(start, min(start + block_rows, scenario_count)) for start in range(0, scenario_count, block_rows)]
+
+    totals = np.zeros(scenario_count, dtype=np.int64)
+    gainers = np.zeros(scenario_count, dtype=np.int64)
+    losers = np.zeros(scenario_count, dtype=np.int64)
+    max_gain = np.zeros(scenario_count, dtype=np.int64)
+    max_loss = np.zeros(scenario_count, dtype=np.int64)
+    host_deltas = np.empty((scenario_count, host_count), dtype=np.int64) if include_host_deltas else None
+
+    def process(bounds: Tuple[int, int]):
+        start, stop = bounds
+        final = _evaluate_block(grid.iloc[start:stop], hosts)
+        deltas = final - baseline[None, :]
+        totals[start:stop] = final.sum(axis=1)
+        gainers[start:stop] = (deltas > 0).sum(axis=1)
+        losers[start:stop] = (deltas < 0).sum(axis=1)
+        if host_count:
+            max_gain[start:stop] = np.maximum(deltas.max(axis=1), 0)
+            max_loss[start:stop] = np.minimum(deltas.min(axis=1), 0)
+        if host_deltas is not None:
+            host_deltas[start:stop] = deltas
+
+    if scenario_count * host_count > PARALLEL_THRESHOLD_CELLS and len(blocks) > 1:
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            list(executor.map(process, blocks))
+    else:
+        for bounds in blocks:
+            process(bounds)
+
+    baseline_total = int(baseline.sum())
+    summary = grid.copy()
+    summary["Total Payout"] = from_minor_units(totals)
+    summary["Delta vs Baseline"] = from_minor_units(totals - baseline_total)
+    summary["Hosts Better Off"] = gainers
+    summary["Hosts Worse Off"] = losers
+    summary["Max Host Gain"] = from_minor_units(max_gain)
+    summary["Max Host Loss"] = from_minor_units(max_loss)
+    return summary, host_deltas
+
+
+def scenario_host_deltas(hosts_data, scenario, baseline_rules: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Per-host payment deltas in minor units for one scenario (a grid or summary row) versus the baseline."""
+    roster = build_roster(hosts_data)
+    block = pd.DataFrame([{name: scenario[name] for name in SCENARIO_PARAMETERS}])
+    return _evaluate_block(block, _roster_arrays(roster))[0] - _baseline_payments(roster, baseline_rules)
+
+
+def _parse_values(text: str) -> List[float]:
+    """Parse a comma-separated list of numbers from a text input."""
+    return [float(part) for part in text.split(",") if part.strip()]
+
+
+def scenario_sweep_widget(hosts_data=None):
+    """Streamlit widget for what-if analysis over payment rule variations."""
+    st.subheader("🧪 Payment Policy Scenarios")
+
+    roster = hosts_data if hosts_data is not None else st.session_state.get("roster")
+    if roster is None or len(roster) == 0:
+        st.info("Add or import hosts in the Paysheet Generator to run scenarios.")
+        return
+
+    rules = active_rules()
+    st.write(f"Enter comma-separated values for each rule to sweep (baseline: rules v{rules.version}):")
+    variations = {}
+    cols = st.columns(len(SCENARIO_PARAMETERS))
+    for col, name in zip(cols, SCENARIO_PARAMETERS):
+        with col:
+            text = st.text_input(name.replace("_", " ").title(), value=str(rules[name]), key=f"scenario_{name}")
+        try:
+            variations[name] = _parse_values(text)
+        except ValueError:
+            st.error(f"❌ Invalid number in {name}")
+            return
+
+    grid = build_scenario_grid(variations, base_rules=rules.values)
+    st.caption(f"{len(grid):,} scenarios × {len(roster):,} hosts")
+
+    if st.button("▶️ Run Scenarios"):
+        summary, _ = run_scenarios(roster, grid, baseline_rules=rules.values)
+        # Only the summary is kept per session; per-host deltas are computed for the scenario on show
+        st.session_state.scenario_summary = (summary, dict(rules.values))
+
+    results = st.session_state.get("scenario_summary")
+    if results is None:
+        return
+
+    summary, baseline_rules = results
+    st.dataframe(summary.sort_values("Total Payout"), use_container_width=True)
+
+    best = summary.loc[summary["Total Payout"].idxmin()]
+    st.metric(
+        "Lowest Total Payout",
+        format_minor_units(int(to_minor_units(best["Total Payout"]))),
+        f"{best['Delta vs Baseline']:+,.2f}",
+    )
+
+    scenario = st.selectbox("Per-host deltas for scenario", summary["scenario"].tolist(), key="scenario_detail")
+    roster = build_roster(roster)
+    deltas = pd.DataFrame({
+        "Host ID": roster["id"].to_numpy(),
+        "Host Name": roster["name"].to_numpy(),
+        "Delta": from_minor_units(scenario_host_deltas(roster, summary.iloc[scenario], baseline_rules)),
+    })
+    st.dataframe(deltas.sort_values("Delta"), use_container_width=True)
@@ -0,0 +1,270 @@
+"""
+Process-wide login sessions and login rate limiting.
+Sessions live in a token-keyed registry every rerun checks in memory, so a revocation or lockout
+applies to every browser tab at once; sessions can optionally be persisted to SQLite across restarts.
+"""
+
+import heapq
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from config.settings import SECURITY_CONFIG
+
+ADMIN_AREA = "admin"
+DASHBOARD_AREA = "dashboard"
+
+# Limiter buckets kept; the least recently failed go first, by which time they have usually refilled
+MAX_LIMITER_KEYS = 10_000
+
+
+class SessionRecord:
+    """One signed-in session."""
+
+    __slots__ = ("token", "user", "area", "ip", "created_at", "expires_at", "last_seen")
+
+    def __init__(self, token: str, user: str, area: str, ip: str, created_at: float, expires_at: float):
+        self.token = token
+        self.user = user
+        self.area = area
+        self.ip = ip
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.last_seen = created_at
+
+
+class SessionRegistry:
+    """Sessions keyed by token with TTL expiry.
+
+    Lookups, creation and revocation are O(1) dict operations, and revoking every session swaps in
+    empty tables; expired sessions are evicted from a heap ordered by expiry.
+    """
+
+    def __init__(self, db_path: Optional[str] = SECURITY_CONFIG.get("session_db")):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, SessionRecord] = {}
+        self._by_user: Dict[str, Set[str]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self.db_path = db_path
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, user TEXT, area TEXT, ip TEXT, "
+                "created_at REAL, expires_at REAL)"
+            )
+            now = time.time()
+            self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            self._db.commit()
+            for row in self._db.execute("SELECT token, user, area, ip, created_at, expires_at FROM sessions"):
+                self._add(SessionRecord(*row))
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open session store {self.db_path}, sessions will not persist: {e}")
+            self._db = None
+
+    def _persist(self, sql: str, params: tuple = ()):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not update session store: {e}")
+
+    def _add(self, record: SessionRecord):
+        self._sessions[record.token] = record
+        self._by_user.setdefault(record.user, set()).add(record.token)
+        heapq.heappush(self._expiry, (record.expires_at, record.token))
+
+    def _remove(self, token: str) -> Optional[SessionRecord]:
+        record = self._sessions.pop(token, None)
+        if record is not None:
+            tokens = self._by_user.get(record.user)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_user[record.user]
+        return record
+
+    def _evict(self, now: float):
+        """Drop sessions whose expiry has passed; heap entries of revoked sessions are skipped."""
+        while self._expiry and self._expiry[0][0] <= now:
+            _, token = heapq.heappop(self._expiry)
+            record = self._sessions.get(token)
+            if record is not None and record.expires_at <= now:
+                self._remove(token)
+
+    def create(self, user: str, area: str, ttl: float, ip: str = "") -> str:
+        """Start a session and return its token."""
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        record = SessionRecord(token, user, area, ip, now, now + ttl)
+        with self._lock:
+            self._evict(now)
+            self._add(record)
+            self._persist("INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                          (token, user, area, ip, record.created_at, record.expires_at))
+        return token
+
+    def validate(self, token: Optional[str], area: Optional[str] = None) -> Optional[SessionRecord]:
+        """The live session for ``token`` (in ``area`` when given), or None if unknown, expired or revoked."""
+        if not token:
+            return None
+        record = self._sessions.get(token)
+        now = time.time()
+        if record is None or record.expires_at <= now:
+            return None
+        if area is not None and record.area != area:
+            return None
+        record.last_seen = now
+        return record
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """End one session."""
+        if not token:
+            return False
+        with self._lock:
+            removed = self._remove(token) is not None
+            if removed:
+                self._persist("DELETE FROM sessions WHERE token = ?", (token,))
+        return removed
+
+    def revoke_user(self, user: str) -> int:
+        """End every session of one user."""
+        with self._lock:
+            tokens = list(self._by_user.get(user, ()))
+            for token in tokens:
+                self._remove(token)
+            self._persist("DELETE FROM sessions WHERE user = ?", (user,))
+        return len(tokens)
+
+    def revoke_all(self) -> int:
+        """End every session."""
+        with self._lock:
+            count = len(self._sessions)
+            self._sessions = {}
+            self._by_user = {}
+            self._expiry = []
+            self._persist("DELETE FROM sessions")
+        return count
+
+    def count(self, area: Optional[str] = None) -> int:
+        """Live sessions, optionally in one area."""
+        with self._lock:
+            self._evict(time.time())
+            return sum(1 for record in self._sessions.values() if area is None or record.area == area)
+
+    def sessions(self) -> pd.DataFrame:
+        """Live sessions for the admin panel, most recently active first (tokens are not shown)."""
+        with self._lock:
+            self._evict(time.time())
+            records = sorted(self._sessions.values(), key=lambda record: record.last_seen, reverse=True)
+        return pd.DataFrame([
+            {
+                "User": record.user,
+                "Area": record.area,
+                "IP": record.ip,
+                "Signed In": datetime.fromtimestamp(record.created_at).strftime("%Y-%m-%d %H:%M:%S"),
+                "Last Seen": datetime.fromtimestamp(record.last_seen).strftime("%Y-%m-%d %H:%M:%S"),
+                "Expires": datetime.fromtimestamp(record.expires_at).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for record in records
+        ], columns=["User", "Area", "IP", "Signed In", "Last Seen", "Expires"])
+
+
+class LoginLimiter:
+    """Token buckets shared by every session, one per username and one per client IP.
+
+    Each failed login spends a token; buckets refill to ``capacity`` over ``window`` seconds,
+    so ``capacity`` failures lock a username or IP out until a token has refilled.
+    """
+
+    def __init__(self, capacity: int = SECURITY_CONFIG["max_login_attempts"],
+                 window: float = SECURITY_CONFIG["lockout_minutes"] * 60):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated at)
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, keys: Iterable[str]) -> float:
+        """Seconds until every key may try again; 0 when none is locked out."""
+        now = time.time()
+        with self._lock:
+            return max((max(1 - self._tokens(key, now), 0) / self.rate for key in keys), default=0.0)
+
+    def remaining(self, key: str) -> int:
+        """Failed attempts ``key`` has left before it is locked out."""
+        with self._lock:
+            return int(self._tokens(key, time.time()))
+
+    def fail(self, keys: Iterable[str]):
+        """Spend a token from each key's bucket."""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                self._buckets[key] = (max(self._tokens(key, now) - 1, 0.0), now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > MAX_LIMITER_KEYS:
+                self._buckets.popitem(last=False)
+
+    def reset(self, keys: Iterable[str]):
+        """Forget the keys' failures, e.g. every key a login charged once it succeeds."""
+        with self._lock:
+            for key in keys:
+                self._buckets.pop(key, None)
+
+
+def limiter_keys(username: str, ip: str) -> List[str]:
+    keys = [f"user:{username.strip().lower()}"]
+    if ip:
+        keys.append(f"ip:{ip}")
+    return keys
+
+
+def client_ip() -> str:
+    """Address of the browser running the current script, when Streamlit knows it.
+
+    Forwarding headers are ignored because clients can set them to dodge the per-IP limit. Needs
+    Streamlit 1.45+ (st.context.ip_address); it is empty outside a browser session, e.g. in tests.
+    """
+    import streamlit as st
+    return st.context.ip_address or ""
+
+
+_session_registry: Optional[SessionRegistry] = None
+_login_limiter: Optional[LoginLimiter] = None
+_sessions_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """The process-wide session registry."""
+    global _session_registry
+    if _session_registry is None:
+        with _sessions_lock:
+            if _session_registry is None:
+                _session_registry = SessionRegistry()
+    return _session_registry
+
+
+def get_login_limiter() -> LoginLimiter:
+    """The process-wide login limiter."""
+    global _login_limiter
+    if _login_limiter is None:
+        with _sessions_lock:
+            if _login_limiter is None:
+                _login_limiter = LoginLimiter()
+    return _login_limiter
@@ -0,0 +1,236 @@
+"""
+Process-wide scheduler for Google Sheets API calls.
+Every gspread call waits for a token from the project bucket and its spreadsheet's bucket; queued calls are
+served by priority class, and a 429 pauses the whole project with exponential backoff before retrying.
+"""
+
+import bisect
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import SHEETS_API_CONFIG
+
+# Priority classes, served lowest first
+PRIORITY_INTERACTIVE = 0  # reads a page is waiting on
+PRIORITY_WRITE_BACK = 1  # saves a user started
+PRIORITY_BACKGROUND = 2  # refreshes nobody is waiting on
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "Interactive reads",
+    PRIORITY_WRITE_BACK: "Write-back",
+    PRIORITY_BACKGROUND: "Background refresh",
+}
+
+# Recent queue waits kept per class for the wait-time metrics
+MAX_WAIT_SAMPLES = 500
+
+
+def rate_limited(error: Exception) -> bool:
+    """Whether a gspread/HTTP error is Google's "429 Too Many Requests"."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429 or getattr(error, "code", None) == 429
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """``burst`` tokens refilled at ``per_minute`` per minute."""
+
+    def __init__(self, per_minute: float, burst: float):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, now: float) -> float:
+        """Seconds until a token is available."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class ClassStats:
+    """Counters for one priority class."""
+
+    def __init__(self):
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=MAX_WAIT_SAMPLES)
+
+
+class SheetsScheduler:
+    """Paces Sheets API calls under the project and per-spreadsheet quotas.
+
+    Callers block in ``call`` until both buckets have a token and no higher-priority (or earlier
+    same-priority) call that could go first is still waiting.
+    """
+
+    def __init__(self, config: Dict[str, Any] = SHEETS_API_CONFIG):
+        self.config = config
+        self._cond = threading.Condition()
+        self._project = TokenBucket(config["project_per_minute"], config["burst"])
+        self._sheets: Dict[str, TokenBucket] = {}
+        self._queue = []  # sorted (priority, seq, sheet id) of waiting calls
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._stats = {priority: ClassStats() for priority in PRIORITY_NAMES}
+
+    def _sheet(self, sheet_id: str) -> TokenBucket:
+        bucket = self._sheets.get(sheet_id)
+        if bucket is None:
+            bucket = self._sheets[sheet_id] = TokenBucket(self.config["sheet_per_minute"], self.config["burst"])
+        return bucket
+
+    def _wait_for(self, ticket: Tuple[int, int, str], now: float) -> float:
+        """Seconds ``ticket`` should wait before it may take tokens; 0 means go now."""
+        if self._paused_until > now:
+            return self._paused_until - now
+        project_wait = self._project.wait(now)
+        for waiting in self._queue:
+            if waiting is ticket:
+                break
+            if self._sheet(waiting[2]).wait(now) == 0:
+                # A call ahead of this one can go as soon as the project has a token
+                return max(project_wait, 0.05)
+        return max(project_wait, self._sheet(ticket[2]).wait(now))
+
+    def _acquire(self, sheet_id: str, priority: int):
+        started = time.monotonic()
+        deadline = started + self.config["max_wait_seconds"]
+        stats = self._stats[priority]
+        with self._cond:
+            ticket = (priority, next(self._seq), sheet_id)
+            bisect.insort(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_for(ticket, now)
+                    if wait == 0:
+                        self._project.take(now)
+                        self._sheet(sheet_id).take(now)
+                        break
+                    if now >= deadline:
+                        stats.timeouts += 1
+                        raise TimeoutError("Google Sheets is busy (API quota); please try again in a minute")
+                    self._cond.wait(min(wait, deadline - now))
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+            stats.waits.append(time.monotonic() - started)
+
+    def _back_off(self, error: Exception, attempt: int, stats: ClassStats):
+        """Pause every call after a 429: Retry-After when Google sends it, else exponential with jitter."""
+        base = self.config["backoff_seconds"]
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(self.config["max_backoff_seconds"], base * 2 ** attempt) + random.uniform(0, base)
+        with self._cond:
+            stats.rate_limited += 1
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + delay)
+            self._project.drain(now)
+            self._cond.notify_all()
+        print(f"Warning: Google Sheets API rate limit hit, pausing calls for {delay:.1f}s")
+
+    def call(self, sheet_id: str, fn: Callable[[], Any], priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """Run ``fn()`` (one API request against ``sheet_id``) once quota allows and return its result.
+
+        Retried after a pause when rejected with 429, up to ``max_retries`` times; other errors,
+        and a wait longer than ``max_wait_seconds`` (TimeoutError), are raised to the caller.
+        """
+        stats = self._stats[priority]
+        for attempt in itertools.count():
+            self._acquire(sheet_id, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                if not rate_limited(e):
+                    raise
+                self._back_off(e, attempt, stats)
+                if attempt >= self.config["max_retries"]:
+                    raise
+                with self._cond:
+                    stats.retries += 1
+                continue
+            with self._cond:
+                stats.calls += 1
+            return result
+
+    def summary(self) -> Dict[str, float]:
+        """Queue depth, remaining 429 pause and project tokens available right now."""
+        with self._cond:
+            now = time.monotonic()
+            self._project.wait(now)
+            return {
+                "queued": len(self._queue),
+                "paused_seconds": max(self._paused_until - now, 0.0),
+                "tokens": max(self._project.tokens, 0.0),
+            }
+
+    def stats(self) -> pd.DataFrame:
+        """Queue depth, calls, 429s and wait times per priority class for the admin panel."""
+        with self._cond:
+            depth = {priority: 0 for priority in PRIORITY_NAMES}
+            for priority, _, _ in self._queue:
+                depth[priority] += 1
+            rows = []
+            for priority, name in PRIORITY_NAMES.items():
+                stats = self._stats[priority]
+                waits = np.array(stats.waits) * 1000
+                rows.append({
+                    "Class": name,
+                    "Waiting": depth[priority],
+                    "Calls": stats.calls,
+                    "Rate Limited": stats.rate_limited,
+                    "Retries": stats.retries,
+                    "Timed Out": stats.timeouts,
+                    "Avg Wait (ms)": round(float(waits.mean()), 1) if len(waits) else None,
+                    "P95 Wait (ms)": round(float(np.percentile(waits, 95)), 1) if len(waits) else None,
+                    "Max Wait (ms)": round(float(waits.max()), 1) if len(waits) else None,
+                })
+        return pd.DataFrame(rows, columns=["Class", "Waiting", "Calls", "Rate Limited", "Retries", "Timed Out",
+                                           "Avg Wait (ms)", "P95 Wait (ms)", "Max Wait (ms)"])
+
+
+_sheets_scheduler: Optional[SheetsScheduler] = None
+_sheets_scheduler_lock = threading.Lock()
+
+
+def get_sheets_scheduler() -> SheetsScheduler:
+    """The process-wide Sheets API scheduler."""
+    global _sheets_scheduler
+    if _sheets_scheduler is None:
+        with _sheets_scheduler_lock:
+            if _sheets_scheduler is None:
+                _sheets_scheduler = SheetsScheduler()
+    return _sheets_scheduler
+
+
+def sheets_call(sheet_id: str, fn: Callable[[], Any], priority: int = PRIORITY_INTERACTIVE) -> Any:
+    """Run one Sheets API request through the process-wide scheduler."""
+    return get_sheets_scheduler().call(sheet_id, fn, priority)
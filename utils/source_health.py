@@ -0,0 +1,245 @@
+"""
+Circuit breakers and last-good snapshots for the upstream sheets the dashboard reads.
+A source that keeps failing or answering slowly is opened and served from its last good snapshot
+while background probes wait for it to recover; every page render also gets a fetch latency budget.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import SOURCE_CONFIG
+from utils.telemetry import run_elapsed
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Fetches take (connect timeout, deadline for the whole download) in seconds
+Fetch = Callable[[Tuple[float, float]], Any]
+
+
+class SourceUnavailable(Exception):
+    """A source was not fetched; carries its last good snapshot, if there is one, for the caller to serve."""
+
+    def __init__(self, source: str, reason: str, snapshot: Any = None, fetched_at: Optional[float] = None):
+        super().__init__(f"{source} is unavailable: {reason}")
+        self.source = source
+        self.reason = reason
+        self.snapshot = snapshot
+        self.fetched_at = fetched_at
+
+
+class CircuitBreaker:
+    """Failure-rate breaker for one source.
+
+    Closed, it lets fetches through and tracks the share of failed or slow ones over the last
+    ``window`` fetches; past ``failure_rate`` it opens and rejects fetches. After ``open_seconds``
+    one probe is let through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, window: int = SOURCE_CONFIG["window"], min_requests: int = SOURCE_CONFIG["min_requests"],
+                 failure_rate: float = SOURCE_CONFIG["failure_rate"], open_seconds: float = SOURCE_CONFIG["open_seconds"],
+                 slow_seconds: float = SOURCE_CONFIG["slow_seconds"]):
+        self.min_requests = min_requests
+        self.threshold = failure_rate
+        self.open_seconds = open_seconds
+        self.slow_seconds = slow_seconds
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)  # True for a failed or slow fetch
+        self.opened_at = 0.0
+        self.fetches = 0
+        self.failures = 0
+        self.slow = 0
+        self.rejected = 0
+        self.last_latency: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error = ""
+
+    @property
+    def failure_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def allow(self) -> bool:
+        return self.state == CLOSED
+
+    def probe_due(self, now: float) -> bool:
+        """Whether an open breaker has waited long enough; moves it to half-open for the probe."""
+        if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record(self, ok: bool, seconds: float, error: str = ""):
+        now = time.time()
+        slow = seconds > self.slow_seconds
+        self.fetches += 1
+        self.last_latency = seconds
+        if ok:
+            self.last_success = now
+        else:
+            self.failures += 1
+            self.last_error = error
+        if slow:
+            self.slow += 1
+        bad = slow or not ok
+
+        if self.state == HALF_OPEN:
+            if bad:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self.outcomes.clear()
+            return
+        self.outcomes.append(bad)
+        if self.state == CLOSED and len(self.outcomes) >= self.min_requests and self.failure_rate >= self.threshold:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+
+
+class SourceHealth:
+    """Breakers, last good snapshots and stale flags for every upstream source."""
+
+    def __init__(self, render_budget: float = SOURCE_CONFIG["render_budget_seconds"],
+                 connect_timeout: float = SOURCE_CONFIG["connect_timeout"],
+                 read_timeout: float = SOURCE_CONFIG["read_timeout"]):
+        self.render_budget = render_budget
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._snapshots: Dict[str, Tuple[Any, float]] = {}  # source -> (value, fetched at)
+        self._stale: Dict[str, str] = {}  # source -> why its snapshot is being served
+
+    def _breaker(self, source: str) -> CircuitBreaker:
+        breaker = self._breakers.get(source)
+        if breaker is None:
+            breaker = self._breakers[source] = CircuitBreaker()
+        return breaker
+
+    def _unavailable(self, source: str, reason: str) -> SourceUnavailable:
+        snapshot, fetched_at = self._snapshots.get(source, (None, None))
+        return SourceUnavailable(source, reason, snapshot, fetched_at)
+
+    def fetch(self, source: str, fetch: Fetch) -> Any:
+        """Call ``fetch(timeout)`` through the source's breaker and keep the result as its snapshot.
+
+        Raises SourceUnavailable, without fetching, while the breaker is open or once the current
+        render's budget is spent; a failed fetch raises SourceUnavailable when a snapshot exists
+        and its own error otherwise. Use from a cache loader, and ``serve`` around the lookup.
+        """
+        with self._lock:
+            breaker = self._breaker(source)
+            has_snapshot = source in self._snapshots
+            if breaker.probe_due(time.time()):
+                threading.Thread(target=self._probe, args=(source, fetch), name=f"source-probe-{source}",
+                                 daemon=True).start()
+            if not breaker.allow():
+                breaker.rejected += 1
+                raise self._unavailable(source, f"paused after repeated failures ({breaker.last_error or 'too slow'})")
+
+        connect_timeout, total = self.connect_timeout, self.read_timeout
+        elapsed = run_elapsed()
+        if has_snapshot and elapsed is not None:
+            # Only spend the render's remaining budget when saved data can stand in
+            remaining = self.render_budget - elapsed
+            if remaining <= 0:
+                raise self._unavailable(source, "page load time budget spent")
+            connect_timeout, total = min(connect_timeout, remaining), min(total, remaining)
+
+        try:
+            return self._attempt(source, fetch, (connect_timeout, total))
+        except Exception as e:
+            print(f"Warning: Could not fetch {source}: {e}")
+            with self._lock:
+                if source in self._snapshots:
+                    raise self._unavailable(source, f"last fetch failed ({e})") from e
+            raise
+
+    def _attempt(self, source: str, fetch: Fetch, timeout: Tuple[float, float]) -> Any:
+        started = time.perf_counter()
+        try:
+            value = fetch(timeout)
+        except Exception as e:
+            with self._lock:
+                self._breaker(source).record(False, time.perf_counter() - started, str(e))
+            raise
+        with self._lock:
+            self._breaker(source).record(True, time.perf_counter() - started)
+            self._snapshots[source] = (value, time.time())
+            self._stale.pop(source, None)
+        return value
+
+    def _probe(self, source: str, fetch: Fetch):
+        """Try an open source once in the background; success closes its breaker and renews its snapshot."""
+        try:
+            self._attempt(source, fetch, (self.connect_timeout, self.read_timeout))
+            with self._lock:
+                recovered = self._breaker(source).state == CLOSED
+            if recovered:
+                print(f"Source {source} recovered")
+        except Exception as e:
+            print(f"Warning: Probe of {source} failed: {e}")
+
+    def serve(self, source: str, load: Callable[[], Any]) -> Any:
+        """``load()``, or the source's last good snapshot (marked stale) when it raises SourceUnavailable."""
+        try:
+            return load()
+        except SourceUnavailable as e:
+            if e.snapshot is None:
+                raise
+            with self._lock:
+                self._stale[source] = e.reason
+            return e.snapshot
+
+    def stale(self, sources: Optional[Iterable[str]] = None) -> Dict[str, Tuple[float, str]]:
+        """Sources currently served from a snapshot: (snapshot fetched at, reason)."""
+        with self._lock:
+            names = list(self._stale) if sources is None else [name for name in sources if name in self._stale]
+            return {name: (self._snapshots[name][1], self._stale[name]) for name in names}
+
+    def status(self) -> pd.DataFrame:
+        """One row per source for the admin panel."""
+        def when(at: Optional[float]) -> str:
+            return datetime.fromtimestamp(at).strftime("%Y-%m-%d %H:%M:%S") if at else ""
+
+        with self._lock:
+            rows = [
+                {
+                    "Source": source,
+                    "State": breaker.state,
+                    "Failure Rate": f"{breaker.failure_rate:.0%}",
+                    "Fetches": breaker.fetches,
+                    "Failed": breaker.failures,
+                    "Slow": breaker.slow,
+                    "Rejected": breaker.rejected,
+                    "Last Latency (s)": round(breaker.last_latency, 2) if breaker.last_latency is not None else None,
+                    "Last Success": when(breaker.last_success),
+                    "Serving Snapshot": when(self._snapshots[source][1]) if source in self._stale else "",
+                    "Last Error": breaker.last_error,
+                }
+                for source, breaker in sorted(self._breakers.items())
+            ]
+        return pd.DataFrame(rows, columns=["Source", "State", "Failure Rate", "Fetches", "Failed", "Slow", "Rejected",
+                                           "Last Latency (s)", "Last Success", "Serving Snapshot", "Last Error"])
+
+
+_source_health: Optional[SourceHealth] = None
+_source_health_lock = threading.Lock()
+
+
+def get_source_health() -> SourceHealth:
+    """The process-wide source health tracker."""
+    global _source_health
+    if _source_health is None:
+        with _source_health_lock:
+            if _source_health is None:
+                _source_health = SourceHealth()
+    return _source_health
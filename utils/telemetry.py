@@ -0,0 +1,187 @@
+"""
+Process-wide usage telemetry for the admin panel.
+Scripts append run events to a bounded ring buffer without locking; readers fold them into per-minute buckets.
+"""
+
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Raw events waiting to be aggregated; the oldest are dropped if nobody reads for a long time
+MAX_PENDING_EVENTS = 100_000
+# Per-minute buckets kept (one day)
+MAX_MINUTES = 24 * 60
+# Sessions remembered for session-length statistics, least recently seen dropped first
+MAX_TRACKED_SESSIONS = 5_000
+# A session counts as active if it reran within this many seconds
+ACTIVE_WINDOW_SECONDS = 5 * 60
+
+
+class MinuteBucket:
+    """Counters for one wall-clock minute."""
+
+    __slots__ = ("minute", "runs", "page_views", "total_ms", "max_ms", "timed_runs", "sessions", "pages")
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        self.runs = 0
+        self.page_views = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timed_runs = 0
+        self.sessions = set()
+        self.pages = Counter()
+
+
+class Telemetry:
+    """Sessions, page views and rerun durations with bounded memory.
+
+    ``record`` only appends a tuple to a deque, which is atomic under the GIL, so scripts never
+    wait on a lock; aggregation happens when the admin panel reads.
+    """
+
+    def __init__(self):
+        self._pending = deque(maxlen=MAX_PENDING_EVENTS)
+        self._minutes = deque(maxlen=MAX_MINUTES)
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()  # session -> [first seen, last seen, runs]
+        self._lock = threading.Lock()
+        self.total_sessions = 0
+        self.started_at = time.time()
+
+    def record(self, session_id: str, page: str, duration_ms: Optional[float] = None, page_view: bool = False):
+        """Record a rerun start (``page_view`` when the session switched pages) or a finished rerun's duration."""
+        self._pending.append((time.time(), session_id, page, duration_ms, page_view))
+
+    def _drain(self):
+        """Fold pending events into minute buckets and session stats."""
+        with self._lock:
+            while True:
+                try:
+                    at, session_id, page, duration_ms, page_view = self._pending.popleft()
+                except IndexError:
+                    break
+                minute = int(at // 60) * 60
+                if not self._minutes or self._minutes[-1].minute < minute:
+                    self._minutes.append(MinuteBucket(minute))
+                bucket = self._minutes[-1]
+
+                if duration_ms is None:
+                    bucket.runs += 1
+                    bucket.sessions.add(session_id)
+                    if page_view:
+                        bucket.page_views += 1
+                        bucket.pages[page] += 1
+                    session = self._sessions.get(session_id)
+                    if session is None:
+                        self.total_sessions += 1
+                        self._sessions[session_id] = [at, at, 1]
+                        if len(self._sessions) > MAX_TRACKED_SESSIONS:
+                            self._sessions.popitem(last=False)
+                    else:
+                        session[1] = at
+                        session[2] += 1
+                        self._sessions.move_to_end(session_id)
+                else:
+                    bucket.timed_runs += 1
+                    bucket.total_ms += duration_ms
+                    bucket.max_ms = max(bucket.max_ms, duration_ms)
+
+    def summary(self, window_minutes: int = 60) -> Dict[str, float]:
+        """Headline numbers: active users, sessions, session length and rerun timings over the window."""
+        self._drain()
+        now = time.time()
+        with self._lock:
+            sessions = np.array([(first, last) for first, last, _ in self._sessions.values()], dtype=np.float64).reshape(-1, 2)
+            recent = [bucket for bucket in self._minutes if bucket.minute >= now - window_minutes * 60]
+            previous = [bucket for bucket in self._minutes
+                        if now - 2 * window_minutes * 60 <= bucket.minute < now - window_minutes * 60]
+        timed = sum(bucket.timed_runs for bucket in recent)
+        return {
+            "active_users": int((sessions[:, 1] >= now - ACTIVE_WINDOW_SECONDS).sum()),
+            "total_sessions": self.total_sessions,
+            "avg_session_seconds": float((sessions[:, 1] - sessions[:, 0]).mean()) if len(sessions) else 0.0,
+            "page_views": sum(bucket.page_views for bucket in recent),
+            "previous_page_views": sum(bucket.page_views for bucket in previous),
+            "runs": sum(bucket.runs for bucket in recent),
+            "avg_run_ms": sum(bucket.total_ms for bucket in recent) / timed if timed else 0.0,
+            "max_run_ms": max((bucket.max_ms for bucket in recent), default=0.0),
+        }
+
+    def minutes(self, window_minutes: int = 60) -> pd.DataFrame:
+        """Per-minute activity over the window, one row per minute with traffic."""
+        self._drain()
+        cutoff = time.time() - window_minutes * 60
+        with self._lock:
+            recent = [bucket for bucket in self._minutes if bucket.minute >= cutoff]
+            rows = [
+                {
+                    "Minute": pd.Timestamp.fromtimestamp(bucket.minute),
+                    "Sessions": len(bucket.sessions),
+                    "Reruns": bucket.runs,
+                    "Page Views": bucket.page_views,
+                    "Avg Rerun (ms)": round(bucket.total_ms / bucket.timed_runs, 1) if bucket.timed_runs else None,
+                    "Max Rerun (ms)": round(bucket.max_ms, 1),
+                }
+                for bucket in recent
+            ]
+        return pd.DataFrame(rows, columns=["Minute", "Sessions", "Reruns", "Page Views", "Avg Rerun (ms)", "Max Rerun (ms)"])
+
+    def pages(self, window_minutes: int = 60) -> pd.DataFrame:
+        """Page views per page over the window, most viewed first."""
+        self._drain()
+        cutoff = time.time() - window_minutes * 60
+        totals = Counter()
+        with self._lock:
+            for bucket in self._minutes:
+                if bucket.minute >= cutoff:
+                    totals.update(bucket.pages)
+        return pd.DataFrame(totals.most_common(), columns=["Page", "Views"])
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """The process-wide telemetry collector."""
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = Telemetry()
+    return _telemetry
+
+
+def begin_run(page: str):
+    """Call at the top of a script: records the rerun, and a page view when the session changed pages."""
+    if "telemetry_session" not in st.session_state:
+        st.session_state.telemetry_session = uuid.uuid4().hex
+    page_view = st.session_state.get("telemetry_page") != page
+    st.session_state.telemetry_page = page
+    st.session_state.telemetry_started = time.perf_counter()
+    get_telemetry().record(st.session_state.telemetry_session, page, page_view=page_view)
+
+
+def run_elapsed() -> Optional[float]:
+    """Seconds since the running script called begin_run, or None outside a tracked script run."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    started = st.session_state.get("telemetry_started")
+    return None if started is None else time.perf_counter() - started
+
+
+def end_run():
+    """Call at the end of a script to record how long the rerun took."""
+    started = st.session_state.get("telemetry_started")
+    if started is None:
+        return
+    st.session_state.telemetry_started = None
+    get_telemetry().record(st.session_state.telemetry_session, st.session_state.telemetry_page,
+                           duration_ms=(time.perf_counter() - started) * 1000)
@@ -0,0 +1,182 @@
+"""
+Ingestion pipeline for admin panel pay chart uploads.
+Sniffs the file format, parses and validates it chunk by chunk within row and memory budgets, and compacts the result.
+"""
+
+import csv
+import time
+import zipfile
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.pay_charts import AGENCY_PAY_CHART, HOST_PAY_CHART
+from config.settings import UPLOAD_CONFIG
+from utils.chunked_reader import SUPPORTED_FORMATS, iter_chunks
+
+MB = 1024 * 1024
+NUMBER = "number"
+TEXT = "text"
+KEY_COLUMN = "Ranking"
+
+
+def chart_schema(chart: Dict[str, list]) -> Dict[str, str]:
+    """Column kinds of a reference pay chart: numeric when every value is a number."""
+    return {
+        column: NUMBER if all(isinstance(value, (int, float)) for value in values) else TEXT
+        for column, values in chart.items()
+    }
+
+
+# Datasets an upload can replace, with the columns their pages read
+PAY_CHART_SCHEMAS = {
+    "host_pay": chart_schema(HOST_PAY_CHART),
+    "agency_pay": chart_schema(AGENCY_PAY_CHART),
+}
+
+
+class IngestResult(NamedTuple):
+    frame: pd.DataFrame
+    file_format: str
+    rows: int
+    chunks: int
+    file_bytes: int
+    memory_bytes: int
+    seconds: float
+
+
+def sniff_format(data: bytes, filename: str) -> str:
+    """File format from the content's signature, falling back to the file extension."""
+    head = data[:8]
+    if head.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if head.startswith(b"PAR1"):
+        return "parquet"
+    if data.lstrip()[:1] in (b"[", b"{"):
+        return "json"
+    lowered = filename.lower()
+    for extension, file_format in SUPPORTED_FORMATS.items():
+        if lowered.endswith(extension):
+            return file_format
+    return "csv"
+
+
+def sniff_delimiter(data: bytes) -> str:
+    """CSV delimiter guessed from the first lines; commas when undecided."""
+    sample = data[:64 * 1024].decode("utf-8", errors="ignore")
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def _match_columns(chunk: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Schema columns only, matching headers regardless of case and surrounding spaces."""
+    wanted = {name.strip().lower(): name for name in schema}
+    renamed = {col: wanted[str(col).strip().lower()] for col in chunk.columns if str(col).strip().lower() in wanted}
+    missing = [name for name in schema if name not in renamed.values()]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    return chunk.rename(columns=renamed)[list(schema)]
+
+
+def validate_chunk(chunk: pd.DataFrame, schema: Dict[str, str], row_offset: int = 0) -> pd.DataFrame:
+    """Typed schema columns for one chunk.
+
+    Raises ValueError naming the first bad row when a value is missing or a numeric value is
+    not a non-negative number.
+    """
+    table = _match_columns(chunk, schema).reset_index(drop=True)
+    for column, kind in schema.items():
+        if kind == NUMBER:
+            values = pd.to_numeric(table[column], errors="coerce")
+            invalid = values.isna() | (values < 0)
+        else:
+            values = table[column].astype("string").str.strip()
+            invalid = values.isna() | (values == "")
+        if invalid.any():
+            first = int(np.flatnonzero(invalid.to_numpy())[0]) + row_offset + 2
+            raise ValueError(f"{int(invalid.sum())} invalid values in {column} (first at row {first})")
+        table[column] = values
+    return table
+
+
+def compact(frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar snapshot with exact int64 for whole numbers and categories for repetitive text.
+
+    Integers are not narrowed further because pay calculations multiply these columns.
+    """
+    snapshot = pd.DataFrame(index=range(len(frame)))
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.is_numeric_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64)
+            whole = np.all(np.mod(numbers, 1) == 0) and np.all(np.abs(numbers) < 2 ** 53)
+            snapshot[column] = numbers.astype(np.int64) if whole else numbers
+        elif values.nunique() <= len(values) // 2:
+            snapshot[column] = values.astype(object).astype("category")
+        else:
+            snapshot[column] = values.astype(object)
+    return snapshot
+
+
+def ingest_upload(data: bytes, filename: str, dataset: str,
+                  progress: Optional[Callable[[float, str], None]] = None,
+                  max_rows: Optional[int] = None, max_memory_mb: Optional[int] = None) -> IngestResult:
+    """Parse, validate and compact an uploaded pay chart for ``dataset``.
+
+    ``progress`` is called with the fraction parsed and a status message after each chunk.
+    Raises ValueError when the file breaks a budget, is empty or fails validation.
+    """
+    if dataset not in PAY_CHART_SCHEMAS:
+        raise ValueError(f"Uploads cannot replace the {dataset} dataset")
+    schema = PAY_CHART_SCHEMAS[dataset]
+    max_rows = max_rows or UPLOAD_CONFIG["max_rows"]
+    max_memory = (max_memory_mb or UPLOAD_CONFIG["max_memory_mb"]) * MB
+    if len(data) > UPLOAD_CONFIG["max_file_mb"] * MB:
+        raise ValueError(f"The file is {len(data) / MB:.1f} MB; uploads are limited to {UPLOAD_CONFIG['max_file_mb']} MB")
+
+    started = time.perf_counter()
+    file_format = sniff_format(data, filename)
+    sep = sniff_delimiter(data) if file_format == "csv" else ","
+    fraction = {"parsed": 0.0}
+    chunks = iter_chunks(data, file_format, chunk_rows=UPLOAD_CONFIG["chunk_rows"],
+                         progress=lambda value: fraction.update(parsed=value), sep=sep)
+
+    frames: List[pd.DataFrame] = []
+    rows = memory = 0
+    try:
+        for chunk in chunks:
+            table = validate_chunk(chunk, schema, row_offset=rows)
+            rows += len(table)
+            memory += int(table.memory_usage(deep=True).sum())
+            if rows > max_rows:
+                raise ValueError(f"The file has more than {max_rows:,} rows")
+            if memory > max_memory:
+                raise ValueError(f"The parsed data exceeds the {max_memory // MB} MB memory budget")
+            frames.append(table)
+            if progress is not None:
+                progress(fraction["parsed"], f"Validated {rows:,} rows")
+    except (pd.errors.ParserError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Could not parse the file as {file_format}: {e}") from e
+
+    if not rows:
+        raise ValueError("The uploaded file has no rows")
+    frame = pd.concat(frames, ignore_index=True)
+    duplicated = frame[KEY_COLUMN].duplicated()
+    if duplicated.any():
+        raise ValueError(f"Duplicate {KEY_COLUMN} values: {', '.join(frame.loc[duplicated, KEY_COLUMN].astype(str).unique()[:5])}")
+
+    snapshot = compact(frame)
+    if progress is not None:
+        progress(1.0, f"Ingested {rows:,} rows")
+    return IngestResult(
+        frame=snapshot,
+        file_format=file_format,
+        rows=rows,
+        chunks=len(frames),
+        file_bytes=len(data),
+        memory_bytes=int(snapshot.memory_usage(deep=True).sum()),
+        seconds=time.perf_counter() - started,
+    )